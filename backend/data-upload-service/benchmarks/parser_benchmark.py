@@ -0,0 +1,107 @@
+"""
+Benchmark de los lectores de archivos guardados (UPLOAD_PARSER).
+
+Compara la lectura en modo texto (open(path, 'r') línea a línea + 
+DataValidator.validate_line_format, igual que SubirDataService._parsear_lineas)
+con parsear_mmap, que recorre el archivo mapeado en memoria en bytes.
+
+Cada lector corre en un proceso aparte para medir su RSS máximo por separado.
+Las filas se consumen en lotes de --batch, como lo hace la inserción en BD.
+
+Uso (desde data-upload-service/):
+    python -m benchmarks.parser_benchmark --size-mb 1024
+    python -m benchmarks.parser_benchmark --file /ruta/DATA.TXT
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from src.validators.data_validator import DataValidator
+from src.services.mmap_parser import parsear_mmap
+from benchmarks.synthetic import generar_lineas
+
+
+def parsear_texto(path):
+    """Lectura actual en modo texto (ver SubirDataService._parsear_lineas)"""
+    with open(path, 'r', encoding='utf-8') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            yield DataValidator.validate_line_format(line, line_number)
+
+
+LECTORES = {
+    'text': parsear_texto,
+    'mmap': parsear_mmap
+}
+
+
+def generar_archivo(path, size_mb):
+    """Escribe un DATA.TXT sintético de al menos size_mb MB"""
+    objetivo = size_mb * 1024 * 1024
+    with open(path, 'w', encoding='utf-8') as file:
+        while file.tell() < objetivo:
+            file.write('\n'.join(generar_lineas(100000, seed=file.tell())) + '\n')
+
+
+def _rss_maximo_mb():
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _medir(nombre, path, batch, resultados):
+    rss_inicial = _rss_maximo_mb()
+    inicio = time.perf_counter()
+    filas = 0
+    lote = []
+    for fila in LECTORES[nombre](path):
+        lote.append(fila)
+        if len(lote) >= batch:
+            filas += len(lote)
+            lote = []
+    filas += len(lote)
+    duracion = time.perf_counter() - inicio
+    resultados[nombre] = (filas, duracion, rss_inicial, _rss_maximo_mb())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=1024, help='Tamaño del archivo sintético en MB')
+    parser.add_argument('--file', help='Usar un archivo existente en vez de generar uno')
+    parser.add_argument('--batch', type=int, default=5000, help='Tamaño de lote (UPLOAD_BATCH_SIZE)')
+    args = parser.parse_args()
+
+    path = args.file
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'DATA.TXT')
+        print(f'Generando {args.size_mb} MB en {path}...')
+        generar_archivo(path, args.size_mb)
+
+    print(f'Archivo: {os.path.getsize(path) / (1024 * 1024):,.0f} MB')
+
+    with multiprocessing.Manager() as manager:
+        resultados = manager.dict()
+        for nombre in LECTORES:
+            proceso = multiprocessing.Process(target=_medir, args=(nombre, path, args.batch, resultados))
+            proceso.start()
+            proceso.join()
+
+        for nombre in LECTORES:
+            filas, duracion, rss_inicial, rss_maximo = resultados[nombre]
+            print(
+                f'{nombre:>5}: {filas:,} filas en {duracion:.1f}s, {filas / duracion:,.0f} líneas/s, '
+                f'RSS máximo {rss_maximo:,.0f} MB (+{rss_maximo - rss_inicial:,.0f} MB al leer)'
+            )
+
+    if args.file is None:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+
+if __name__ == '__main__':
+    main()
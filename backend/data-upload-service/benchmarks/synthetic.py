@@ -0,0 +1,13 @@
+import random
+from datetime import date, timedelta
+
+def generar_lineas(cantidad, seed=42):
+    """Genera líneas fecha;hora;rut válidas con una distribución parecida a un DATA.TXT real"""
+    rnd = random.Random(seed)
+    inicio = date(2023, 1, 1)
+    ruts = [f'{rnd.randint(1000000, 25000000)}-{rnd.choice("0123456789K")}' for _ in range(500)]
+    
+    for i in range(cantidad):
+        fecha = inicio + timedelta(days=(i // 1000) % 365)
+        hora = f'{rnd.randint(6, 20):02d}:{rnd.randint(0, 59):02d}'
+        yield f'{fecha.year:04d}/{fecha.month:02d}/{fecha.day:02d};{hora};{rnd.choice(ruts)}'
@@ -0,0 +1,44 @@
+"""
+Micro-benchmark del validador de líneas de DATA.TXT.
+
+Compara el camino rápido de DataValidator.validate_line_format (un solo
+patrón precompilado + aritmética entera) con la validación campo a campo
+original (DataValidator.validate_line_fields).
+
+Uso (desde data-upload-service/):
+    python -m benchmarks.validator_benchmark --lines 200000
+"""
+import argparse
+import time
+from src.validators.data_validator import DataValidator
+from benchmarks.synthetic import generar_lineas
+
+def medir(funcion, lineas, repeticiones):
+    """Retorna el mejor resultado en líneas por segundo"""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for numero, linea in enumerate(lineas, 1):
+            funcion(linea, numero)
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return len(lineas) / mejor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=200000, help='Cantidad de líneas sintéticas')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por validador')
+    args = parser.parse_args()
+    
+    lineas = list(generar_lineas(args.lines))
+    
+    campos = medir(DataValidator.validate_line_fields, lineas, args.repeat)
+    rapido = medir(DataValidator.validate_line_format, lineas, args.repeat)
+    
+    print(f'Líneas: {len(lineas)}')
+    print(f'validate_line_fields (campo a campo): {campos:,.0f} líneas/s')
+    print(f'validate_line_format (camino rápido): {rapido:,.0f} líneas/s')
+    print(f'Aceleración: {rapido / campos:.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -15,26 +15,87 @@ CREATE TABLE IF NOT EXISTS data (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
+    UNIQUE KEY uq_data_rut_fecha_hora (rut, fecha, hora),
     INDEX idx_rut (rut),
     INDEX idx_fecha (fecha),
     INDEX idx_rut_fecha (rut, fecha),
     INDEX idx_fecha_hora (fecha, hora)
 ) ENGINE=InnoDB COMMENT='Tabla de marcaciones de asistencia de empleados';
 
+-- Con DATA_STORAGE=compact la tabla data usa tipos compactos (el servicio sigue
+-- entregando fecha yyyy/MM/dd, hora HH:mm y rut xxxxxxxx-x). Para cambiar de
+-- almacenamiento se elimina la tabla y se recrea con esta definición:
+--
+-- CREATE TABLE IF NOT EXISTS data (
+--     id INT AUTO_INCREMENT PRIMARY KEY,
+--     fecha DATE NOT NULL COMMENT 'Fecha de la marcación',
+--     hora SMALLINT NOT NULL COMMENT 'Minutos desde medianoche',
+--     rut INT NOT NULL COMMENT 'Cuerpo del RUT * 11 + dígito verificador (K = 10)',
+--     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+--     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+--
+--     UNIQUE KEY uq_data_rut_fecha_hora (rut, fecha, hora),
+--     INDEX idx_rut (rut),
+--     INDEX idx_fecha (fecha),
+--     INDEX idx_rut_fecha (rut, fecha),
+--     INDEX idx_fecha_hora (fecha, hora)
+-- ) ENGINE=InnoDB COMMENT='Tabla de marcaciones de asistencia de empleados';
+
 
 CREATE TABLE IF NOT EXISTS upload_logs (
     id INT AUTO_INCREMENT PRIMARY KEY,
     filename VARCHAR(255) NOT NULL,
     records_processed INT DEFAULT 0,
     upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    status ENUM('success', 'error') DEFAULT 'success',
+    status ENUM('pending', 'running', 'success', 'error') DEFAULT 'success',
     error_message TEXT,
-    file_size INT,
+    file_size BIGINT COMMENT 'Bytes del archivo (una carga por partes supera el máximo de INT)',
+    file_hash CHAR(64) COMMENT 'SHA-256 del archivo cargado',
+    file_path VARCHAR(512) COMMENT 'Archivo guardado que procesa el job',
+    started_at TIMESTAMP NULL,
+    finished_at TIMESTAMP NULL,
+    records_per_second FLOAT,
+    load_mode VARCHAR(10) COMMENT 'replace, diff, append o months',
+    source_hash CHAR(64) COMMENT 'SHA-256 del archivo al empezar la carga por lotes (se verifica antes de retomarla)',
+    checkpoint_offset BIGINT COMMENT 'Byte del archivo hasta el que se confirmó la carga',
+    checkpoint_line INT COMMENT 'Última línea confirmada',
+    checkpoint_rows INT COMMENT 'Filas confirmadas hasta el checkpoint',
+    heartbeat_at TIMESTAMP NULL COMMENT 'Última señal de vida del proceso que ejecuta la carga',
+    lines_read INT COMMENT 'Líneas leídas del archivo',
+    save_seconds FLOAT COMMENT 'Segundos guardando el archivo subido',
+    hash_seconds FLOAT COMMENT 'Segundos calculando el SHA-256',
+    parse_seconds FLOAT COMMENT 'Segundos leyendo y validando líneas',
+    wait_seconds FLOAT COMMENT 'Segundos que la escritura esperó al lector (pipeline)',
+    insert_seconds FLOAT COMMENT 'Segundos en sentencias de escritura',
+    commit_seconds FLOAT COMMENT 'Segundos en commits',
+    total_seconds FLOAT COMMENT 'Duración total del procesamiento',
     
     INDEX idx_upload_date (upload_date),
-    INDEX idx_status (status)
+    INDEX idx_status (status),
+    INDEX idx_file_hash (file_hash)
 ) ENGINE=InnoDB COMMENT='Log de cargas de archivos';
 
+-- Resumen de cada generación (carga exitosa), calculado una vez al importar
+CREATE TABLE IF NOT EXISTS data_summary (
+    upload_log_id INT PRIMARY KEY COMMENT 'Carga (generación) a la que corresponde',
+    total_records INT NOT NULL DEFAULT 0,
+    total_employees INT NOT NULL DEFAULT 0,
+    fecha_min VARCHAR(10),
+    fecha_max VARCHAR(10),
+    records_per_day JSON NOT NULL COMMENT '{fecha: registros}',
+    records_per_rut JSON NOT NULL COMMENT '{rut: registros}',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (upload_log_id) REFERENCES upload_logs(id)
+) ENGINE=InnoDB COMMENT='Resumen de los datos por generación';
+
+-- Generación de los datos: aumenta con cada carga o purga que cambia data (ETag de las lecturas)
+CREATE TABLE IF NOT EXISTS data_generation (
+    id INT PRIMARY KEY,
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB COMMENT='Generación de los datos visibles';
+
 
 INSERT IGNORE INTO data (fecha, hora, rut) VALUES
 ('2024/01/15', '08:00', '671-9'),
@@ -1,6 +1,12 @@
-from flask import Blueprint, request, jsonify
-from src.services.subir_data_service import SubirDataService
-from src.schemas.data_schema import DataSchema
+import os
+import json
+from datetime import timezone
+from functools import wraps
+from flask import Blueprint, Response, request, jsonify, current_app, url_for, stream_with_context
+from werkzeug.exceptions import HTTPException
+from src.services.subir_data_service import SubirDataService, HISTORIAL_LIMITE, FORMATO_NDJSON, FORMATO_CSV
+from src.services.chunked_upload_service import ChunkedUploadService
+from src.schemas.data_schema import DataSchema, DataStatsSchema
 from src.errors.errors import BadRequest, APIError
 import logging
 
@@ -9,6 +15,102 @@ logger = logging.getLogger(__name__)
 
 bp = Blueprint('subir_data', __name__)
 
+def _flag(nombre, config_key):
+    """Lee un flag booleano del query string, con valor por defecto desde la configuración"""
+    valor = request.args.get(nombre)
+    if valor is None:
+        return bool(current_app.config.get(config_key, False))
+    return valor.lower() in ('1', 'true', 'yes', 'si')
+
+def _opciones_carga():
+    """Opciones de carga comunes (forzar, mode) leídas del query string"""
+    return {
+        'forzar': _flag('forzar', 'UPLOAD_FORCE_RELOAD'),
+        'modo': request.args.get('mode', current_app.config.get('UPLOAD_DEFAULT_MODE', 'replace'))
+    }
+
+def _condicional(vista):
+    """
+    Lecturas que solo cambian con la generación de los datos: la respuesta
+    lleva ETag y Last-Modified de la generación y, si el cliente ya la tiene
+    (If-None-Match, o If-Modified-Since sin él), se responde 304 sin consultar
+    los datos. La generación se lee antes que los datos: si una carga termina
+    entre medio, el cliente recibe la etiqueta anterior y vuelve a pedirlos.
+    """
+    @wraps(vista)
+    def _vista(*args, **kwargs):
+        try:
+            numero, modificado = SubirDataService().obtener_generacion()
+        except Exception as e:
+            logger.warning(f"No se pudo leer la generación de los datos: {str(e)}")
+            return vista(*args, **kwargs)
+        
+        etag = f'gen-{numero}'
+        if modificado is not None:
+            # Los timestamps se guardan en hora local; HTTP usa UTC con precisión de segundos
+            modificado = modificado.astimezone(timezone.utc).replace(microsecond=0)
+        
+        if request.if_none_match:
+            vigente = request.if_none_match.contains_weak(etag)
+        else:
+            desde = request.if_modified_since
+            vigente = modificado is not None and desde is not None and modificado <= desde
+        
+        if vigente:
+            respuesta, status = Response(status=304), 304
+        else:
+            respuesta, status = vista(*args, **kwargs)
+            if status != 200:
+                return respuesta, status
+        
+        respuesta.set_etag(etag)
+        respuesta.last_modified = modificado
+        # El cliente puede guardar la respuesta, pero debe revalidarla en cada request
+        respuesta.cache_control.no_cache = True
+        return respuesta, status
+    
+    return _vista
+
+def _respuesta_job(job):
+    """Respuesta 202 de una carga encolada"""
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('subir_data.get_upload_job', job_id=job.id),
+        'events_url': url_for('subir_data.get_upload_events', job_id=job.id)
+    }), 202
+
+def _evento_sse(evento):
+    """Formatea un evento de UploadJobService.eventos como Server-Sent Event"""
+    if evento is None:
+        # Comentario: mantiene viva la conexión a través de proxies
+        return ': keepalive\n\n'
+    nombre, datos = evento
+    return f'event: {nombre}\ndata: {json.dumps(datos, default=str)}\n\n'
+
+def _respuesta_carga(resultado):
+    """Respuesta 200 de una carga procesada"""
+    logger.info(f"Archivo procesado exitosamente: {resultado['registros_procesados']} registros")
+    
+    return jsonify({
+        'success': True,
+        'message': resultado['mensaje'],
+        'registros_procesados': resultado['registros_procesados'],
+        'sin_cambios': resultado.get('sin_cambios', False),
+        'upload_id': resultado.get('upload_id'),
+        'registros_agregados': resultado.get('registros_agregados'),
+        'registros_eliminados': resultado.get('registros_eliminados'),
+        'registros_sin_cambios': resultado.get('registros_sin_cambios'),
+        'registros_omitidos': resultado.get('registros_omitidos'),
+        'backend': resultado.get('backend'),
+        'meses': resultado.get('meses'),
+        'lineas_leidas': resultado.get('lineas_leidas'),
+        'tiempos': resultado.get('tiempos'),
+        'duracion_segundos': resultado.get('duracion_segundos'),
+        'registros_por_segundo': resultado.get('registros_por_segundo')
+    }), 200
+
 @bp.route('/ping', methods=['GET'])
 def ping():
     """Endpoint de salud del microservicio"""
@@ -20,64 +122,424 @@ def upload():
     API para procesar la carga y procesamiento del archivo DATA.txt
     POST /upload - Procesamiento del archivo
     Content-Type: multipart/form-data
+    
+    Query params:
+    - stream: si es true, las líneas se procesan directamente desde el
+      cuerpo de la request, sin guardar el archivo en disco antes
+    - archivar: en modo stream, copia además el archivo crudo a uploads/
+    - async: si es true, responde 202 con un job id y procesa en segundo plano
+    - forzar: recarga aunque el archivo sea idéntico a la carga actual
+    - mode: 'replace' (por defecto) reemplaza todos los datos; 'diff' aplica
+      solo las diferencias con los datos actuales; 'append' agrega solo las
+      marcaciones que no existen; 'months' reemplaza solo los meses
+      presentes en el archivo
     """
     try:
-        # Obtener archivo del request
-        file = request.files.get('file')
-        
-        if not file:
-            raise BadRequest('No se ha proporcionado ningún archivo')
-        
         # Instanciar servicio
         service = SubirDataService()
+        opciones = _opciones_carga()
+        
+        if _flag('async', 'UPLOAD_ASYNC'):
+            file = request.files.get('file')
+            
+            if not file:
+                raise BadRequest('No se ha proporcionado ningún archivo')
+            
+            job = current_app.extensions['upload_jobs'].encolar(file, **opciones)
+            logger.info(f"Carga encolada como job {job.id}: {file.filename}")
+            
+            return _respuesta_job(job)
+        
+        if _flag('stream', 'UPLOAD_STREAMING'):
+            # No se accede a request.files: eso consumiría el stream completo
+            logger.info("Procesando archivo en modo streaming")
+            resultado = service.leer_stream(
+                request.stream,
+                request.content_type,
+                archivar=_flag('archivar', 'UPLOAD_STREAM_ARCHIVE'),
+                **opciones
+            )
+        else:
+            # Obtener archivo del request
+            file = request.files.get('file')
+            
+            if not file:
+                raise BadRequest('No se ha proporcionado ningún archivo')
+            
+            # Guardar archivo
+            logger.info(f"Guardando archivo: {file.filename}")
+            path = service.guardar(file)
+            
+            logger.info(f"Procesando archivo: {path}")
+            resultado = service.leer_txt(path, **opciones)
+        
+        return _respuesta_carga(resultado)
+        
+    except BadRequest as e:
+        logger.error(f"Error de validación: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 400
+        
+    except APIError as e:
+        logger.error(f"Error de carga: {e.description}")
+        return jsonify({'success': False, 'error': e.description}), e.code
+        
+    except HTTPException:
+        # Ej. 413 al leer en streaming un cuerpo que supera MAX_CONTENT_LENGTH
+        raise
+        
+    except Exception as e:
+        logger.error(f"Error interno: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error interno del servidor'}), 500
+
+@bp.route('/upload/validate', methods=['POST'])
+def validate_upload():
+    """
+    API para validar un archivo DATA.TXT sin cargarlo (dry run)
+    POST /upload/validate
+    Content-Type: multipart/form-data
+    
+    Recorre el archivo una sola vez desde el stream de la request, sin
+    escribir en la BD, y reporta todas las líneas inválidas con su número
+    de línea y motivo (hasta max_errores, por defecto UPLOAD_VALIDATE_MAX_ERRORS).
+    """
+    try:
+        max_errores = request.args.get('max_errores', type=int)
+        if max_errores is not None and max_errores < 0:
+            raise BadRequest('max_errores debe ser un entero mayor o igual a 0')
+        
+        reporte = SubirDataService().validar_stream(request.stream, request.content_type, max_errores)
+        logger.info(
+            f"Validación de {reporte['filename']}: {reporte['total_errores']} errores en {reporte['lineas_leidas']} líneas"
+        )
+        
+        return jsonify({'success': True, **reporte}), 200
+        
+    except APIError as e:
+        logger.error(f"Error de validación: {e.description}")
+        return jsonify({'success': False, 'error': e.description}), e.code
+        
+    except HTTPException:
+        # Ej. 413 si el cuerpo supera MAX_CONTENT_LENGTH
+        raise
+        
+    except Exception as e:
+        logger.error(f"Error interno validando archivo: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error interno del servidor'}), 500
+
+@bp.route('/upload/chunked', methods=['POST'])
+def iniciar_carga_por_partes():
+    """
+    API para iniciar una carga por partes (archivos mayores a MAX_CONTENT_LENGTH)
+    POST /upload/chunked
+    Body JSON: {"filename": "DATA.TXT", "total_chunks": 40, "total_size": 640000000, "sha256": "..."}
+    total_size y sha256 son opcionales; si se entregan se verifican al completar.
+    """
+    try:
+        body = request.get_json(silent=True) or {}
+        estado = ChunkedUploadService().iniciar(
+            body.get('filename'),
+            body.get('total_chunks'),
+            total_size=body.get('total_size'),
+            sha256=body.get('sha256')
+        )
+        
+        return jsonify({'success': True, 'upload': estado}), 201
+        
+    except APIError as e:
+        return jsonify({'success': False, 'error': e.description}), e.code
+        
+    except HTTPException:
+        # Ej. 413 si el cuerpo supera MAX_CONTENT_LENGTH
+        raise
+        
+    except Exception as e:
+        logger.error(f"Error iniciando carga por partes: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error interno del servidor'}), 500
+
+@bp.route('/upload/chunked/<upload_id>/<int:numero>', methods=['PUT'])
+def subir_chunk(upload_id, numero):
+    """
+    API para enviar un chunk (numerado desde 0)
+    PUT /upload/chunked/<upload_id>/<numero>
+    Body: bytes del chunk. Header X-Chunk-SHA256: SHA-256 hexadecimal del chunk.
+    Reenviar un chunk ya aceptado es idempotente.
+    """
+    try:
+        estado = ChunkedUploadService().recibir_chunk(
+            upload_id, numero, request.stream, request.headers.get('X-Chunk-SHA256')
+        )
+        
+        return jsonify({'success': True, 'upload': estado}), 200
+        
+    except APIError as e:
+        logger.error(f"Error recibiendo chunk {numero} de {upload_id}: {e.description}")
+        return jsonify({'success': False, 'error': e.description}), e.code
+        
+    except HTTPException:
+        # Ej. 413 si el cuerpo supera MAX_CONTENT_LENGTH
+        raise
+        
+    except Exception as e:
+        logger.error(f"Error interno recibiendo chunk: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error interno del servidor'}), 500
+
+@bp.route('/upload/chunked/<upload_id>', methods=['GET'])
+def estado_carga_por_partes(upload_id):
+    """
+    API para consultar una carga por partes (para reanudarla)
+    GET /upload/chunked/<upload_id> - Chunks recibidos y siguiente_chunk a enviar
+    """
+    try:
+        return jsonify({'success': True, 'upload': ChunkedUploadService().estado(upload_id)}), 200
+        
+    except APIError as e:
+        return jsonify({'success': False, 'error': e.description}), e.code
+        
+    except HTTPException:
+        # Ej. 413 si el cuerpo supera MAX_CONTENT_LENGTH
+        raise
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo carga por partes: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error interno del servidor'}), 500
+
+@bp.route('/upload/chunked/<upload_id>', methods=['DELETE'])
+def cancelar_carga_por_partes(upload_id):
+    """
+    API para cancelar una carga por partes
+    DELETE /upload/chunked/<upload_id> - Elimina los chunks recibidos
+    """
+    try:
+        ChunkedUploadService().descartar(upload_id)
         
-        # Guardar archivo
-        logger.info(f"Guardando archivo: {file.filename}")
-        path = service.guardar(file)
+        return jsonify({'success': True}), 200
         
-        logger.info(f"Procesando archivo: {path}")
-        resultado = service.leer_txt(path)
+    except APIError as e:
+        return jsonify({'success': False, 'error': e.description}), e.code
         
-        logger.info(f"Archivo procesado exitosamente: {resultado['registros_procesados']} registros")
+    except HTTPException:
+        # Ej. 413 si el cuerpo supera MAX_CONTENT_LENGTH
+        raise
+        
+    except Exception as e:
+        logger.error(f"Error cancelando carga por partes: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error interno del servidor'}), 500
+
+@bp.route('/upload/chunked/<upload_id>/complete', methods=['POST'])
+def completar_carga_por_partes(upload_id):
+    """
+    API para procesar una carga por partes una vez enviados todos los chunks
+    POST /upload/chunked/<upload_id>/complete
+    
+    Acepta los mismos query params que /upload: forzar, mode y async.
+    """
+    try:
+        chunked = ChunkedUploadService()
+        opciones = _opciones_carga()
+        path = chunked.completar(upload_id)
+        filename = os.path.basename(path)
+        
+        if _flag('async', 'UPLOAD_ASYNC'):
+            job = current_app.extensions['upload_jobs'].encolar_archivo(path, filename, **opciones)
+            chunked.descartar(upload_id)
+            logger.info(f"Carga por partes {upload_id} encolada como job {job.id}")
+            
+            return _respuesta_job(job)
+        
+        try:
+            logger.info(f"Procesando carga por partes {upload_id}")
+            resultado = SubirDataService().leer_txt(path, **opciones)
+        finally:
+            chunked.descartar(upload_id)
+        
+        return _respuesta_carga(resultado)
+        
+    except APIError as e:
+        logger.error(f"Error completando carga por partes: {e.description}")
+        return jsonify({'success': False, 'error': e.description}), e.code
+        
+    except HTTPException:
+        # Ej. 413 si el cuerpo supera MAX_CONTENT_LENGTH
+        raise
+        
+    except Exception as e:
+        logger.error(f"Error interno: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error interno del servidor'}), 500
+
+@bp.route('/upload/jobs/<int:job_id>', methods=['GET'])
+def get_upload_job(job_id):
+    """
+    API endpoint para consultar el estado de una carga asíncrona
+    GET /upload/jobs/<id> - Estado, registros procesados, throughput y errores
+    """
+    try:
+        estado = current_app.extensions['upload_jobs'].estado(job_id)
+        
+        return jsonify({'success': True, 'job': estado}), 200
+        
+    except APIError as e:
+        return jsonify({'success': False, 'error': e.description}), e.code
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo estado del job: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error obteniendo estado del job'}), 500
+
+@bp.route('/upload/<int:job_id>/events', methods=['GET'])
+def get_upload_events(job_id):
+    """
+    API endpoint de progreso en vivo de una carga asíncrona (Server-Sent Events)
+    GET /upload/<id>/events - text/event-stream
+    
+    Eventos:
+    - progress: líneas leídas, registros procesados, throughput, porcentaje y ETA
+    - done: estado final del job (success o error); luego se cierra el stream
+    """
+    try:
+        eventos = current_app.extensions['upload_jobs'].eventos(
+            job_id, keepalive=current_app.config.get('UPLOAD_EVENTS_KEEPALIVE', 15)
+        )
+        
+        return Response(
+            stream_with_context(_evento_sse(evento) for evento in eventos),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except APIError as e:
+        return jsonify({'success': False, 'error': e.description}), e.code
+        
+    except Exception as e:
+        logger.error(f"Error abriendo eventos del job: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error obteniendo estado del job'}), 500
+
+@bp.route('/uploads', methods=['GET'])
+def get_uploads():
+    """
+    API endpoint para obtener el historial de cargas
+    GET /uploads - Cargas de la más reciente a la más antigua, con su
+    resultado, líneas leídas, registros/s y tiempo por fase
+    
+    Query params:
+    - limit: cantidad de cargas (por defecto 50, máximo 500)
+    - offset: cargas a omitir desde la más reciente
+    - status: solo las cargas en ese estado (pending, running, success, error)
+    """
+    try:
+        service = SubirDataService()
+        historial = service.obtener_historial_cargas(
+            request.args.get('limit', HISTORIAL_LIMITE, type=int),
+            request.args.get('offset', 0, type=int),
+            request.args.get('status')
+        )
         
         return jsonify({
             'success': True,
-            'message': resultado['mensaje'],
-            'registros_procesados': resultado['registros_procesados']
+            'uploads': historial['uploads'],
+            'total_uploads': historial['total']
         }), 200
         
     except BadRequest as e:
-        logger.error(f"Error de validación: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 400
         
     except Exception as e:
-        logger.error(f"Error interno: {str(e)}")
-        return jsonify({'success': False, 'error': 'Error interno del servidor'}), 500
+        logger.error(f"Error obteniendo historial de cargas: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error obteniendo historial de cargas'}), 500
 
 @bp.route('/data', methods=['GET'])
+@_condicional
 def get_data():
     """
-    API endpoint para obtener todos los datos de marcaciones
-    GET /data - Obtener todos los registros cargados
+    API endpoint para obtener los datos de marcaciones, paginados
+    GET /data - Registros ordenados por fecha, hora e id
+    
+    Query params:
+    - limit: registros por página (por defecto DATA_PAGE_SIZE, máximo DATA_PAGE_MAX_SIZE)
+    - after: next_cursor de la página anterior; sin él se entrega la primera
+    - rut: solo los registros de ese RUT
+    - fecha_desde, fecha_hasta: rango de fechas yyyy/MM/dd (inclusive)
+    - hora_desde, hora_hasta: rango de horas HH:mm (inclusive)
+    
+    La paginación es por cursor (keyset): cada página cuesta lo mismo sin
+    importar cuántas se recorrieron antes. has_more indica si hay más páginas.
+    
+    Como /data/rut, /ruts y /stats, responde con ETag de la generación de los
+    datos y 304 si el cliente ya la tiene (If-None-Match).
     """
     try:
         service = SubirDataService()
-        all_data = service.obtener_todos_los_datos()
-        
-        schema = DataSchema(many=True)
-        data_serialized = schema.dump(all_data)
+        pagina = service.obtener_pagina_datos(
+            limite=request.args.get('limit', type=int),
+            cursor=request.args.get('after'),
+            rut=request.args.get('rut'),
+            fecha_desde=request.args.get('fecha_desde'),
+            fecha_hasta=request.args.get('fecha_hasta'),
+            hora_desde=request.args.get('hora_desde'),
+            hora_hasta=request.args.get('hora_hasta')
+        )
         
         return jsonify({
             'success': True,
-            'data': data_serialized,
-            'total_records': len(data_serialized)
+            'data': pagina['data'],
+            'total_records': len(pagina['data']),
+            'next_cursor': pagina['next_cursor'],
+            'has_more': pagina['has_more']
         }), 200
         
+    except BadRequest as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+        
     except Exception as e:
         logger.error(f"Error obteniendo datos: {str(e)}")
         return jsonify({'success': False, 'error': 'Error obteniendo datos'}), 500
 
+@bp.route('/data/export', methods=['GET'])
+def export_data():
+    """
+    API endpoint para exportar todas las marcaciones en streaming
+    GET /data/export - Descarga ordenada por id, con memoria acotada
+    
+    Query params:
+    - format: 'ndjson' (por defecto) o 'csv'
+    - gzip: si es true, el archivo se entrega comprimido (.gz)
+    - rut, fecha_desde, fecha_hasta: mismos filtros que /data
+    
+    Las filas se leen con un cursor del servidor y se envían a medida que se
+    formatean: la respuesta empieza de inmediato y no se arma en memoria.
+    """
+    try:
+        formato = request.args.get('format', FORMATO_NDJSON)
+        comprimir = _flag('gzip', 'DATA_EXPORT_GZIP')
+        trozos = SubirDataService().exportar_datos(
+            formato,
+            comprimir=comprimir,
+            rut=request.args.get('rut'),
+            fecha_desde=request.args.get('fecha_desde'),
+            fecha_hasta=request.args.get('fecha_hasta')
+        )
+        
+        filename = f'marcaciones.{formato}' + ('.gz' if comprimir else '')
+        mimetype = 'application/gzip' if comprimir else (
+            'text/csv' if formato == FORMATO_CSV else 'application/x-ndjson'
+        )
+        
+        return Response(
+            stream_with_context(trozos),
+            mimetype=mimetype,
+            headers={
+                'Content-Disposition': f'attachment; filename={filename}',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+        
+    except BadRequest as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+        
+    except Exception as e:
+        logger.error(f"Error exportando datos: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error exportando datos'}), 500
+
 @bp.route('/data/rut/<rut>', methods=['GET'])
+@_condicional
 def get_data_by_rut(rut):
     """
     API endpoint para obtener datos por RUT específico
@@ -101,7 +563,28 @@ def get_data_by_rut(rut):
         logger.error(f"Error obteniendo datos por RUT: {str(e)}")
         return jsonify({'success': False, 'error': 'Error obteniendo datos'}), 500
 
+@bp.route('/data/mes/<mes>', methods=['DELETE'])
+def delete_data_month(mes):
+    """
+    API endpoint para eliminar todas las marcaciones de un mes
+    DELETE /data/mes/<yyyy-MM> - Con particiones por mes es un TRUNCATE PARTITION
+    """
+    try:
+        service = SubirDataService()
+        resultado = service.purgar_mes(mes)
+        logger.info(f"Mes {resultado['mes']} eliminado: {resultado['registros_eliminados']} registros")
+        
+        return jsonify({'success': True, **resultado}), 200
+        
+    except BadRequest as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+        
+    except Exception as e:
+        logger.error(f"Error eliminando mes: {str(e)}")
+        return jsonify({'success': False, 'error': 'Error eliminando datos del mes'}), 500
+
 @bp.route('/ruts', methods=['GET'])
+@_condicional
 def get_distinct_ruts():
     """
     API endpoint para obtener todos los RUTs únicos
@@ -122,25 +605,22 @@ def get_distinct_ruts():
         return jsonify({'success': False, 'error': 'Error obteniendo RUTs'}), 500
 
 @bp.route('/stats', methods=['GET'])
+@_condicional
 def get_stats():
     """
     API endpoint para obtener estadísticas de los datos cargados
-    GET /stats - Obtener estadísticas generales
+    GET /stats - Total de registros y empleados, rango de fechas, última
+    carga y registros por día
     """
     try:
         service = SubirDataService()
         
         # Obtener estadísticas
-        total_records = len(service.obtener_todos_los_datos())
-        total_employees = len(service.obtener_ruts_distintos())
+        stats = DataStatsSchema().dump(service.obtener_estadisticas())
         
         return jsonify({
             'success': True,
-            'stats': {
-                'total_records': total_records,
-                'total_employees': total_employees,
-                'service_status': 'active'
-            }
+            'stats': {**stats, 'service_status': 'active'}
         }), 200
         
     except Exception as e:
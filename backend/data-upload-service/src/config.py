@@ -14,18 +14,91 @@ class Config:
         'pool_pre_ping': True,
         'pool_recycle': 300,
         'pool_timeout': 20,
-        'max_overflow': 0
+        'max_overflow': 0,
+        # Necesario para LOAD DATA LOCAL INFILE (UPLOAD_BACKEND=load_data)
+        'connect_args': {'local_infile': os.getenv('UPLOAD_BACKEND', 'insert') == 'load_data'}
     }
     
     # Configuración de Flask
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     
     # Configuración de archivos
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB máximo
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB máximo (tamaño subido)
+    # Máximo del contenido descomprimido de DATA.TXT.gz / .bz2 / .xz
+    UPLOAD_MAX_DECOMPRESSED_SIZE = int(os.getenv('UPLOAD_MAX_DECOMPRESSED_SIZE', 1024 * 1024 * 1024))
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
     ALLOWED_EXTENSIONS = {'txt'}
     ALLOWED_FILENAME = 'DATA.TXT'
     
+    # Carga masiva de marcaciones
+    UPLOAD_BATCH_SIZE = int(os.getenv('UPLOAD_BATCH_SIZE', 5000))
+    UPLOAD_COMMIT_MODE = os.getenv('UPLOAD_COMMIT_MODE', 'file')  # 'file' o 'batch'
+    UPLOAD_REPLACE_STRATEGY = os.getenv('UPLOAD_REPLACE_STRATEGY', 'swap')  # 'swap' o 'delete'
+    UPLOAD_DEFAULT_MODE = os.getenv('UPLOAD_DEFAULT_MODE', 'replace')  # 'replace', 'diff', 'append' o 'months'
+    UPLOAD_BACKEND = os.getenv('UPLOAD_BACKEND', 'insert')  # 'insert' o 'load_data' (solo MySQL)
+    
+    # Almacenamiento de data: 'text' (VARCHAR) o 'compact' (DATE, minutos en SMALLINT y
+    # RUT como entero). Cambiarlo requiere recrear la tabla data (ver init.sql)
+    DATA_STORAGE = os.getenv('DATA_STORAGE', 'text')
+    
+    # Particionar data por mes (RANGE COLUMNS sobre fecha, solo MySQL): las consultas por
+    # fecha leen solo las particiones del rango y un mes se reemplaza o elimina completo
+    DATA_PARTITIONING = os.getenv('DATA_PARTITIONING', 'false').lower() == 'true'
+    
+    # Lectura/validación en un hilo aparte, solapada con la escritura en BD (cola de N lotes)
+    UPLOAD_PIPELINE = os.getenv('UPLOAD_PIPELINE', 'true').lower() == 'true'
+    UPLOAD_PIPELINE_DEPTH = int(os.getenv('UPLOAD_PIPELINE_DEPTH', 4))
+    
+    # Deduplicación: un archivo idéntico (SHA-256) a la carga actual no se recarga
+    UPLOAD_DEDUP = os.getenv('UPLOAD_DEDUP', 'true').lower() == 'true'
+    
+    # Lector de archivos guardados sin comprimir: 'text' (línea a línea como str) o
+    # 'mmap' (recorre el archivo mapeado en memoria en bytes, decodificando solo los campos)
+    UPLOAD_PARSER = os.getenv('UPLOAD_PARSER', 'text')
+    
+    # Validación en paralelo de archivos grandes (0 o 1 = deshabilitada)
+    UPLOAD_PARSE_WORKERS = int(os.getenv('UPLOAD_PARSE_WORKERS', 0))
+    UPLOAD_PARSE_RANGE_SIZE = int(os.getenv('UPLOAD_PARSE_RANGE_SIZE', 8 * 1024 * 1024))
+    
+    # Cargas asíncronas (POST /upload?async=true)
+    UPLOAD_ASYNC = os.getenv('UPLOAD_ASYNC', 'false').lower() == 'true'
+    UPLOAD_JOB_WORKERS = int(os.getenv('UPLOAD_JOB_WORKERS', 1))
+    UPLOAD_JOB_QUEUE_SIZE = int(os.getenv('UPLOAD_JOB_QUEUE_SIZE', 4))
+    
+    # Al iniciar, retomar cargas interrumpidas (desde su checkpoint si UPLOAD_COMMIT_MODE=batch)
+    UPLOAD_RESUME_ON_STARTUP = os.getenv('UPLOAD_RESUME_ON_STARTUP', 'true').lower() == 'true'
+    UPLOAD_RESUME_STALE_SECONDS = int(os.getenv('UPLOAD_RESUME_STALE_SECONDS', 300))
+    # Cada cuántos segundos se vuelven a buscar cargas interrumpidas (0 = solo al iniciar)
+    UPLOAD_RESUME_INTERVAL_SECONDS = int(os.getenv('UPLOAD_RESUME_INTERVAL_SECONDS', 60))
+    
+    # Carga en streaming (sin escribir DATA.TXT en disco antes de procesarlo)
+    UPLOAD_STREAMING = os.getenv('UPLOAD_STREAMING', 'false').lower() == 'true'
+    UPLOAD_STREAM_ARCHIVE = os.getenv('UPLOAD_STREAM_ARCHIVE', 'false').lower() == 'true'
+    
+    # Progreso de las cargas asíncronas: cada cuántas líneas se informa y
+    # segundos sin cambios antes de enviar un keepalive en GET /upload/<id>/events
+    UPLOAD_PROGRESS_EVERY_LINES = int(os.getenv('UPLOAD_PROGRESS_EVERY_LINES', 10000))
+    UPLOAD_EVENTS_KEEPALIVE = int(os.getenv('UPLOAD_EVENTS_KEEPALIVE', 15))
+    
+    # Paginación de GET /data (keyset sobre fecha, hora, id): filas por página por defecto y máximo
+    DATA_PAGE_SIZE = int(os.getenv('DATA_PAGE_SIZE', 1000))
+    DATA_PAGE_MAX_SIZE = int(os.getenv('DATA_PAGE_MAX_SIZE', 10000))
+    
+    # Exportación (GET /data/export): filas leídas del cursor por lote y si se comprime por defecto
+    DATA_EXPORT_BATCH_SIZE = int(os.getenv('DATA_EXPORT_BATCH_SIZE', 2000))
+    DATA_EXPORT_GZIP = os.getenv('DATA_EXPORT_GZIP', 'false').lower() == 'true'
+    
+    # Segundos que cada proceso usa la generación de los datos (ETag de /data, /ruts y /stats)
+    # sin volver a leerla de la BD; las cargas de otro proceso se ven a lo más ese tiempo después
+    DATA_GENERATION_TTL = float(os.getenv('DATA_GENERATION_TTL', 5))
+    
+    # Validación sin carga (POST /upload/validate): máximo de errores detallados en el reporte
+    UPLOAD_VALIDATE_MAX_ERRORS = int(os.getenv('UPLOAD_VALIDATE_MAX_ERRORS', 1000))
+    
+    # Cargas por partes (POST /upload/chunked): cada chunk está limitado por MAX_CONTENT_LENGTH
+    UPLOAD_CHUNKED_MAX_SIZE = int(os.getenv('UPLOAD_CHUNKED_MAX_SIZE', 2 * 1024 * 1024 * 1024))
+    UPLOAD_CHUNK_TTL = int(os.getenv('UPLOAD_CHUNK_TTL', 24 * 60 * 60))  # segundos sin actividad
+    
     # Configuración de logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     
@@ -57,6 +130,9 @@ class TestingConfig(Config):
     
     # SQLite no soporta estas opciones del motor
     SQLALCHEMY_ENGINE_OPTIONS = {}
+    
+    # Las pruebas retoman cargas explícitamente
+    UPLOAD_RESUME_ON_STARTUP = False
 
 # Configuración según el entorno
 config = {
@@ -15,4 +15,8 @@ class NotFound(APIError):
 
 class Forbidden(APIError):
     code = 403
-    description = 'Forbidden'
\ No newline at end of file
+    description = 'Forbidden'
+
+class ServiceUnavailable(APIError):
+    code = 503
+    description = 'Service unavailable'
\ No newline at end of file
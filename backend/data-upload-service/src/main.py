@@ -6,6 +6,9 @@ from flask_cors import CORS
 from sqlalchemy import text
 from src.database import db, migrate
 from src.blueprints.subir_data_controller import bp as subir_bp
+from src.services.upload_job_service import init_upload_jobs
+from src.services.data_generation import init_data_generation
+from src.repositories.data_repository import DataRepository
 from src.errors.errors import APIError, BadRequest, NotFound, Forbidden
 from src.config import config
 
@@ -34,6 +37,12 @@ def create_app(config_name=None):
     # Registrar blueprints
     app.register_blueprint(subir_bp)
     
+    # Pool de cargas asíncronas
+    init_upload_jobs(app)
+    
+    # Generación de los datos (ETag de las lecturas)
+    init_data_generation(app)
+    
     # Crear tablas si no existen
     with app.app_context():
         try:
@@ -41,6 +50,24 @@ def create_app(config_name=None):
             app.logger.info("Tablas de base de datos creadas/verificadas")
         except Exception as e:
             app.logger.error(f"Error creando tablas: {str(e)}")
+        
+        # Particionar data por mes (DATA_PARTITIONING, solo MySQL)
+        try:
+            if DataRepository.supports_partitions() and DataRepository.partition_table():
+                app.logger.info("Tabla data particionada por mes")
+        except Exception as e:
+            app.logger.error(f"Error particionando la tabla data: {str(e)}")
+        
+        # Retomar cargas interrumpidas por un reinicio, ahora y cada UPLOAD_RESUME_INTERVAL_SECONDS
+        if app.config.get('UPLOAD_RESUME_ON_STARTUP', True):
+            try:
+                app.extensions['upload_jobs'].reanudar_interrumpidas()
+            except Exception as e:
+                app.logger.error(f"Error retomando cargas interrumpidas: {str(e)}")
+            
+            intervalo = app.config.get('UPLOAD_RESUME_INTERVAL_SECONDS', 60)
+            if intervalo > 0:
+                app.extensions['upload_jobs'].vigilar_interrumpidas(intervalo)
     
     # Manejadores de errores
     register_error_handlers(app)
@@ -96,7 +123,7 @@ def register_error_handlers(app):
     def handle_file_too_large(e):
         return jsonify({
             'success': False,
-            'error': 'Archivo demasiado grande. Máximo 16MB.',
+            'error': f"Archivo demasiado grande. Máximo {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)}MB.",
             'code': 413
         }), 413
 
@@ -113,8 +140,15 @@ def register_additional_routes(app):
             'description': 'Microservicio para carga y procesamiento de archivos de marcaciones',
             'endpoints': {
                 'upload': 'POST /upload',
+                'upload_validate': 'POST /upload/validate',
+                'upload_events': 'GET /upload/<id>/events',
+                'upload_job_status': 'GET /upload/jobs/<id>',
+                'get_uploads': 'GET /uploads',
+                'upload_chunked': 'POST /upload/chunked, PUT /upload/chunked/<id>/<n>, POST /upload/chunked/<id>/complete',
                 'get_data': 'GET /data',
+                'export_data': 'GET /data/export?format=ndjson|csv',
                 'get_data_by_rut': 'GET /data/rut/<rut>',
+                'delete_data_month': 'DELETE /data/mes/<yyyy-MM>',
                 'get_ruts': 'GET /ruts',
                 'get_stats': 'GET /stats',
                 'health': 'GET /ping',
@@ -1,11 +1,22 @@
 from src.database import db
+from src.config import Config
+from src.models.types import FechaCompacta, HoraCompacta, RutCompacto
+
+# DATA_STORAGE = 'compact' guarda fecha como DATE, hora como minutos (SMALLINT) y
+# rut como entero; la aplicación sigue viendo los mismos strings. Define el
+# tipo de las columnas, por eso se lee al importar el modelo.
+ALMACENAMIENTO_COMPACTO = Config.DATA_STORAGE == 'compact'
 
 class Data(db.Model):
     __tablename__ = 'data'
+    __table_args__ = (
+        # Una marcación es única por empleado, fecha y hora
+        db.UniqueConstraint('rut', 'fecha', 'hora', name='uq_data_rut_fecha_hora'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    fecha = db.Column(db.String(10), nullable=False)
-    hora = db.Column(db.String(5), nullable=False)
-    rut = db.Column(db.String(12), nullable=False)
+    fecha = db.Column(FechaCompacta() if ALMACENAMIENTO_COMPACTO else db.String(10), nullable=False)
+    hora = db.Column(HoraCompacta() if ALMACENAMIENTO_COMPACTO else db.String(5), nullable=False)
+    rut = db.Column(RutCompacto() if ALMACENAMIENTO_COMPACTO else db.String(12), nullable=False)
 
     def __repr__(self):
         return f"<Data {self.fecha} {self.hora} {self.rut}>"
\ No newline at end of file
@@ -0,0 +1,17 @@
+from datetime import datetime
+from src.database import db
+
+class DataGeneration(db.Model):
+    """
+    Generación de los datos visibles en data: un contador (una sola fila) que
+    aumenta cada vez que una carga o una purga cambia data. Las lecturas lo
+    usan como ETag / Last-Modified.
+    """
+    __tablename__ = 'data_generation'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.now)
+    
+    def __repr__(self):
+        return f"<DataGeneration {self.generation}>"
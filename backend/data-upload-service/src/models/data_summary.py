@@ -0,0 +1,22 @@
+from datetime import datetime
+from src.database import db
+
+class DataSummary(db.Model):
+    """
+    Resumen de los datos de una generación (una carga exitosa de upload_logs),
+    calculado una vez al importar: /stats y /ruts lo leen en vez de recorrer data.
+    """
+    __tablename__ = 'data_summary'
+    
+    upload_log_id = db.Column(db.Integer, db.ForeignKey('upload_logs.id'), primary_key=True)
+    total_records = db.Column(db.Integer, nullable=False, default=0)
+    total_employees = db.Column(db.Integer, nullable=False, default=0)
+    fecha_min = db.Column(db.String(10))
+    fecha_max = db.Column(db.String(10))
+    # {fecha: registros} y {rut: registros}
+    records_per_day = db.Column(db.JSON, nullable=False, default=dict)
+    records_per_rut = db.Column(db.JSON, nullable=False, default=dict)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    
+    def __repr__(self):
+        return f"<DataSummary {self.upload_log_id} {self.total_records}>"
@@ -0,0 +1,85 @@
+from datetime import date
+from sqlalchemy.types import TypeDecorator, Date, SmallInteger, Integer
+
+# Dígito verificador del RUT: 0-9 y K (10)
+DIGITOS_VERIFICADORES = '0123456789K'
+
+
+def rut_canonico(rut):
+    """
+    RUT xxxxxxxx-x ya validado tal como lo devuelve RutCompacto: sin ceros a la
+    izquierda en el cuerpo y con K mayúscula ('01234567-k' -> '1234567-K').
+    """
+    cuerpo, _, digito = rut.partition('-')
+    return f'{int(cuerpo)}-{digito.upper()}'
+
+
+class FechaCompacta(TypeDecorator):
+    """
+    Fecha yyyy/MM/dd guardada como DATE (3 bytes en MySQL en vez de VARCHAR(10)).
+    Hacia la aplicación se sigue entregando el string yyyy/MM/dd.
+    """
+    impl = Date
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, date):
+            return value
+        try:
+            return date(int(value[:4]), int(value[5:7]), int(value[8:10]))
+        except (TypeError, ValueError):
+            # Un valor que no es una fecha (ej. en un filtro) no coincide con ninguna fila
+            return None
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return f'{value.year:04d}/{value.month:02d}/{value.day:02d}'
+
+
+class HoraCompacta(TypeDecorator):
+    """
+    Hora HH:mm guardada como minutos desde medianoche en un SMALLINT (2 bytes).
+    Hacia la aplicación se sigue entregando el string HH:mm.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return int(value[:2]) * 60 + int(value[3:5])
+        except (TypeError, ValueError):
+            return None
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return f'{value // 60:02d}:{value % 60:02d}'
+
+
+class RutCompacto(TypeDecorator):
+    """
+    RUT xxxxxxxx-x guardado como un INTEGER (4 bytes): cuerpo * 11 + dígito
+    verificador (K = 10). El orden del entero es el del cuerpo numérico.
+    Hacia la aplicación se entrega el string xxxxxxxx-x (con K mayúscula).
+    La conversión pierde los ceros a la izquierda y la k minúscula: al leer
+    se obtiene rut_canonico del valor guardado.
+    """
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        cuerpo, _, digito = value.partition('-')
+        digito = DIGITOS_VERIFICADORES.find(digito.upper()) if len(digito) == 1 else -1
+        if not cuerpo.isdigit() or len(cuerpo) > 8 or digito < 0:
+            return None
+        return int(cuerpo) * 11 + digito
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return f'{value // 11}-{DIGITOS_VERIFICADORES[value % 11]}'
@@ -0,0 +1,82 @@
+from datetime import datetime
+from src.database import db
+
+UPLOAD_STATUSES = ('pending', 'running', 'success', 'error')
+
+class UploadLog(db.Model):
+    """
+    Registro de cada carga de DATA.TXT (tabla upload_logs de init.sql).
+    En cargas asíncronas cumple además el rol de job: su id es el job id.
+    """
+    __tablename__ = 'upload_logs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    records_processed = db.Column(db.Integer, default=0)
+    upload_date = db.Column(db.DateTime, default=datetime.now)
+    status = db.Column(db.Enum(*UPLOAD_STATUSES, name='upload_status'), default='success')
+    error_message = db.Column(db.Text)
+    # Bytes del archivo: una carga por partes llega a UPLOAD_CHUNKED_MAX_SIZE (2 GB), sobre el máximo de INT
+    file_size = db.Column(db.BigInteger)
+    file_hash = db.Column(db.String(64), index=True)
+    
+    # Campos de seguimiento de jobs
+    file_path = db.Column(db.String(512))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    records_per_second = db.Column(db.Float)
+    
+    # Checkpoint de cargas confirmadas por lote (UPLOAD_COMMIT_MODE=batch): hasta
+    # dónde del archivo se leyó y cuántas filas quedaron confirmadas con el último lote.
+    # source_hash es el SHA-256 del archivo al empezar; se verifica antes de retomarla
+    load_mode = db.Column(db.String(10))
+    source_hash = db.Column(db.String(64))
+    checkpoint_offset = db.Column(db.BigInteger)
+    checkpoint_line = db.Column(db.Integer)
+    checkpoint_rows = db.Column(db.Integer)
+    heartbeat_at = db.Column(db.DateTime)
+    
+    # Métricas de la carga: líneas leídas y segundos por fase (ver MetricasCarga)
+    lines_read = db.Column(db.Integer)
+    save_seconds = db.Column(db.Float)
+    hash_seconds = db.Column(db.Float)
+    parse_seconds = db.Column(db.Float)
+    wait_seconds = db.Column(db.Float)
+    insert_seconds = db.Column(db.Float)
+    commit_seconds = db.Column(db.Float)
+    total_seconds = db.Column(db.Float)
+    
+    def __repr__(self):
+        return f"<UploadLog {self.id} {self.filename} {self.status}>"
+    
+    def to_dict(self):
+        """Convierte el modelo a diccionario para serialización"""
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'records_processed': self.records_processed,
+            'records_per_second': self.records_per_second,
+            'file_size': self.file_size,
+            'file_hash': self.file_hash,
+            'error_message': self.error_message,
+            'upload_date': self.upload_date.isoformat() if self.upload_date else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'mode': self.load_mode,
+            'lines_read': self.lines_read,
+            'timings': {
+                'save': self.save_seconds,
+                'hash': self.hash_seconds,
+                'parse': self.parse_seconds,
+                'wait': self.wait_seconds,
+                'insert': self.insert_seconds,
+                'commit': self.commit_seconds,
+                'total': self.total_seconds
+            },
+            'checkpoint': {
+                'offset': self.checkpoint_offset,
+                'line': self.checkpoint_line,
+                'rows': self.checkpoint_rows
+            } if self.checkpoint_offset is not None else None
+        }
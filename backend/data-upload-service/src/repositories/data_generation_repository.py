@@ -0,0 +1,41 @@
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from src.database import db
+from src.models.data_generation import DataGeneration
+
+# Única fila de data_generation
+GENERACION_ID = 1
+
+class DataGenerationRepository:
+    
+    @staticmethod
+    def find():
+        """Generación actual de los datos (None si aún no hay ninguna)"""
+        return db.session.get(DataGeneration, GENERACION_ID, populate_existing=True)
+    
+    @staticmethod
+    def bump():
+        """
+        Incrementa la generación y la confirma
+        Equivale a: UPDATE data_generation SET generation = generation + 1 WHERE id = 1
+        (o INSERT de la fila con generation = 1 si aún no existe)
+        """
+        ahora = datetime.now()
+        incrementar = (
+            update(DataGeneration)
+            .where(DataGeneration.id == GENERACION_ID)
+            .values(generation=DataGeneration.generation + 1, updated_at=ahora)
+        )
+        
+        if db.session.execute(incrementar).rowcount == 0:
+            try:
+                db.session.add(DataGeneration(id=GENERACION_ID, generation=1, updated_at=ahora))
+                db.session.flush()
+            except IntegrityError:
+                # Otro proceso creó la fila entre el UPDATE y el INSERT
+                db.session.rollback()
+                db.session.execute(incrementar)
+        
+        db.session.commit()
+        return DataGenerationRepository.find()
@@ -1,13 +1,44 @@
+import os
+import threading
+from flask import current_app
+from sqlalchemy import insert, delete, select, text, inspect, func, true, and_, or_, MetaData
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from src.database import db
-from src.models.data import Data
+from src.models.data import Data, ALMACENAMIENTO_COMPACTO
+
+STAGING_TABLE = 'data_staging'
+OLD_TABLE = 'data_old'
+MONTH_TABLE = 'data_mes_{:04d}{:02d}'
+
+# Particiones por mes (DATA_PARTITIONING, solo MySQL): pantiguo y pmax son los
+# extremos y quedan vacíos; cada mes con datos tiene su partición pYYYYMM
+PARTITION_MONTH = 'p{:04d}{:02d}'
+PARTITION_LOW = 'pantiguo'
+PARTITION_HIGH = 'pmax'
+
+# Columnas de LOAD DATA: con almacenamiento compacto, los strings del archivo
+# se convierten en el servidor igual que en FechaCompacta, HoraCompacta y RutCompacto
+LOAD_DATA_COLUMNS = (
+    "(@fecha, @hora, @rut) SET "
+    "fecha = STR_TO_DATE(@fecha, '%Y/%m/%d'), "
+    "hora = SUBSTRING(@hora, 1, 2) * 60 + SUBSTRING(@hora, 4, 2), "
+    "rut = SUBSTRING_INDEX(@rut, '-', 1) * 11 + LOCATE(UPPER(SUBSTRING_INDEX(@rut, '-', -1)), '0123456789K') - 1"
+    if ALMACENAMIENTO_COMPACTO else
+    "(fecha, hora, rut)"
+)
+
+# Copia de la definición de la tabla data, fuera de db.metadata para que
+# create_all/drop_all no la consideren
+_staging_table = Data.__table__.to_metadata(MetaData(), name=STAGING_TABLE)
 
 class DataRepository:
     
     @staticmethod
-    def delete_all():
+    def delete_all(commit=True):
         """Elimina todos los registros de marcación"""
         Data.query.delete()
-        db.session.commit()
+        if commit:
+            db.session.commit()
     
     @staticmethod
     def add(data_record):
@@ -15,6 +46,457 @@ class DataRepository:
         db.session.add(data_record)
         db.session.commit()
     
+    @staticmethod
+    def bulk_insert(rows, batch_size=5000, commit_per_batch=False, table=None, on_batch=None):
+        """
+        Inserta marcaciones en lotes a partir de un iterable de tuplas (fecha, hora, rut).
+        Equivale a: INSERT IGNORE INTO data (fecha, hora, rut) VALUES (...) ejecutado con executemany
+        
+        Las filas que ya existen (clave única rut, fecha, hora) se omiten sin error,
+        tanto contra la tabla como dentro del mismo archivo.
+        Si commit_per_batch es False no se hace commit: el llamador confirma
+        la transacción una sola vez al final del archivo.
+        table permite cargar en otra tabla con la misma estructura (ej. staging).
+        on_batch, si se entrega, se llama con el total acumulado después de cada lote.
+        Retorna la cantidad de filas efectivamente insertadas.
+        """
+        table = Data.__table__ if table is None else table
+        total = 0
+        batch = []
+        for fecha, hora, rut in rows:
+            batch.append({'fecha': fecha, 'hora': hora, 'rut': rut})
+            if len(batch) >= batch_size:
+                total += DataRepository._insert_batch(batch, commit_per_batch, table)
+                batch = []
+                if on_batch:
+                    on_batch(total)
+        if batch:
+            total += DataRepository._insert_batch(batch, commit_per_batch, table)
+            if on_batch:
+                on_batch(total)
+        return total
+    
+    @staticmethod
+    def _insert_batch(batch, commit, table):
+        """Inserta un lote de filas con una sola sentencia executemany"""
+        result = db.session.execute(DataRepository._insert_ignore(table), batch)
+        if commit:
+            db.session.commit()
+        # rowcount descuenta las filas omitidas; algunos drivers no lo informan (-1)
+        return result.rowcount if result.rowcount >= 0 else len(batch)
+    
+    @staticmethod
+    def _insert_ignore(table):
+        """
+        INSERT que omite las filas duplicadas según la clave única (rut, fecha, hora).
+        MySQL: INSERT IGNORE INTO ... / SQLite: INSERT ... ON CONFLICT DO NOTHING
+        """
+        dialect = DataRepository._dialect()
+        if dialect == 'mysql':
+            return insert(table).prefix_with('IGNORE')
+        if dialect == 'sqlite':
+            return sqlite_insert(table).on_conflict_do_nothing()
+        return insert(table)
+    
+    @staticmethod
+    def supports_load_data():
+        """
+        Indica si se puede usar LOAD DATA LOCAL INFILE: solo en MySQL y con
+        local_infile habilitado en el servidor. El cliente debe conectarse
+        con connect_args={'local_infile': True}.
+        """
+        if DataRepository._dialect() != 'mysql':
+            return False
+        try:
+            return bool(db.session.execute(text('SELECT @@GLOBAL.local_infile')).scalar())
+        except Exception:
+            return False
+    
+    @staticmethod
+    def load_data(path, table=None):
+        """
+        Carga un archivo de líneas fecha<TAB>hora<TAB>rut con el cargador nativo de MySQL, sin commit.
+        Equivale a: LOAD DATA LOCAL INFILE '<path>' IGNORE INTO TABLE data (fecha, hora, rut)
+        
+        Corre dentro de un savepoint: si falla (ej. local_infile deshabilitado)
+        la transacción del llamador queda intacta.
+        Retorna la cantidad de filas insertadas (las duplicadas se omiten).
+        """
+        table = Data.__table__ if table is None else table
+        with db.session.begin_nested():
+            result = db.session.execute(
+                text(
+                    f"LOAD DATA LOCAL INFILE :path IGNORE INTO TABLE {table.name} "
+                    "CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' "
+                    + LOAD_DATA_COLUMNS
+                ),
+                {'path': os.path.abspath(path)}
+            )
+        return result.rowcount
+    
+    @staticmethod
+    def iter_keys(batch_size=5000):
+        """
+        Recorre (id, rut, fecha, hora) de todas las marcaciones con un cursor por lotes,
+        sin construir objetos ORM.
+        Equivale a: SELECT id, rut, fecha, hora FROM data
+        """
+        query = select(Data.id, Data.rut, Data.fecha, Data.hora).execution_options(yield_per=batch_size)
+        for row in db.session.execute(query):
+            yield tuple(row)
+    
+    @staticmethod
+    def delete_by_ids(ids, batch_size=5000):
+        """
+        Elimina las marcaciones indicadas, en lotes, sin hacer commit.
+        Equivale a: DELETE FROM data WHERE id IN (...)
+        """
+        for i in range(0, len(ids), batch_size):
+            db.session.execute(delete(Data.__table__).where(Data.id.in_(ids[i:i + batch_size])))
+        return len(ids)
+    
+    @staticmethod
+    def staging_table():
+        """Tabla de staging donde se carga la nueva generación de marcaciones"""
+        return _staging_table
+    
+    @staticmethod
+    def create_staging():
+        """
+        Crea una tabla data_staging vacía con la misma estructura que data.
+        En MySQL se usa CREATE TABLE ... LIKE para copiar también índices.
+        """
+        DataRepository.drop_staging()
+        if DataRepository._dialect() == 'mysql':
+            db.session.execute(text(f'CREATE TABLE {STAGING_TABLE} LIKE {Data.__tablename__}'))
+        else:
+            _staging_table.create(bind=db.session.connection())
+        db.session.commit()
+    
+    @staticmethod
+    def staging_exists():
+        """Indica si existe la tabla de staging (ej. de una carga interrumpida)"""
+        return inspect(db.session.connection()).has_table(STAGING_TABLE)
+    
+    @staticmethod
+    def drop_staging():
+        """Elimina la tabla de staging si existe"""
+        db.session.execute(text(f'DROP TABLE IF EXISTS {STAGING_TABLE}'))
+        db.session.commit()
+    
+    @staticmethod
+    def swap_staging():
+        """
+        Reemplaza atómicamente data por data_staging.
+        MySQL: RENAME TABLE data TO data_old, data_staging TO data (una sola operación atómica)
+        SQLite: el DROP y ambos ALTER TABLE ... RENAME dentro de una transacción
+        abierta con BEGIN explícito; pysqlite no abre una antes de un DDL, así
+        que sin él cada sentencia se confirmaría por separado.
+        La generación anterior queda en data_old hasta que se llame a drop_old().
+        """
+        if DataRepository._dialect() == 'sqlite':
+            conexion = db.session.connection()
+            if not conexion.connection.driver_connection.in_transaction:
+                conexion.exec_driver_sql('BEGIN')
+        db.session.execute(text(f'DROP TABLE IF EXISTS {OLD_TABLE}'))
+        if DataRepository._dialect() == 'mysql':
+            db.session.execute(text(
+                f'RENAME TABLE {Data.__tablename__} TO {OLD_TABLE}, {STAGING_TABLE} TO {Data.__tablename__}'
+            ))
+        else:
+            db.session.execute(text(f'ALTER TABLE {Data.__tablename__} RENAME TO {OLD_TABLE}'))
+            db.session.execute(text(f'ALTER TABLE {STAGING_TABLE} RENAME TO {Data.__tablename__}'))
+        db.session.commit()
+    
+    @staticmethod
+    def drop_old(background=False):
+        """
+        Elimina la generación anterior (data_old).
+        Con background=True el DROP corre en un hilo aparte con su propia conexión,
+        para no retener la request mientras MySQL libera la tabla.
+        """
+        if not background:
+            db.session.execute(text(f'DROP TABLE IF EXISTS {OLD_TABLE}'))
+            db.session.commit()
+            return None
+        
+        app = current_app._get_current_object()
+        
+        def _drop():
+            with app.app_context():
+                try:
+                    with db.engine.begin() as connection:
+                        connection.execute(text(f'DROP TABLE IF EXISTS {OLD_TABLE}'))
+                except Exception as e:
+                    app.logger.error(f"Error eliminando generación anterior: {str(e)}")
+        
+        thread = threading.Thread(target=_drop, name='drop-data-old', daemon=True)
+        thread.start()
+        return thread
+    
+    @staticmethod
+    def supports_background_drop():
+        """Indica si el motor permite eliminar la generación anterior desde otra conexión"""
+        return DataRepository._dialect() == 'mysql'
+    
+    @staticmethod
+    def supports_partitions():
+        """Indica si data se particiona por mes: DATA_PARTITIONING habilitado y MySQL"""
+        return current_app.config.get('DATA_PARTITIONING', False) and DataRepository._dialect() == 'mysql'
+    
+    @staticmethod
+    def partition_table():
+        """
+        Particiona data por mes si aún no lo está (se llama al iniciar el servicio).
+        Equivale a: ALTER TABLE data DROP PRIMARY KEY, ADD PRIMARY KEY (id, fecha)
+                    PARTITION BY RANGE COLUMNS (fecha) (PARTITION pantiguo ..., PARTITION p202310 ..., PARTITION pmax ...)
+        
+        MySQL exige que toda clave única incluya la columna de partición, por eso
+        la clave primaria pasa a ser (id, fecha). Retorna False si ya estaba particionada.
+        """
+        if DataRepository._partitions(Data.__tablename__):
+            return False
+        
+        meses = [tuple(int(p) for p in m.split('/')) for m in DataRepository._months_in(Data.__tablename__)]
+        if meses:
+            meses = DataRepository._month_range(min(meses), max(meses))
+        
+        db.session.execute(text(
+            f'ALTER TABLE {Data.__tablename__} DROP PRIMARY KEY, ADD PRIMARY KEY (id, fecha) '
+            f'PARTITION BY RANGE COLUMNS (fecha) ({DataRepository._partition_definitions(meses, low=bool(meses))})'
+        ))
+        db.session.commit()
+        return True
+    
+    @staticmethod
+    def ensure_month_partitions(meses=None, table_name=None):
+        """
+        Crea las particiones mensuales que faltan, dividiendo los extremos pantiguo/pmax.
+        Equivale a: ALTER TABLE data REORGANIZE PARTITION pmax INTO (PARTITION p202311 ..., PARTITION pmax ...)
+        
+        meses es un iterable de (año, mes); si no se entrega, se usan los meses de
+        las filas que cayeron en los extremos. Las particiones quedan contiguas, y
+        como los extremos están vacíos (o solo con filas de meses nuevos) la
+        reorganización no copia el resto de la tabla. Retorna los meses agregados.
+        """
+        table_name = table_name or Data.__tablename__
+        particiones = DataRepository._partitions(table_name)
+        if not particiones:
+            return []
+        
+        extremos = [p for p in (PARTITION_LOW, PARTITION_HIGH) if p in particiones]
+        if meses is None:
+            meses = [tuple(int(p) for p in m.split('/')) for m in DataRepository._months_in(table_name, extremos)]
+        
+        existentes = sorted(
+            (int(p[1:5]), int(p[5:7])) for p in particiones if p not in (PARTITION_LOW, PARTITION_HIGH)
+        )
+        faltan = sorted(set(meses) - set(existentes))
+        if not faltan:
+            return []
+        
+        if not existentes:
+            nuevos = DataRepository._month_range(faltan[0], faltan[-1])
+            DataRepository._reorganize(table_name, extremos, nuevos, low=True, high=True)
+            return nuevos
+        
+        agregados = []
+        arriba = [m for m in faltan if m > existentes[-1]]
+        if arriba:
+            nuevos = DataRepository._month_range(DataRepository._next_month(existentes[-1]), arriba[-1])
+            DataRepository._reorganize(table_name, [PARTITION_HIGH], nuevos, high=True)
+            agregados += nuevos
+        
+        abajo = [m for m in faltan if m < existentes[0]]
+        if abajo:
+            nuevos = DataRepository._month_range(abajo[0], DataRepository._previous_month(existentes[0]))
+            DataRepository._reorganize(table_name, [PARTITION_LOW], nuevos, low=True)
+            agregados += nuevos
+        
+        return agregados
+    
+    @staticmethod
+    def delete_month(anio, mes):
+        """
+        Elimina las marcaciones de un mes y retorna cuántas eran.
+        Con particiones: ALTER TABLE data TRUNCATE PARTITION p202310 (sin borrar fila a fila)
+        Sin particiones: DELETE FROM data WHERE fecha >= '2023/10/01' AND fecha < '2023/11/01'
+        """
+        particion = PARTITION_MONTH.format(anio, mes)
+        if DataRepository.supports_partitions() and particion in DataRepository._partitions(Data.__tablename__):
+            total = db.session.execute(
+                text(f'SELECT COUNT(*) FROM {Data.__tablename__} PARTITION ({particion})')
+            ).scalar()
+            db.session.execute(text(f'ALTER TABLE {Data.__tablename__} TRUNCATE PARTITION {particion}'))
+            db.session.commit()
+            return total
+        
+        total = DataRepository.delete_month_rows(anio, mes)
+        db.session.commit()
+        return total
+    
+    @staticmethod
+    def delete_month_rows(anio, mes):
+        """
+        Elimina las marcaciones de un mes fila a fila, sin commit.
+        Equivale a: DELETE FROM data WHERE fecha >= '2023/10/01' AND fecha < '2023/11/01'
+        """
+        inicio, fin = DataRepository._month_bounds(anio, mes)
+        result = db.session.execute(delete(Data.__table__).where(Data.fecha >= inicio, Data.fecha < fin))
+        return result.rowcount
+    
+    @staticmethod
+    def create_month_table(anio, mes):
+        """
+        Crea una tabla vacía sin particiones con la estructura de data, para
+        cargar un mes e intercambiarlo con su partición (exchange_month).
+        Equivale a: CREATE TABLE data_mes_202310 LIKE data; ALTER TABLE data_mes_202310 REMOVE PARTITIONING
+        
+        Su AUTO_INCREMENT parte después del mayor id de data, para que los ids
+        sigan siendo únicos al intercambiarla. Los meses se cargan de a uno.
+        """
+        nombre = MONTH_TABLE.format(anio, mes)
+        db.session.execute(text(f'DROP TABLE IF EXISTS {nombre}'))
+        db.session.execute(text(f'CREATE TABLE {nombre} LIKE {Data.__tablename__}'))
+        db.session.execute(text(f'ALTER TABLE {nombre} REMOVE PARTITIONING'))
+        siguiente_id = db.session.execute(text(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {Data.__tablename__}')).scalar()
+        db.session.execute(text(f'ALTER TABLE {nombre} AUTO_INCREMENT = {int(siguiente_id)}'))
+        db.session.commit()
+        return Data.__table__.to_metadata(MetaData(), name=nombre)
+    
+    @staticmethod
+    def exchange_month(anio, mes):
+        """
+        Intercambia atómicamente la partición del mes con su tabla data_mes_YYYYMM
+        y elimina esa tabla, que queda con las filas anteriores del mes.
+        Equivale a: ALTER TABLE data EXCHANGE PARTITION p202310 WITH TABLE data_mes_202310
+        Retorna la cantidad de filas reemplazadas.
+        """
+        nombre = MONTH_TABLE.format(anio, mes)
+        db.session.execute(text(
+            f'ALTER TABLE {Data.__tablename__} EXCHANGE PARTITION {PARTITION_MONTH.format(anio, mes)} WITH TABLE {nombre}'
+        ))
+        # Lleva el contador de data más allá de los ids recibidos (MySQL lo ajusta a MAX(id) + 1)
+        db.session.execute(text(f'ALTER TABLE {Data.__tablename__} AUTO_INCREMENT = 1'))
+        reemplazadas = db.session.execute(text(f'SELECT COUNT(*) FROM {nombre}')).scalar()
+        db.session.execute(text(f'DROP TABLE IF EXISTS {nombre}'))
+        db.session.commit()
+        return reemplazadas
+    
+    @staticmethod
+    def drop_month_table(anio, mes):
+        """Elimina la tabla de carga de un mes si existe (ej. tras un error)"""
+        db.session.execute(text(f'DROP TABLE IF EXISTS {MONTH_TABLE.format(anio, mes)}'))
+        db.session.commit()
+    
+    @staticmethod
+    def insert_from_staging(mes=None, table=None):
+        """
+        Copia las marcaciones de data_staging (solo las del mes (año, mes), si
+        se indica) a data o a table, sin commit.
+        Equivale a: INSERT IGNORE INTO data (fecha, hora, rut) SELECT fecha, hora, rut FROM data_staging
+                    WHERE fecha >= '2023/10/01' AND fecha < '2023/11/01'
+        """
+        table = Data.__table__ if table is None else table
+        query = select(_staging_table.c.fecha, _staging_table.c.hora, _staging_table.c.rut)
+        if mes is not None:
+            inicio, fin = DataRepository._month_bounds(*mes)
+            query = query.where(_staging_table.c.fecha >= inicio, _staging_table.c.fecha < fin)
+        else:
+            # SQLite necesita un WHERE para distinguir el ON CONFLICT de un INSERT ... SELECT
+            query = query.where(true())
+        
+        result = db.session.execute(
+            DataRepository._insert_ignore(table).from_select(['fecha', 'hora', 'rut'], query)
+        )
+        return result.rowcount
+    
+    @staticmethod
+    def _partitions(table_name):
+        """Nombres de las particiones de la tabla, en orden; lista vacía si no está particionada"""
+        if DataRepository._dialect() != 'mysql':
+            return []
+        return list(db.session.execute(
+            text(
+                'SELECT PARTITION_NAME FROM information_schema.PARTITIONS '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla AND PARTITION_NAME IS NOT NULL '
+                'ORDER BY PARTITION_ORDINAL_POSITION'
+            ),
+            {'tabla': table_name}
+        ).scalars())
+    
+    @staticmethod
+    def _months_in(table_name, particiones=None):
+        """Meses 'yyyy/MM' distintos de la tabla (o solo de las particiones indicadas)"""
+        if particiones == []:
+            return []
+        desde = f'{table_name} PARTITION ({", ".join(particiones)})' if particiones else table_name
+        mes = "DATE_FORMAT(fecha, '%Y/%m')" if ALMACENAMIENTO_COMPACTO else 'LEFT(fecha, 7)'
+        return list(db.session.execute(text(f'SELECT DISTINCT {mes} FROM {desde}')).scalars())
+    
+    @staticmethod
+    def _reorganize(table_name, origen, meses, low=False, high=False):
+        """Divide las particiones origen en las particiones mensuales de meses (más los extremos indicados)"""
+        db.session.execute(text(
+            f'ALTER TABLE {table_name} REORGANIZE PARTITION {", ".join(origen)} '
+            f'INTO ({DataRepository._partition_definitions(meses, low=low, high=high)})'
+        ))
+        db.session.commit()
+    
+    @staticmethod
+    def _partition_definitions(meses, low=True, high=True):
+        """Definiciones PARTITION ... VALUES LESS THAN (...) para meses contiguos"""
+        definiciones = []
+        if low and meses:
+            definiciones.append(f"PARTITION {PARTITION_LOW} VALUES LESS THAN ('{DataRepository._month_bounds(*meses[0])[0]}')")
+        for anio, mes in meses:
+            definiciones.append(
+                f"PARTITION {PARTITION_MONTH.format(anio, mes)} VALUES LESS THAN ('{DataRepository._month_bounds(anio, mes)[1]}')"
+            )
+        if high:
+            definiciones.append(f'PARTITION {PARTITION_HIGH} VALUES LESS THAN (MAXVALUE)')
+        return ', '.join(definiciones)
+    
+    @staticmethod
+    def _month_bounds(anio, mes):
+        """
+        Primer día del mes y del mes siguiente, con el formato de la columna
+        fecha ('yyyy/MM/dd', o 'yyyy-MM-dd' con almacenamiento compacto)
+        """
+        separador = '-' if ALMACENAMIENTO_COMPACTO else '/'
+        siguiente = DataRepository._next_month((anio, mes))
+        return (
+            f'{anio:04d}{separador}{mes:02d}{separador}01',
+            f'{siguiente[0]:04d}{separador}{siguiente[1]:02d}{separador}01'
+        )
+    
+    @staticmethod
+    def _month_range(desde, hasta):
+        """Meses (año, mes) contiguos entre desde y hasta, inclusive"""
+        meses = []
+        while desde <= hasta:
+            meses.append(desde)
+            desde = DataRepository._next_month(desde)
+        return meses
+    
+    @staticmethod
+    def _next_month(mes):
+        return (mes[0] + 1, 1) if mes[1] == 12 else (mes[0], mes[1] + 1)
+    
+    @staticmethod
+    def _previous_month(mes):
+        return (mes[0] - 1, 12) if mes[1] == 1 else (mes[0], mes[1] - 1)
+    
+    @staticmethod
+    def _dialect():
+        """Nombre del dialecto del motor de base de datos en uso"""
+        return db.session.get_bind().dialect.name
+    
+    @staticmethod
+    def commit():
+        """Confirma la transacción actual"""
+        db.session.commit()
+    
     @staticmethod
     def rollback():
         """Hace rollback de la transacción actual"""
@@ -25,6 +507,65 @@ class DataRepository:
         """Obtiene todos los registros de marcación"""
         return Data.query.all()
     
+    @staticmethod
+    def find_page(limit, after=None, rut=None, fecha_desde=None, fecha_hasta=None, hora_desde=None, hora_hasta=None):
+        """
+        Página de marcaciones ordenada por (fecha, hora, id), desde la posición
+        after = (fecha, hora, id) de la última fila de la página anterior (keyset).
+        Retorna tuplas (id, fecha, hora, rut), sin cargar objetos del ORM.
+        
+        Equivale a: SELECT id, fecha, hora, rut FROM data
+                    WHERE [rut = ? AND] [fecha BETWEEN ? AND ?] [AND hora BETWEEN ? AND ?]
+                      AND (fecha > ? OR (fecha = ? AND (hora > ? OR (hora = ? AND id > ?))))
+                    ORDER BY fecha, hora, id LIMIT ?
+        
+        La página se lee directo del índice idx_fecha_hora (o de la clave
+        única (rut, fecha, hora) si se filtra por RUT) a partir de after,
+        así que su costo no depende de cuántas páginas se recorrieron antes.
+        """
+        query = DataRepository._filtrar(
+            select(Data.id, Data.fecha, Data.hora, Data.rut), rut, fecha_desde, fecha_hasta, hora_desde, hora_hasta
+        )
+        if after is not None:
+            fecha, hora, data_id = after
+            # Comparación (fecha, hora, id) > after expandida: así la usa como rango cualquier motor
+            query = query.where(or_(
+                Data.fecha > fecha,
+                and_(Data.fecha == fecha, or_(Data.hora > hora, and_(Data.hora == hora, Data.id > data_id)))
+            ))
+        
+        query = query.order_by(Data.fecha.asc(), Data.hora.asc(), Data.id.asc()).limit(limit)
+        return db.session.execute(query).all()
+    
+    @staticmethod
+    def iter_export(batch_size=2000, rut=None, fecha_desde=None, fecha_hasta=None):
+        """
+        Recorre (id, fecha, hora, rut) de las marcaciones en orden de id con un
+        cursor del lado del servidor (yield_per: en MySQL, un cursor sin buffer),
+        de a batch_size filas en memoria, sin construir objetos ORM.
+        Equivale a: SELECT id, fecha, hora, rut FROM data [WHERE ...] ORDER BY id
+        """
+        query = DataRepository._filtrar(
+            select(Data.id, Data.fecha, Data.hora, Data.rut), rut, fecha_desde, fecha_hasta
+        ).order_by(Data.id.asc()).execution_options(yield_per=batch_size)
+        for particion in db.session.execute(query).partitions():
+            yield particion
+    
+    @staticmethod
+    def _filtrar(query, rut=None, fecha_desde=None, fecha_hasta=None, hora_desde=None, hora_hasta=None):
+        """Agrega a query los filtros por RUT y rangos (inclusivos) de fecha y hora que se entreguen"""
+        if rut is not None:
+            query = query.where(Data.rut == rut)
+        if fecha_desde is not None:
+            query = query.where(Data.fecha >= fecha_desde)
+        if fecha_hasta is not None:
+            query = query.where(Data.fecha <= fecha_hasta)
+        if hora_desde is not None:
+            query = query.where(Data.hora >= hora_desde)
+        if hora_hasta is not None:
+            query = query.where(Data.hora <= hora_hasta)
+        return query
+    
     @staticmethod
     def find_by_rut(rut):
         """Obtiene todos los registros de un RUT específico"""
@@ -92,6 +633,39 @@ class DataRepository:
         """
         return Data.query.filter(Data.fecha >= fecha_inicio, Data.fecha <= fecha_fin).all()
     
+    @staticmethod
+    def aggregate_stats():
+        """
+        Totales de las marcaciones en una sola consulta agregada.
+        Retorna (total de registros, RUTs distintos, fecha mínima, fecha máxima).
+        Equivale a: SELECT COUNT(*), COUNT(DISTINCT rut), MIN(fecha), MAX(fecha) FROM data
+        """
+        return tuple(db.session.execute(
+            select(func.count(), func.count(Data.rut.distinct()), func.min(Data.fecha), func.max(Data.fecha))
+        ).one())
+    
+    @staticmethod
+    def count_by_fecha():
+        """
+        Cantidad de marcaciones por día, en orden de fecha (se resuelve con idx_fecha)
+        Equivale a: SELECT fecha, COUNT(*) FROM data GROUP BY fecha ORDER BY fecha
+        """
+        result = db.session.execute(
+            select(Data.fecha, func.count()).group_by(Data.fecha).order_by(Data.fecha.asc())
+        )
+        return {fecha: cantidad for fecha, cantidad in result}
+    
+    @staticmethod
+    def count_by_rut():
+        """
+        Cantidad de marcaciones por RUT, en orden de RUT (se resuelve con idx_rut)
+        Equivale a: SELECT rut, COUNT(*) FROM data GROUP BY rut ORDER BY rut
+        """
+        result = db.session.execute(
+            select(Data.rut, func.count()).group_by(Data.rut).order_by(Data.rut.asc())
+        )
+        return {rut: cantidad for rut, cantidad in result}
+    
     @staticmethod
     def get_all_dates():
         """
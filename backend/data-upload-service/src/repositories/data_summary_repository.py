@@ -0,0 +1,34 @@
+from datetime import datetime
+from src.database import db
+from src.models.data_summary import DataSummary
+
+class DataSummaryRepository:
+    
+    @staticmethod
+    def save(upload_log_id, total_records, total_employees, fecha_min, fecha_max, records_per_day, records_per_rut):
+        """Guarda (o reemplaza) el resumen de la generación upload_log_id"""
+        summary = db.session.get(DataSummary, upload_log_id) or DataSummary(upload_log_id=upload_log_id)
+        summary.total_records = total_records
+        summary.total_employees = total_employees
+        summary.fecha_min = fecha_min
+        summary.fecha_max = fecha_max
+        summary.records_per_day = records_per_day
+        summary.records_per_rut = records_per_rut
+        summary.created_at = datetime.now()
+        db.session.add(summary)
+        db.session.commit()
+        return summary
+    
+    @staticmethod
+    def find_latest():
+        """
+        Resumen de la última generación, es decir, de los datos visibles en data
+        Equivale a: SELECT * FROM data_summary ORDER BY upload_log_id DESC LIMIT 1
+        """
+        return DataSummary.query.order_by(DataSummary.upload_log_id.desc()).first()
+    
+    @staticmethod
+    def delete_all():
+        """Elimina todos los resúmenes (las lecturas vuelven a calcularse sobre data)"""
+        DataSummary.query.delete()
+        db.session.commit()
@@ -0,0 +1,180 @@
+from datetime import datetime
+from sqlalchemy import update, or_
+from src.database import db
+from src.models.upload_log import UploadLog
+
+class UploadLogRepository:
+    
+    @staticmethod
+    def create(filename, file_size=None, file_path=None, status='pending', load_mode=None, save_seconds=None):
+        """Registra una nueva carga y retorna el registro con su id asignado"""
+        log = UploadLog(
+            filename=filename,
+            file_size=file_size,
+            file_path=file_path,
+            status=status,
+            load_mode=load_mode,
+            save_seconds=save_seconds,
+            records_processed=0,
+            heartbeat_at=datetime.now()
+        )
+        db.session.add(log)
+        db.session.commit()
+        return log
+    
+    @staticmethod
+    def find_by_id(log_id, refresh=False):
+        """
+        Obtiene un registro de carga por su id.
+        refresh termina la transacción en curso y relee el registro desde la BD,
+        para ver los cambios que otro hilo confirmó después de la primera lectura.
+        """
+        if refresh:
+            db.session.rollback()
+        return db.session.get(UploadLog, log_id, populate_existing=refresh)
+    
+    @staticmethod
+    def find_current(exclude_id=None):
+        """
+        Obtiene la última carga exitosa, es decir, la generación cargada actualmente
+        Equivale a: SELECT * FROM upload_logs WHERE status = 'success' ORDER BY id DESC LIMIT 1
+        """
+        query = UploadLog.query.filter_by(status='success')
+        if exclude_id is not None:
+            query = query.filter(UploadLog.id != exclude_id)
+        return query.order_by(UploadLog.id.desc()).first()
+    
+    @staticmethod
+    def clear_current_hash():
+        """
+        Olvida el hash de la generación actual: data ya no coincide con su archivo
+        (ej. un mes purgado), así que volver a subirlo debe recargarlo
+        Equivale a: UPDATE upload_logs SET file_hash = NULL WHERE id = <última carga exitosa>
+        """
+        actual = UploadLogRepository.find_current()
+        if actual is not None and actual.file_hash is not None:
+            actual.file_hash = None
+            db.session.commit()
+    
+    @staticmethod
+    def find_recent(limit=50, offset=0, status=None):
+        """
+        Historial de cargas, de la más reciente a la más antigua
+        Equivale a: SELECT * FROM upload_logs [WHERE status = ?] ORDER BY id DESC LIMIT ? OFFSET ?
+        """
+        query = UploadLog.query
+        if status is not None:
+            query = query.filter_by(status=status)
+        return query.order_by(UploadLog.id.desc()).limit(limit).offset(offset).all()
+    
+    @staticmethod
+    def count(status=None):
+        """Cantidad de cargas registradas (con el estado indicado, si se entrega)"""
+        query = UploadLog.query
+        if status is not None:
+            query = query.filter_by(status=status)
+        return query.count()
+    
+    @staticmethod
+    def mark_running(log_id):
+        """
+        Marca la carga como en proceso, solo si sigue pendiente.
+        Retorna False si otro proceso ya la tomó.
+        Equivale a: UPDATE upload_logs SET status = 'running', ... WHERE id = ? AND status = 'pending'
+        """
+        ahora = datetime.now()
+        result = db.session.execute(
+            update(UploadLog)
+            .where(UploadLog.id == log_id, UploadLog.status == 'pending')
+            .values(status='running', started_at=ahora, heartbeat_at=ahora)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+    
+    @staticmethod
+    def set_source_hash(log_id, source_hash):
+        """
+        Registra el SHA-256 del archivo con que empieza una carga por lotes,
+        sin commit (se confirma junto con el checkpoint inicial)
+        """
+        db.session.execute(update(UploadLog).where(UploadLog.id == log_id).values(source_hash=source_hash))
+    
+    @staticmethod
+    def find_checkpointed():
+        """
+        Carga en proceso con checkpoint (en curso o a la espera de retomarse), si hay alguna.
+        Equivale a: SELECT * FROM upload_logs WHERE status = 'running'
+                    AND checkpoint_offset IS NOT NULL ORDER BY id LIMIT 1
+        """
+        return UploadLog.query.filter(
+            UploadLog.status == 'running',
+            UploadLog.checkpoint_offset.isnot(None)
+        ).order_by(UploadLog.id.asc()).first()
+    
+    @staticmethod
+    def checkpoint(log_id, offset, line, rows):
+        """
+        Registra hasta dónde llegó la carga, sin commit: el llamador lo confirma
+        en la misma transacción que el lote, así el checkpoint nunca queda
+        adelantado ni atrasado respecto de las filas confirmadas.
+        """
+        db.session.execute(
+            update(UploadLog)
+            .where(UploadLog.id == log_id)
+            .values(
+                checkpoint_offset=offset,
+                checkpoint_line=line,
+                checkpoint_rows=rows,
+                records_processed=rows,
+                heartbeat_at=datetime.now()
+            )
+        )
+    
+    @staticmethod
+    def find_interrupted(stale_before):
+        """
+        Cargas pendientes o en proceso, con archivo en disco, sin señal de vida desde stale_before
+        Equivale a: SELECT * FROM upload_logs WHERE status IN ('pending', 'running')
+                    AND file_path IS NOT NULL AND (heartbeat_at IS NULL OR heartbeat_at < ?)
+        """
+        return UploadLog.query.filter(
+            UploadLog.status.in_(('pending', 'running')),
+            UploadLog.file_path.isnot(None),
+            or_(UploadLog.heartbeat_at.is_(None), UploadLog.heartbeat_at < stale_before)
+        ).order_by(UploadLog.id.asc()).all()
+    
+    @staticmethod
+    def claim(log_id, heartbeat_at):
+        """
+        Toma una carga interrumpida renovando su heartbeat, solo si nadie lo
+        renovó desde que se leyó (evita que dos procesos la retomen a la vez).
+        """
+        condicion = UploadLog.heartbeat_at.is_(None) if heartbeat_at is None else UploadLog.heartbeat_at == heartbeat_at
+        result = db.session.execute(
+            update(UploadLog).where(UploadLog.id == log_id, condicion).values(heartbeat_at=datetime.now())
+        )
+        db.session.commit()
+        return result.rowcount == 1
+    
+    @staticmethod
+    def finish(log_id, status, records_processed=0, records_per_second=None, error_message=None,
+               file_hash=None, file_size=None, metricas=None):
+        """
+        Marca la carga como terminada (success o error) con sus métricas.
+        metricas es un dict columna -> valor (ej. MetricasCarga.resumen());
+        los valores None no pisan lo ya registrado (ej. save_seconds de un job).
+        """
+        log = db.session.get(UploadLog, log_id)
+        for columna, valor in (metricas or {}).items():
+            if valor is not None:
+                setattr(log, columna, valor)
+        log.status = status
+        log.file_hash = file_hash
+        if file_size is not None:
+            log.file_size = file_size
+        log.records_processed = records_processed
+        log.records_per_second = records_per_second
+        log.error_message = error_message
+        log.finished_at = datetime.now()
+        db.session.commit()
+        return log
@@ -48,10 +48,21 @@ class DataStatsSchema(Schema):
     total_employees = fields.Int()
     date_range = fields.Dict()
     last_upload = fields.DateTime()
+    records_per_day = fields.Dict(keys=fields.Str(), values=fields.Int())
 
 class FileUploadResponseSchema(Schema):
     """Schema para respuesta de carga de archivo"""
     success = fields.Bool()
     message = fields.Str()
     registros_procesados = fields.Int()
+    sin_cambios = fields.Bool()
+    upload_id = fields.Int()
+    registros_agregados = fields.Int()
+    registros_eliminados = fields.Int()
+    registros_sin_cambios = fields.Int()
+    registros_omitidos = fields.Int()
+    backend = fields.Str()
+    meses = fields.List(fields.Str())
+    duracion_segundos = fields.Float()
+    registros_por_segundo = fields.Float()
     errors = fields.List(fields.Str())
\ No newline at end of file
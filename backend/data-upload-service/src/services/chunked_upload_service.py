@@ -0,0 +1,354 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from flask import current_app
+from werkzeug.utils import secure_filename
+from src.validators.data_validator import DataValidator
+from src.services.parallel_parser import parsear_rango
+from src.services.upload_stream import codec_de, CHUNK_SIZE
+from src.errors.errors import BadRequest, NotFound
+
+CHUNKS_FOLDER = os.path.join('uploads', 'chunks')
+MANIFEST = 'manifest.json'
+MAX_TOTAL_SIZE = 2 * 1024 * 1024 * 1024
+CHUNK_TTL = 24 * 60 * 60
+# Bytes que se validan de una vez: la validación del prefijo no depende del tamaño del archivo
+VENTANA_VALIDACION = 1024 * 1024
+# Bloques en que se busca un salto de línea (ninguna línea válida es tan larga)
+BLOQUE_BUSQUEDA = 64 * 1024
+
+# Protege la lectura/escritura de los manifiestos y el ensamblado del archivo
+_chunk_lock = threading.Lock()
+
+class ChunkedUploadService:
+    """
+    Carga de DATA.TXT por partes (chunks), reanudable.
+
+    Protocolo:
+    1. iniciar: registra la carga y retorna su upload_id
+    2. recibir_chunk: guarda el chunk numero (desde 0) verificando su SHA-256
+    3. completar: verifica que estén todos los chunks y retorna el archivo ensamblado
+
+    Cada carga vive en uploads/chunks/<upload_id>/ con un manifest.json.
+    Los chunks contiguos desde el inicio se van agregando a DATA.TXT a
+    medida que llegan y sus líneas completas se validan de inmediato, así
+    un archivo inválido se rechaza sin esperar al último chunk. Los chunks
+    que llegan fuera de orden se guardan aparte hasta que les toca.
+    """
+
+    def __init__(self):
+        self.validator = DataValidator()
+
+    def iniciar(self, filename, total_chunks, total_size=None, sha256=None):
+        """Registra una nueva carga por partes y retorna su manifiesto"""
+        self.validator.validate_filename(filename)
+
+        if not isinstance(total_chunks, int) or isinstance(total_chunks, bool) or total_chunks < 1:
+            raise BadRequest('total_chunks debe ser un entero mayor que 0')
+
+        max_size = current_app.config.get('UPLOAD_CHUNKED_MAX_SIZE', MAX_TOTAL_SIZE)
+        if total_size is not None and total_size > max_size:
+            raise BadRequest(f'El archivo supera el máximo de {max_size // (1024 * 1024)}MB')
+
+        self.limpiar_expiradas()
+
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._directorio(upload_id))
+
+        manifest = {
+            'upload_id': upload_id,
+            'filename': filename,
+            'total_chunks': total_chunks,
+            'total_size': total_size,
+            'sha256': sha256.lower() if sha256 else None,
+            'checksums': {},
+            'bytes_recibidos': 0,
+            'ensamblados': 0,
+            'bytes_ensamblados': 0,
+            'offset_validado': 0,
+            'lineas_validadas': 0,
+            'error': None,
+            'actualizado': time.time()
+        }
+        self._guardar_manifest(manifest)
+
+        return self._resumen(manifest)
+
+    def recibir_chunk(self, upload_id, numero, stream, checksum):
+        """
+        Guarda el chunk numero leyendo el stream por trozos y verificando su SHA-256.
+        Reenviar un chunk ya recibido con el mismo checksum no tiene efecto.
+        """
+        with _chunk_lock:
+            manifest = self._leer_manifest(upload_id)
+
+        self._verificar_sin_error(manifest)
+
+        if numero < 0 or numero >= manifest['total_chunks']:
+            raise BadRequest(f'Número de chunk inválido: {numero}. Debe estar entre 0 y {manifest["total_chunks"] - 1}')
+
+        if not checksum:
+            raise BadRequest('Falta el SHA-256 del chunk (header X-Chunk-SHA256)')
+        checksum = checksum.lower()
+
+        if manifest['checksums'].get(str(numero)) == checksum:
+            return self._resumen(manifest)
+
+        directorio = self._directorio(upload_id)
+        temporal = os.path.join(directorio, f'{numero}.{uuid.uuid4().hex}.tmp')
+        hasher = hashlib.sha256()
+        size = 0
+
+        try:
+            with open(temporal, 'wb') as file:
+                while True:
+                    datos = stream.read(CHUNK_SIZE)
+                    if not datos:
+                        break
+                    hasher.update(datos)
+                    file.write(datos)
+                    size += len(datos)
+
+            if hasher.hexdigest() != checksum:
+                raise BadRequest(f'El SHA-256 del chunk {numero} no coincide')
+
+            with _chunk_lock:
+                manifest = self._leer_manifest(upload_id)
+
+                if str(numero) in manifest['checksums']:
+                    raise BadRequest(f'El chunk {numero} ya fue recibido con otro contenido')
+
+                max_size = current_app.config.get('UPLOAD_CHUNKED_MAX_SIZE', MAX_TOTAL_SIZE)
+                if manifest['bytes_recibidos'] + size > max_size:
+                    raise BadRequest(f'El archivo supera el máximo de {max_size // (1024 * 1024)}MB')
+
+                os.replace(temporal, self._ruta_chunk(upload_id, numero))
+                manifest['checksums'][str(numero)] = checksum
+                manifest['bytes_recibidos'] += size
+
+                try:
+                    self._ensamblar(manifest)
+                except BadRequest as e:
+                    manifest['error'] = e.description
+                    raise
+                finally:
+                    self._guardar_manifest(manifest)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+        return self._resumen(manifest)
+
+    def estado(self, upload_id):
+        """Estado de la carga: chunks recibidos y el siguiente a enviar para reanudar"""
+        with _chunk_lock:
+            return self._resumen(self._leer_manifest(upload_id))
+
+    def completar(self, upload_id):
+        """
+        Verifica que la carga esté completa y retorna la ruta del archivo ensamblado.
+        El llamador procesa el archivo y luego llama a descartar().
+        """
+        with _chunk_lock:
+            manifest = self._leer_manifest(upload_id)
+
+        self._verificar_sin_error(manifest)
+
+        faltantes = self._faltantes(manifest)
+        if faltantes:
+            raise BadRequest(f'Faltan chunks: {", ".join(str(n) for n in faltantes[:20])}')
+
+        path = self._ruta_archivo(manifest)
+
+        if manifest['total_size'] is not None and os.path.getsize(path) != manifest['total_size']:
+            raise BadRequest(
+                f'El archivo ensamblado mide {os.path.getsize(path)} bytes; se esperaban {manifest["total_size"]}'
+            )
+
+        if manifest['sha256']:
+            hasher = hashlib.sha256()
+            with open(path, 'rb') as file:
+                for datos in iter(lambda: file.read(1024 * 1024), b''):
+                    hasher.update(datos)
+            if hasher.hexdigest() != manifest['sha256']:
+                raise BadRequest('El SHA-256 del archivo ensamblado no coincide')
+
+        return path
+
+    def descartar(self, upload_id):
+        """Elimina la carga y todos sus chunks"""
+        with _chunk_lock:
+            self._leer_manifest(upload_id)
+            shutil.rmtree(self._directorio(upload_id), ignore_errors=True)
+
+    def limpiar_expiradas(self):
+        """Elimina las cargas sin actividad por más de UPLOAD_CHUNK_TTL segundos"""
+        if not os.path.isdir(CHUNKS_FOLDER):
+            return 0
+
+        limite = time.time() - current_app.config.get('UPLOAD_CHUNK_TTL', CHUNK_TTL)
+        eliminadas = 0
+
+        with _chunk_lock:
+            for upload_id in os.listdir(CHUNKS_FOLDER):
+                manifest_path = os.path.join(CHUNKS_FOLDER, upload_id, MANIFEST)
+                try:
+                    expirada = os.path.getmtime(manifest_path) < limite
+                except OSError:
+                    expirada = True
+                if expirada:
+                    shutil.rmtree(os.path.join(CHUNKS_FOLDER, upload_id), ignore_errors=True)
+                    eliminadas += 1
+
+        return eliminadas
+
+    def _ensamblar(self, manifest):
+        """
+        Agrega al archivo los chunks contiguos disponibles y valida las
+        líneas completas del nuevo prefijo. Se llama con _chunk_lock tomado.
+
+        El archivo se trunca primero al largo ensamblado que registra el
+        manifiesto, y los chunks se eliminan recién después de guardarlo: si
+        el proceso se cae entre medio, el reintento no duplica bytes.
+        """
+        upload_id = manifest['upload_id']
+        path = self._ruta_archivo(manifest)
+        consumidos = []
+
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as destino:
+            # Manifiestos previos a bytes_ensamblados: se confía en el largo actual
+            if manifest.get('bytes_ensamblados') is not None:
+                destino.truncate(manifest['bytes_ensamblados'])
+            destino.seek(0, os.SEEK_END)
+            while str(manifest['ensamblados']) in manifest['checksums']:
+                ruta_chunk = self._ruta_chunk(upload_id, manifest['ensamblados'])
+                with open(ruta_chunk, 'rb') as origen:
+                    shutil.copyfileobj(origen, destino)
+                consumidos.append(ruta_chunk)
+                manifest['ensamblados'] += 1
+            manifest['bytes_ensamblados'] = destino.tell()
+
+        if consumidos:
+            self._guardar_manifest(manifest)
+            for ruta_chunk in consumidos:
+                os.remove(ruta_chunk)
+
+        # Un archivo comprimido solo se puede validar al completarse
+        if codec_de(manifest['filename']) is None:
+            self._validar_prefijo(manifest, path)
+
+    def _validar_prefijo(self, manifest, path):
+        """
+        Valida las líneas completas entre offset_validado y el último salto de
+        línea, por ventanas de VENTANA_VALIDACION bytes. El pendiente puede ser
+        casi todo el archivo (ej. si el chunk 0 llega al final), así que nunca
+        se lee completo en memoria.
+        """
+        with open(path, 'rb') as file:
+            size = file.seek(0, os.SEEK_END)
+            if manifest['ensamblados'] == manifest['total_chunks']:
+                fin = size
+            else:
+                fin = self._ultimo_salto(file, manifest['offset_validado'], size)
+                if fin is None:
+                    return
+
+            while manifest['offset_validado'] < fin:
+                inicio = manifest['offset_validado']
+                hasta = self._fin_de_ventana(file, inicio, fin)
+
+                try:
+                    _, lineas, error = parsear_rango(path, inicio, hasta)
+                except UnicodeDecodeError:
+                    raise BadRequest('El archivo no está codificado en UTF-8')
+
+                if error is not None:
+                    numero, line = error
+                    self.validator.validate_line_format(line, manifest['lineas_validadas'] + numero)
+
+                manifest['offset_validado'] = hasta
+                manifest['lineas_validadas'] += lineas
+
+    def _ultimo_salto(self, file, inicio, fin):
+        """Byte siguiente al último '\\n' entre inicio y fin (o None), buscando hacia atrás por bloques"""
+        pos = fin
+        while pos > inicio:
+            desde = max(inicio, pos - BLOQUE_BUSQUEDA)
+            file.seek(desde)
+            salto = file.read(pos - desde).rfind(b'\n')
+            if salto >= 0:
+                return desde + salto + 1
+            pos = desde
+        return None
+
+    def _fin_de_ventana(self, file, inicio, fin):
+        """
+        Fin de la ventana de validación que empieza en inicio: el primer salto
+        de línea después de VENTANA_VALIDACION bytes, para no partir una línea
+        """
+        corte = inicio + VENTANA_VALIDACION
+        if corte >= fin:
+            return fin
+
+        file.seek(corte)
+        resto = file.read(min(BLOQUE_BUSQUEDA, fin - corte))
+        salto = resto.find(b'\n')
+        if salto < 0:
+            # Archivo con saltos '\r' solos: sin '\n' en el bloque, ese '\r' no es parte de un '\r\n'
+            salto = resto.find(b'\r', 0, len(resto) - 1)
+        # Sin saltos en todo el bloque la línea es inválida: se corta y la ventana la reporta
+        return corte + (salto + 1 if salto >= 0 else len(resto))
+
+    def _verificar_sin_error(self, manifest):
+        """Una carga cuyo prefijo resultó inválido no acepta más chunks"""
+        if manifest['error']:
+            raise BadRequest(manifest['error'])
+
+    def _faltantes(self, manifest):
+        return [n for n in range(manifest['total_chunks']) if str(n) not in manifest['checksums']]
+
+    def _resumen(self, manifest):
+        """Vista pública del manifiesto"""
+        faltantes = self._faltantes(manifest)
+        return {
+            'upload_id': manifest['upload_id'],
+            'filename': manifest['filename'],
+            'total_chunks': manifest['total_chunks'],
+            'recibidos': sorted(int(n) for n in manifest['checksums']),
+            'siguiente_chunk': faltantes[0] if faltantes else None,
+            'bytes_recibidos': manifest['bytes_recibidos'],
+            'lineas_validadas': manifest['lineas_validadas'],
+            'completo': not faltantes,
+            'error': manifest['error']
+        }
+
+    def _directorio(self, upload_id):
+        # upload_id viene de la URL: solo se aceptan los ids generados por iniciar
+        if not upload_id or not all(c in '0123456789abcdef' for c in upload_id):
+            raise NotFound(f'Carga {upload_id} no encontrada')
+        return os.path.join(CHUNKS_FOLDER, upload_id)
+
+    def _ruta_chunk(self, upload_id, numero):
+        return os.path.join(self._directorio(upload_id), f'{numero}.part')
+
+    def _ruta_archivo(self, manifest):
+        return os.path.join(self._directorio(manifest['upload_id']), secure_filename(manifest['filename']))
+
+    def _leer_manifest(self, upload_id):
+        try:
+            with open(os.path.join(self._directorio(upload_id), MANIFEST), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            raise NotFound(f'Carga {upload_id} no encontrada')
+
+    def _guardar_manifest(self, manifest):
+        """Escribe el manifiesto de forma atómica (archivo temporal + rename)"""
+        manifest['actualizado'] = time.time()
+        path = os.path.join(self._directorio(manifest['upload_id']), MANIFEST)
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(manifest, file)
+        os.replace(path + '.tmp', path)
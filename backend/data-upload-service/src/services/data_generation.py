@@ -0,0 +1,57 @@
+import time
+import threading
+from flask import current_app
+from src.repositories.data_generation_repository import DataGenerationRepository
+
+# Segundos que se usa la generación leída de la BD antes de volver a consultarla
+GENERACION_TTL = 5
+
+
+class GeneracionDatos:
+    """
+    Generación de los datos visibles, para el ETag y Last-Modified de las lecturas.
+    
+    El contador se guarda en data_generation (compartido por todos los procesos
+    del servicio) y se mantiene en memoria ttl segundos: dentro de ese plazo,
+    actual() no consulta la BD. incrementar() actualiza la copia en memoria de
+    inmediato, así que las cargas de este proceso se ven en la siguiente
+    request; las de otro proceso, a lo más ttl segundos después.
+    """
+
+    def __init__(self, ttl=GENERACION_TTL):
+        self.ttl = ttl
+        self.numero = None
+        self.modificado = None
+        self.leido = None
+        self.lock = threading.Lock()
+
+    def actual(self):
+        """Retorna (generación, fecha de modificación); (0, None) si nunca se cargaron datos"""
+        with self.lock:
+            if self.leido is not None and time.monotonic() - self.leido < self.ttl:
+                return self.numero, self.modificado
+        return self._recordar(DataGenerationRepository.find())
+
+    def incrementar(self):
+        """Incrementa la generación en la BD (los datos cambiaron) y retorna la nueva"""
+        return self._recordar(DataGenerationRepository.bump())
+
+    def _recordar(self, fila):
+        numero, modificado = (fila.generation, fila.updated_at) if fila is not None else (0, None)
+        with self.lock:
+            # Una lectura que terminó después de un incremento de otro hilo no lo deshace
+            if self.numero is None or numero >= self.numero:
+                self.numero, self.modificado = numero, modificado
+            self.leido = time.monotonic()
+            return self.numero, self.modificado
+
+
+def generacion_datos():
+    """GeneracionDatos de la aplicación actual"""
+    return current_app.extensions['data_generation']
+
+
+def init_data_generation(app):
+    """Registra la generación de datos en la aplicación"""
+    app.extensions['data_generation'] = GeneracionDatos(app.config.get('DATA_GENERATION_TTL', GENERACION_TTL))
+    return app.extensions['data_generation']
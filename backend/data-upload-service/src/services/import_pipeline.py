@@ -0,0 +1,73 @@
+import queue
+import threading
+from flask import current_app
+
+PIPELINE_DEPTH = 4
+PUT_TIMEOUT = 0.1
+
+# Marca de fin de la lectura
+_FIN = object()
+
+
+def en_segundo_plano(filas, batch_size, profundidad=PIPELINE_DEPTH):
+    """
+    Consume el iterable filas (lectura + validación) en un hilo productor y
+    entrega sus elementos en el hilo actual (escritura en BD) a través de
+    una cola acotada de lotes de batch_size filas.
+
+    Así el parseo del siguiente lote se solapa con el insert del anterior.
+    Como la cola admite a lo sumo profundidad lotes, un productor más rápido
+    que la BD se bloquea en vez de acumular el archivo en memoria.
+
+    Un error del productor (ej. BadRequest por línea inválida) se relanza en
+    el consumidor. Si el consumidor deja de iterar, al cerrar el generador
+    (contextlib.closing) el productor se detiene y se espera su término.
+    """
+    app = current_app._get_current_object()
+    cola = queue.Queue(maxsize=profundidad)
+    detener = threading.Event()
+
+    def _poner(item):
+        """Encola item esperando espacio; retorna False si el consumidor ya no lo necesita"""
+        while not detener.is_set():
+            try:
+                cola.put(item, timeout=PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _producir():
+        with app.app_context():
+            try:
+                lote = []
+                for fila in filas:
+                    lote.append(fila)
+                    if len(lote) >= batch_size:
+                        if not _poner(lote):
+                            return
+                        lote = []
+                if lote and not _poner(lote):
+                    return
+                _poner(_FIN)
+            except Exception as e:
+                _poner(e)
+            finally:
+                cerrar = getattr(filas, 'close', None)
+                if cerrar:
+                    cerrar()
+
+    hilo = threading.Thread(target=_producir, name='upload-parser', daemon=True)
+    hilo.start()
+
+    try:
+        while True:
+            item = cola.get()
+            if item is _FIN:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+    finally:
+        detener.set()
+        hilo.join()
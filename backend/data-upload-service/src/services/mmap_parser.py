@@ -0,0 +1,119 @@
+import re
+import mmap
+from src.validators.data_validator import DataValidator, DIAS_POR_MES
+
+# Cada cuántos bytes leídos se liberan del proceso las páginas ya recorridas
+LIBERAR_CADA = 8 * 1024 * 1024
+
+# Línea válida completa, en bytes, con su salto de línea ('\n', '\r\n', '\r' o fin de archivo).
+# Los espacios alrededor son los que str.strip() también quitaría.
+LINEA_BYTES = re.compile(
+    rb'[ \t\f\v]*([0-9]{4}/[0-9]{2}/[0-9]{2});([0-9]{2}:[0-9]{2});([0-9]{1,8}-[0-9Kk])[ \t\f\v]*(?:\r\n|\n|\r|\Z)'
+)
+
+
+def _fecha(valor):
+    """Retorna la fecha yyyy/MM/dd decodificada si existe en el calendario, o None"""
+    anio, mes, dia = int(valor[:4]), int(valor[5:7]), int(valor[8:])
+    if not (1 <= mes <= 12 and anio >= 1):
+        return None
+    dias_mes = DIAS_POR_MES[mes]
+    if mes == 2 and anio % 4 == 0 and (anio % 100 != 0 or anio % 400 == 0):
+        dias_mes = 29
+    return valor.decode('ascii') if 1 <= dia <= dias_mes else None
+
+
+def _hora(valor):
+    """Retorna la hora HH:mm decodificada si está en rango, o None"""
+    return valor.decode('ascii') if int(valor[:2]) < 24 and int(valor[3:]) < 60 else None
+
+
+def _fin_de_linea(mm, inicio):
+    """Byte siguiente al salto de línea (universal) de la línea que empieza en inicio"""
+    lf = mm.find(b'\n', inicio)
+    cr = mm.find(b'\r', inicio, lf if lf >= 0 else len(mm))
+    if cr >= 0:
+        return cr + 2 if mm[cr + 1:cr + 2] == b'\n' else cr + 1
+    return lf + 1 if lf >= 0 else len(mm)
+
+
+def parsear_mmap(path, avance=None, cada=0):
+    """
+    Genera tuplas (fecha, hora, rut) validadas recorriendo el archivo
+    mapeado en memoria (mmap), en bytes, sin decodificarlo completo.
+
+    Cada línea válida se reconoce con un solo patrón en bytes y solo se
+    decodifican sus tres campos. Las fechas y horas ya vistas se toman de
+    un caché, así que cada valor distinto se valida y decodifica una vez
+    y las tuplas comparten los mismos str.
+
+    Las líneas que no calzan (vacías, con espacios no ASCII o inválidas)
+    se decodifican y se validan con DataValidator.validate_line_format,
+    de modo que el resultado, los números de línea y los mensajes de error
+    son los mismos que al leer el archivo en modo texto.
+
+    Las páginas ya recorridas se liberan cada LIBERAR_CADA bytes
+    (madvise MADV_DONTNEED), así el RSS del proceso no crece con el tamaño
+    del archivo; los datos siguen en el page cache del sistema.
+
+    avance(lineas, posicion), si se entrega, se llama cada cada líneas y al
+    terminar el archivo.
+    """
+    fechas = {}
+    horas = {}
+    linea = 0
+    pos = 0
+    liberado = 0
+
+    with open(path, 'rb') as file:
+        size = file.seek(0, 2)
+        if size == 0:
+            if avance:
+                avance(0, 0)
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            liberar = hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_DONTNEED')
+            if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+
+            match = LINEA_BYTES.match
+            m = None
+            try:
+                while pos < size:
+                    linea += 1
+                    if cada and linea % cada == 0:
+                        avance(linea, pos)
+                    if liberar and pos - liberado >= LIBERAR_CADA:
+                        hasta = pos - pos % mmap.PAGESIZE
+                        mm.madvise(mmap.MADV_DONTNEED, liberado, hasta - liberado)
+                        liberado = hasta
+
+                    m = match(mm, pos)
+                    if m is not None:
+                        valor_fecha, valor_hora, valor_rut = m.groups()
+
+                        fecha = fechas.get(valor_fecha)
+                        if fecha is None and valor_fecha not in fechas:
+                            fecha = fechas[valor_fecha] = _fecha(valor_fecha)
+                        hora = horas.get(valor_hora)
+                        if hora is None and valor_hora not in horas:
+                            hora = horas[valor_hora] = _hora(valor_hora)
+
+                        if fecha is not None and hora is not None:
+                            pos = m.end()
+                            yield fecha, hora, valor_rut.decode('ascii')
+                            continue
+
+                    # Camino lento: misma validación (y mensajes) que el modo texto
+                    fin = _fin_de_linea(mm, pos)
+                    line = mm[pos:fin].decode('utf-8').strip()
+                    pos = fin
+                    if line:
+                        yield DataValidator.validate_line_format(line, linea)
+            finally:
+                # Un match vivo mantiene exportado el buffer e impide cerrar el mmap
+                m = None
+
+    if avance:
+        avance(linea, pos)
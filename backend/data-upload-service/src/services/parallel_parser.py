@@ -0,0 +1,105 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from src.validators.data_validator import DataValidator
+from src.errors.errors import BadRequest
+
+RANGE_SIZE = 8 * 1024 * 1024
+
+
+def dividir_rangos(path, range_size=RANGE_SIZE):
+    """
+    Divide el archivo en rangos de bytes (inicio, fin) alineados a salto de línea.
+    Cada rango termina justo después de un '\\n', así ninguna línea queda partida.
+    """
+    size = os.path.getsize(path)
+    rangos = []
+
+    with open(path, 'rb') as file:
+        inicio = 0
+        while inicio < size:
+            fin = inicio + range_size
+            if fin < size:
+                file.seek(fin)
+                file.readline()
+                fin = file.tell()
+            else:
+                fin = size
+            rangos.append((inicio, fin))
+            inicio = fin
+
+    return rangos
+
+
+def parsear_rango(path, inicio, fin):
+    """
+    Valida y parsea un rango del archivo (se ejecuta en un proceso worker).
+
+    Los números de línea son locales al rango, porque el worker no sabe
+    cuántas líneas hay antes. Retorna (filas, lineas_leidas, error), donde
+    error es None o (linea_local, contenido) de la primera línea inválida.
+    """
+    with open(path, 'rb') as file:
+        file.seek(inicio)
+        contenido = file.read(fin - inicio).decode('utf-8')
+
+    filas = []
+    lineas = 0
+
+    # newline=None reproduce los saltos de línea universales de open(..., 'r')
+    for lineas, line in enumerate(io.StringIO(contenido, newline=None), 1):
+        line = line.strip()
+
+        if not line:
+            continue
+
+        try:
+            filas.append(DataValidator.validate_line_format(line, lineas))
+        except BadRequest:
+            return filas, lineas, (lineas, line)
+
+    return filas, lineas, None
+
+
+def parsear_en_paralelo(path, workers, range_size=RANGE_SIZE, avance=None):
+    """
+    Genera lotes de tuplas (fecha, hora, rut) parseados en varios procesos.
+
+    Los lotes se entregan en el orden del archivo. Solo hay workers * 2
+    rangos en vuelo a la vez, de modo que la memoria queda acotada aunque
+    el consumidor (la escritura en BD) sea más lento que el parseo.
+    Ante una línea inválida se lanza el mismo BadRequest que en modo
+    secuencial, con el número de línea absoluto. avance(lineas, posicion),
+    si se entrega, se llama después de cada rango con las líneas leídas
+    y el byte donde termina el rango.
+    """
+    rangos = iter(dividir_rangos(path, range_size))
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pendientes = deque()
+
+    def _encolar():
+        rango = next(rangos, None)
+        if rango is not None:
+            pendientes.append((executor.submit(parsear_rango, path, *rango), rango[1]))
+
+    try:
+        for _ in range(workers * 2):
+            _encolar()
+
+        linea_base = 0
+        while pendientes:
+            future, fin = pendientes.popleft()
+            filas, lineas, error = future.result()
+            _encolar()
+
+            if error is not None:
+                numero, line = error
+                DataValidator.validate_line_format(line, linea_base + numero)
+
+            yield filas
+            linea_base += lineas
+            if avance:
+                avance(linea_base, fin)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -1,20 +1,116 @@
 import os
+import json
+import time
+import zlib
+import base64
+import binascii
+import hashlib
+import tempfile
+import threading
+from collections import Counter
+from contextlib import nullcontext, closing
+from flask import current_app
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import HTTPException
 from src.repositories.data_repository import DataRepository
-from src.models.data import Data
+from src.repositories.upload_log_repository import UploadLogRepository
+from src.repositories.data_summary_repository import DataSummaryRepository
+from src.models.upload_log import UPLOAD_STATUSES
+from src.models.data import ALMACENAMIENTO_COMPACTO
+from src.models.types import rut_canonico
 from src.validators.data_validator import DataValidator
-from src.errors.errors import BadRequest
+from src.services.upload_stream import (
+    MultipartFileReader, ChunkStream, open_text, descomprimir, codec_de, MAX_DECOMPRESSED_SIZE
+)
+from src.services.parallel_parser import parsear_en_paralelo, RANGE_SIZE
+from src.services.mmap_parser import parsear_mmap
+from src.services.import_pipeline import en_segundo_plano, PIPELINE_DEPTH
+from src.services.upload_progress import ProgresoCarga
+from src.services.upload_metrics import MetricasCarga
+from src.services.upload_summary import ResumenCarga
+from src.services.data_generation import generacion_datos
+from src.errors.errors import BadRequest, ServiceUnavailable
 
 ALLOWED_NAME = 'DATA.TXT'
 UPLOAD_FOLDER = 'uploads'
+BATCH_SIZE = 5000
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_ERRORES_VALIDACION = 1000
+MAX_LARGO_LINEA_REPORTE = 200
+PROGRESS_EVERY_LINES = 10000
+HISTORIAL_LIMITE = 50
+HISTORIAL_LIMITE_MAXIMO = 500
+PAGINA_DATOS = 1000
+PAGINA_DATOS_MAXIMO = 10000
+EXPORT_BATCH_SIZE = 2000
+
+# Formatos de GET /data/export
+FORMATO_NDJSON = 'ndjson'
+FORMATO_CSV = 'csv'
+FORMATOS_EXPORTACION = (FORMATO_NDJSON, FORMATO_CSV)
+
+# Modos de carga
+MODO_REEMPLAZO = 'replace'
+MODO_DIFF = 'diff'
+MODO_APPEND = 'append'
+MODO_MESES = 'months'
+MODOS_CARGA = (MODO_REEMPLAZO, MODO_DIFF, MODO_APPEND, MODO_MESES)
+
+# Backends de inserción (UPLOAD_BACKEND)
+BACKEND_INSERT = 'insert'
+BACKEND_LOAD_DATA = 'load_data'
+
+# Lectores de archivos guardados sin comprimir (UPLOAD_PARSER)
+PARSER_TEXTO = 'text'
+PARSER_MMAP = 'mmap'
+
+# Todas las cargas escriben sobre data / data_staging: se ejecutan de a una por proceso
+_import_lock = threading.Lock()
+
+def _codificar_cursor(fecha, hora, data_id):
+    """Cursor opaco (base64 URL-safe) de la posición (fecha, hora, id) de una fila"""
+    return base64.urlsafe_b64encode(json.dumps([fecha, hora, data_id]).encode('utf-8')).decode('ascii')
+
+def _decodificar_cursor(cursor):
+    """Posición (fecha, hora, id) de un cursor de _codificar_cursor; lanza BadRequest si es inválido"""
+    try:
+        fecha, hora, data_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        DataValidator.validate_fecha(fecha)
+        DataValidator.validate_hora(hora)
+        if not isinstance(data_id, int):
+            raise ValueError(data_id)
+    except (ValueError, TypeError, UnicodeError, binascii.Error, BadRequest):
+        raise BadRequest('Cursor inválido')
+    return fecha, hora, data_id
+
+def _tamano(path):
+    """Tamaño del archivo en bytes, o None si no se puede obtener"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+def _omitidos(cantidad):
+    """Frase del mensaje de una carga con las marcaciones repetidas omitidas (vacía si no hubo)"""
+    return f' {cantidad} registros repetidos omitidos.' if cantidad else ''
 
 class SubirDataService:
     
     def __init__(self):
         self.data_repository = DataRepository()
+        self.upload_log_repository = UploadLogRepository()
+        self.data_summary_repository = DataSummaryRepository()
         self.validator = DataValidator()
+        self.metricas = MetricasCarga()
+        # Conteo de las filas de un reemplazo, para el resumen de la generación
+        self.resumen = None
+        # La carga ya confirmó cambios visibles en data (lotes sobre data, limpieza o un mes
+        # intercambiado): si falla, data no queda como estaba
+        self.data_modificada = False
+        # data_staging es de esta carga (la creó o la retoma): solo entonces se descarta al fallar
+        self.staging_propia = False
     
-    def guardar(self, file):
+    def guardar(self, file, nombre=None):
         """
         Guarda el archivo subido después de validarlo.
         
@@ -22,6 +118,8 @@ class SubirDataService:
         - Archivo no puede estar vacío
         - Nombre debe ser exactamente "DATA.TXT" (case insensitive)
         - Debe ser un archivo válido
+        
+        nombre permite guardar con otro nombre (ej. uno único por job).
         """
         self.validator.validate_file(file)
         
@@ -29,55 +127,952 @@ class SubirDataService:
         os.makedirs(UPLOAD_FOLDER, exist_ok=True)
         
         # Guardar archivo
-        filename = secure_filename(file.filename)
+        filename = secure_filename(nombre or file.filename)
         path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(path)
+        with self.metricas.medir('save'):
+            file.save(path)
         
         return path
 
-    def leer_txt(self, path):
+    def leer_txt(self, path, progreso=None, log_id=None, forzar=False, modo=MODO_REEMPLAZO, reanudar=False):
         """
         Lee y procesa el archivo TXT línea por línea.
         
         Proceso:
-        1. Limpieza de datos previos
-        2. Lectura línea por línea
-        3. Parsing de formato: fecha;hora;rut
-        4. Validación de cada campo
-        5. Almacenamiento en BD
+        1. Cálculo del SHA-256 del archivo (por trozos)
+        2. Si es idéntico a la generación cargada actualmente, no se recarga
+        3. Limpieza de datos previos
+        4. Lectura línea por línea, parsing de formato: fecha;hora;rut
+        5. Validación de cada campo
+        6. Almacenamiento en BD por lotes (executemany)
+        
+        Con UPLOAD_COMMIT_MODE = 'file' la limpieza y todas las inserciones
+        ocurren en una sola transacción: un error de validación deja la
+        tabla tal como estaba antes de la carga.
+        
+        Con UPLOAD_PARSE_WORKERS > 1 los archivos de más de un rango
+        (UPLOAD_PARSE_RANGE_SIZE) se validan en paralelo en varios procesos.
+        
+        Los archivos .gz, .bz2 y .xz se descomprimen mientras se leen.
+        
+        El tiempo de cada fase (guardado, hash, parseo, escritura, commits) y
+        las líneas leídas quedan en el registro de upload_logs de la carga,
+        tanto si termina bien como si falla.
+        
+        Con UPLOAD_COMMIT_MODE = 'batch', un reemplazo de un archivo sin
+        comprimir registra en upload_logs un checkpoint por lote (byte, línea
+        y filas confirmadas) en la misma transacción que el lote. reanudar
+        continúa una carga interrumpida desde su último checkpoint.
+        
+        progreso, si se entrega, recibe la cantidad de registros insertados
+        después de cada lote. Si es un ProgresoCarga recibe además las líneas
+        leídas y el byte alcanzado cada UPLOAD_PROGRESS_EVERY_LINES líneas. log_id es el registro de upload_logs de la
+        carga (si no se entrega se crea uno). forzar recarga aunque el
+        archivo sea idéntico al actual. modo es uno de MODOS_CARGA:
+        'replace' reemplaza la generación completa, 'diff' aplica solo
+        las diferencias con los datos actuales, 'append' agrega las
+        marcaciones que aún no existen sin borrar nada y 'months' reemplaza
+        solo los meses presentes en el archivo.
         """
-        try:
-            self._limpiar_datos_previos()
+        self._validar_modo(modo)
+        
+        with _import_lock:
+            log_id = self._iniciar_registro(log_id, os.path.basename(path), _tamano(path), path, modo)
+            try:
+                file_hash = None
+                if self._dedup_habilitado(modo):
+                    with self.metricas.medir('hash'):
+                        file_hash = self._calcular_hash(path)
+                if isinstance(progreso, ProgresoCarga):
+                    progreso.iniciar()
+                
+                if reanudar:
+                    resultado = self._importar_con_checkpoints(path, log_id, progreso, True, file_hash)
+                elif file_hash and not forzar and self._es_generacion_actual(file_hash, log_id):
+                    resultado = self._resultado_sin_cambios()
+                elif self._usa_checkpoints(path, modo):
+                    resultado = self._importar_con_checkpoints(path, log_id, progreso, file_hash=file_hash)
+                else:
+                    resultado = self._cargar(self._filas_de_archivo(path, self._avance(progreso)), modo, progreso)
+            except Exception as e:
+                raise self._fallar_carga(e, log_id)
+            
+            return self._completar_registro(log_id, resultado, file_hash)
+    
+    def leer_stream(self, stream, content_type, archivar=False, forzar=False, modo=MODO_REEMPLAZO):
+        """
+        Procesa el archivo directamente desde el cuerpo multipart de la request.
+        
+        Las líneas se validan e insertan a medida que llegan los bytes, sin
+        escribir DATA.TXT en disco ni volver a leerlo. Si archivar es True,
+        los bytes crudos se copian además a uploads/ mientras se procesan.
+        El SHA-256 se calcula sobre la marcha; si al terminar coincide con la
+        generación actual, la carga se descarta sin reemplazar los datos.
+        """
+        self._validar_modo(modo)
+        
+        with _import_lock:
+            log_id = None
+            try:
+                reader = MultipartFileReader(stream, content_type)
+                filename = reader.find_file('file')
+                
+                if filename is None:
+                    raise BadRequest('No se ha proporcionado ningún archivo')
+                
+                self.validator.validate_filename(filename)
+                log_id = self._iniciar_registro(None, filename, modo=modo)
+                
+                if archivar:
+                    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+                    tee = open(os.path.join(UPLOAD_FOLDER, secure_filename(filename)), 'wb')
+                else:
+                    tee = nullcontext()
+                
+                hasher = hashlib.sha256() if self._dedup_habilitado(modo) else None
+                
+                def _sin_cambios():
+                    return not forzar and self._es_generacion_actual(hasher.hexdigest(), log_id)
+                
+                with tee:
+                    raw = ChunkStream(reader.iter_chunks(), tee=tee if archivar else None, hasher=hasher)
+                    with open_text(self._descomprimir(raw, filename)) as file:
+                        resultado = self._cargar(
+                            self._parsear_lineas(file, self.metricas.lineas),
+                            modo,
+                            descartar_si=_sin_cambios if hasher else None
+                        )
+            except Exception as e:
+                raise self._fallar_carga(e, log_id)
+            
+            if resultado is None:
+                resultado = self._resultado_sin_cambios()
+            
+            return self._completar_registro(
+                log_id, resultado, hasher.hexdigest() if hasher else None, file_size=raw.size
+            )
+    
+    def validar_stream(self, stream, content_type, max_errores=None):
+        """
+        Valida el archivo completo desde el cuerpo multipart sin escribir en
+        la BD ni en disco (dry run) y retorna un reporte con todos los errores.
+        
+        A diferencia de la carga, no se detiene en la primera línea inválida:
+        se recorren todas las líneas en una sola pasada y se guardan hasta
+        max_errores errores (UPLOAD_VALIDATE_MAX_ERRORS), con su número de
+        línea, contenido y motivo. Pasado ese límite solo se cuentan.
+        """
+        if max_errores is None:
+            max_errores = current_app.config.get('UPLOAD_VALIDATE_MAX_ERRORS', MAX_ERRORES_VALIDACION)
+        
+        reader = MultipartFileReader(stream, content_type)
+        filename = reader.find_file('file')
+        
+        if filename is None:
+            raise BadRequest('No se ha proporcionado ningún archivo')
+        
+        self.validator.validate_filename(filename)
+        
+        inicio = time.perf_counter()
+        raw = ChunkStream(reader.iter_chunks())
+        with open_text(self._descomprimir(raw, filename), errors='replace') as file:
+            reporte = self._reporte_validacion(file, max_errores)
+        
+        reporte['filename'] = filename
+        reporte['duracion_segundos'] = round(time.perf_counter() - inicio, 3)
+        return reporte
+    
+    def _reporte_validacion(self, file, max_errores):
+        """Recorre todas las líneas acumulando los errores de validación"""
+        validate_line_format = self.validator.validate_line_format
+        errores = []
+        total_errores = 0
+        registros_validos = 0
+        lineas = 0
+        
+        for lineas, line in enumerate(file, 1):
+            line = line.strip()
             
-            # 2. Lectura y procesamiento del archivo
-            registros_procesados = 0
+            if not line:
+                continue
+            
+            try:
+                if '\ufffd' in line:
+                    raise BadRequest('La línea no está codificada en UTF-8')
+                validate_line_format(line, lineas)
+                registros_validos += 1
+            except BadRequest as e:
+                total_errores += 1
+                if len(errores) < max_errores:
+                    errores.append({
+                        'linea': lineas,
+                        'contenido': line[:MAX_LARGO_LINEA_REPORTE],
+                        'error': e.description
+                    })
+        
+        return {
+            'valido': total_errores == 0,
+            'lineas_leidas': lineas,
+            'registros_validos': registros_validos,
+            'total_errores': total_errores,
+            'errores': errores,
+            'truncado': total_errores > len(errores)
+        }
+    
+    def _filas_de_archivo(self, path, avance=None):
+        """
+        Genera las tuplas validadas de un archivo guardado, en paralelo si corresponde.
+        avance(lineas, posicion), si se entrega, recibe las líneas leídas y el
+        byte del archivo alcanzado (en un archivo comprimido, el byte comprimido).
+        """
+        workers = current_app.config.get('UPLOAD_PARSE_WORKERS', 0)
+        range_size = current_app.config.get('UPLOAD_PARSE_RANGE_SIZE', RANGE_SIZE)
+        
+        if codec_de(path) is not None:
+            # Un archivo comprimido no se puede dividir en rangos de bytes
+            with open(path, 'rb') as raw, open_text(self._descomprimir(raw, path)) as file:
+                yield from self._parsear_lineas(file, avance, raw.tell)
+            return
+        
+        if workers > 1 and os.path.getsize(path) > range_size:
+            for lote in parsear_en_paralelo(path, workers, range_size, avance):
+                yield from lote
+            return
+        
+        if current_app.config.get('UPLOAD_PARSER', PARSER_TEXTO) == PARSER_MMAP:
+            # Recorre el archivo en bytes sobre un mmap: solo decodifica los campos de cada línea
+            cada = current_app.config.get('UPLOAD_PROGRESS_EVERY_LINES', PROGRESS_EVERY_LINES) if avance else 0
+            yield from parsear_mmap(path, avance, cada)
+            return
+        
+        with open(path, 'r', encoding='utf-8') as file:
+            yield from self._parsear_lineas(file, avance, file.buffer.tell)
+    
+    def _avance(self, progreso):
+        """Callback de líneas leídas: las métricas de la carga y progreso, si es un ProgresoCarga"""
+        if not isinstance(progreso, ProgresoCarga):
+            return self.metricas.lineas
+        
+        def _avance(lineas, posicion=None):
+            self.metricas.lineas(lineas, posicion)
+            progreso.lineas(lineas, posicion)
+        return _avance
+    
+    def _descomprimir(self, raw, filename):
+        """Descomprime raw según la extensión de filename, con el límite configurado"""
+        return descomprimir(
+            raw, filename,
+            current_app.config.get('UPLOAD_MAX_DECOMPRESSED_SIZE', MAX_DECOMPRESSED_SIZE)
+        )
+    
+    def _cargar(self, filas, modo, progreso=None, descartar_si=None):
+        """
+        Aplica las filas validadas según el modo de carga.
+        
+        Con UPLOAD_PIPELINE (por defecto) la lectura y validación corren en
+        un hilo aparte y entregan lotes por una cola acotada de
+        UPLOAD_PIPELINE_DEPTH lotes, mientras este hilo escribe en la BD.
+        """
+        if ALMACENAMIENTO_COMPACTO:
+            filas = self._normalizar_ruts(filas)
+        if modo == MODO_REEMPLAZO:
+            # El archivo será la tabla completa: el resumen se cuenta al pasar (en el hilo lector)
+            self.resumen = ResumenCarga()
+            filas = self.resumen.contar(filas)
+        
+        filas = self.metricas.cronometrar(filas, 'parse')
+        if not current_app.config.get('UPLOAD_PIPELINE', True):
+            with self.metricas.escritura('parse', 'commit'):
+                return self._aplicar_modo(filas, modo, progreso, descartar_si)
+        
+        pipeline = en_segundo_plano(
+            filas,
+            current_app.config.get('UPLOAD_BATCH_SIZE', BATCH_SIZE),
+            current_app.config.get('UPLOAD_PIPELINE_DEPTH', PIPELINE_DEPTH)
+        )
+        # closing detiene el hilo lector aunque la escritura falle a mitad de archivo
+        with closing(pipeline), self.metricas.escritura('wait', 'commit'):
+            return self._aplicar_modo(self.metricas.cronometrar(pipeline, 'wait'), modo, progreso, descartar_si)
+    
+    def _normalizar_ruts(self, filas):
+        """
+        Con almacenamiento compacto, entrega cada RUT como quedará guardado
+        (rut_canonico): así el resumen, el diff y la clave única ven el mismo
+        valor que después entregan /data y /ruts
+        """
+        for fecha, hora, rut in filas:
+            if rut[0] == '0' or rut[-1] == 'k':
+                rut = rut_canonico(rut)
+            yield fecha, hora, rut
+    
+    def _aplicar_modo(self, filas, modo, progreso=None, descartar_si=None):
+        """Despacha las filas validadas a la carga del modo indicado"""
+        if modo == MODO_DIFF:
+            return self._aplicar_diff(filas, progreso)
+        if modo == MODO_APPEND:
+            return self._agregar(filas, progreso)
+        if modo == MODO_MESES:
+            return self._reemplazar_meses(filas, progreso)
+        return self._importar(filas, progreso, descartar_si)
+    
+    def _importar(self, filas, progreso=None, descartar_si=None):
+        """
+        Carga las tuplas (fecha, hora, rut) validadas como nueva generación de marcaciones.
+        El llamador debe tener tomado _import_lock.
+        
+        Estrategias (UPLOAD_REPLACE_STRATEGY):
+        - 'swap' (por defecto): se carga en data_staging y luego se intercambia
+          atómicamente con data. Los lectores nunca ven la tabla vacía ni a medias.
+        - 'delete': se eliminan los datos previos y se inserta sobre data.
+        
+        descartar_si se evalúa una vez insertadas todas las filas y antes de
+        confirmar; si retorna True la carga se revierte y se retorna None.
+        Solo se evalúa si la carga aún es reversible.
+        
+        Las marcaciones repetidas dentro del archivo se omiten por la clave
+        única y se informan en registros_omitidos.
+        """
+        inicio = time.perf_counter()
+        commit_por_lote = current_app.config.get('UPLOAD_COMMIT_MODE') == 'batch'
+        
+        registros_leidos = 0
+        
+        def _contar(filas):
+            nonlocal registros_leidos
+            for fila in filas:
+                registros_leidos += 1
+                yield fila
+        
+        if current_app.config.get('UPLOAD_REPLACE_STRATEGY', 'swap') == 'swap':
+            self._crear_staging()
+            tabla = self.data_repository.staging_table()
+        else:
+            self._limpiar_datos_previos(commit=commit_por_lote)
+            self.data_modificada = commit_por_lote
+            tabla = None
+        
+        registros_procesados, backend = self._insertar(_contar(filas), tabla, commit_por_lote, progreso)
+        
+        reversible = tabla is not None or not commit_por_lote
+        if descartar_si is not None and reversible and descartar_si():
+            self.data_repository.rollback()
+            if tabla is not None:
+                self.data_repository.drop_staging()
+            return None
+        
+        self._commit()
+        
+        if tabla is not None:
+            self.data_repository.swap_staging()
+            self.data_repository.drop_old(background=self.data_repository.supports_background_drop())
+        
+        duracion = time.perf_counter() - inicio
+        omitidos = registros_leidos - registros_procesados
+        
+        return {
+            'mensaje': f'Archivo procesado exitosamente. {registros_procesados} registros importados.{_omitidos(omitidos)}',
+            'registros_procesados': registros_procesados,
+            'registros_omitidos': omitidos,
+            'backend': backend,
+            'duracion_segundos': round(duracion, 3),
+            'registros_por_segundo': round(registros_procesados / duracion, 1) if duracion > 0 else 0
+        }
+    
+    def _crear_staging(self):
+        """
+        Crea data_staging para esta carga. Si una carga con checkpoint sigue
+        en proceso (en curso en otro proceso o a la espera de retomarse), su
+        data_staging tiene lotes confirmados: no se reemplaza y se responde 503.
+        """
+        pendiente = self.upload_log_repository.find_checkpointed()
+        if pendiente is not None and self.data_repository.staging_exists():
+            raise ServiceUnavailable(
+                f'La carga {pendiente.id} está en proceso o pendiente de retomarse sobre data_staging. '
+                'Intente nuevamente más tarde.'
+            )
+        self.data_repository.create_staging()
+        self.staging_propia = True
+    
+    def _usa_checkpoints(self, path, modo):
+        """
+        Indica si la carga se confirma por lotes con checkpoint: solo reemplazos
+        con UPLOAD_COMMIT_MODE = 'batch' de archivos sin comprimir (el
+        checkpoint es un byte del archivo)
+        """
+        return (
+            modo == MODO_REEMPLAZO
+            and current_app.config.get('UPLOAD_COMMIT_MODE') == 'batch'
+            and codec_de(path) is None
+        )
+    
+    def _importar_con_checkpoints(self, path, log_id, progreso=None, reanudar=False, file_hash=None):
+        """
+        Reemplazo confirmado por lotes: cada lote se inserta y se confirma junto
+        con su checkpoint en upload_logs (byte siguiente, última línea y filas
+        confirmadas). Si el proceso se cae, la carga se retoma desde ese byte
+        sin volver a leer ni insertar lo ya confirmado.
+        
+        Con la estrategia 'swap' los lotes se confirman en data_staging, que
+        sobrevive a un reinicio; con 'delete' la limpieza de data se confirma
+        junto con el checkpoint inicial.
+        
+        El SHA-256 del archivo (file_hash, o se calcula) se registra al empezar
+        como source_hash; una carga solo se retoma si el archivo sigue siendo
+        el mismo, porque el checkpoint es un byte de ese archivo.
+        
+        registros_omitidos cuenta las repetidas leídas en esta ejecución: en
+        una carga retomada no incluye las anteriores al checkpoint.
+        """
+        inicio = time.perf_counter()
+        batch_size = current_app.config.get('UPLOAD_BATCH_SIZE', BATCH_SIZE)
+        swap = current_app.config.get('UPLOAD_REPLACE_STRATEGY', 'swap') == 'swap'
+        tabla = self.data_repository.staging_table() if swap else None
+        
+        if file_hash is None:
+            with self.metricas.medir('hash'):
+                file_hash = self._calcular_hash(path)
+        
+        log = self.upload_log_repository.find_by_id(log_id)
+        if reanudar and log.checkpoint_offset is not None:
+            offset, linea, insertados = log.checkpoint_offset, log.checkpoint_line, log.checkpoint_rows
+            if log.source_hash != file_hash:
+                raise BadRequest('No se puede reanudar la carga: el archivo cambió desde que empezó')
+            if swap and not self.data_repository.staging_exists():
+                raise BadRequest('No se puede reanudar la carga: la tabla de staging ya no existe')
+            self.staging_propia = swap
+            if isinstance(progreso, ProgresoCarga):
+                progreso.iniciar(offset, linea, insertados)
+        else:
+            offset = linea = insertados = 0
+            if swap:
+                self._crear_staging()
+            else:
+                self._limpiar_datos_previos(commit=False)
+            self.upload_log_repository.set_source_hash(log_id, file_hash)
+            self.upload_log_repository.checkpoint(log_id, 0, 0, 0)
+            self._commit()
+        self.data_modificada = not swap
+        confirmados_antes = insertados
+        registros_leidos = 0
+        
+        lotes = self.metricas.cronometrar(self._lotes_desde(path, offset, linea, batch_size), 'parse', cada=1)
+        espera = 'parse'
+        if current_app.config.get('UPLOAD_PIPELINE', True):
+            # Cada elemento de la cola es un lote completo con su posición
+            lotes = en_segundo_plano(lotes, 1, current_app.config.get('UPLOAD_PIPELINE_DEPTH', PIPELINE_DEPTH))
+            lotes = self.metricas.cronometrar(lotes, 'wait', cada=1)
+            espera = 'wait'
+        
+        with closing(lotes), self.metricas.escritura(espera, 'commit'):
+            for filas, offset, linea in lotes:
+                registros_leidos += len(filas)
+                if ALMACENAMIENTO_COMPACTO:
+                    filas = self._normalizar_ruts(filas)
+                insertados += self.data_repository.bulk_insert(filas, batch_size=batch_size, table=tabla)
+                self.upload_log_repository.checkpoint(log_id, offset, linea, insertados)
+                self._commit()
+                if progreso:
+                    progreso(insertados)
+                avance = self._avance(progreso)
+                if avance:
+                    avance(linea, offset)
+        
+        if swap:
+            self.data_repository.swap_staging()
+            self.data_repository.drop_old(background=self.data_repository.supports_background_drop())
+        
+        duracion = time.perf_counter() - inicio
+        omitidos = registros_leidos - (insertados - confirmados_antes)
+        
+        return {
+            'mensaje': f'Archivo procesado exitosamente. {insertados} registros importados.{_omitidos(omitidos)}',
+            'registros_procesados': insertados,
+            'registros_omitidos': omitidos,
+            'backend': BACKEND_INSERT,
+            'duracion_segundos': round(duracion, 3),
+            'registros_por_segundo': round(insertados / duracion, 1) if duracion > 0 else 0
+        }
+    
+    def _lotes_desde(self, path, offset=0, linea=0, batch_size=BATCH_SIZE):
+        """
+        Genera lotes (filas, offset, linea) validados desde el byte offset del archivo.
+        offset es el byte siguiente a la última línea del lote y linea el número
+        de esa línea, es decir, el punto desde donde retomar.
+        
+        Se lee en binario para conocer la posición exacta; los saltos de línea
+        se interpretan igual que open(path, 'r') ('\\n', '\\r\\n' y '\\r'),
+        de modo que los números de línea coinciden con la lectura normal.
+        """
+        with open(path, 'rb') as file:
+            file.seek(offset)
+            lote = []
             
-            with open(path, 'r', encoding='utf-8') as file:
-                for line_number, line in enumerate(file, 1):
+            for raw in file:
+                offset += len(raw)
+                texto = raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                partes = texto.split('\n')
+                if partes[-1] == '':
+                    partes.pop()
+                
+                for line in partes:
+                    linea += 1
                     line = line.strip()
-                    
-                    if not line:
-                        continue
-                    
-                    fecha, hora, rut = self.validator.validate_line_format(line, line_number)
-                    
-                    data_record = Data(fecha=fecha, hora=hora, rut=rut)
-                    self.data_repository.add(data_record)
-                    registros_procesados += 1
+                    if line:
+                        lote.append(self.validator.validate_line_format(line, linea))
+                
+                if len(lote) >= batch_size:
+                    yield lote, offset, linea
+                    lote = []
+            
+            if lote:
+                yield lote, offset, linea
+    
+    def _insertar(self, filas, tabla=None, commit_por_lote=False, progreso=None):
+        """
+        Inserta las filas validadas con el backend configurado en UPLOAD_BACKEND.
+        Retorna (registros insertados, backend usado).
+        
+        - 'insert' (por defecto): executemany por lotes de UPLOAD_BATCH_SIZE.
+        - 'load_data': las filas validadas se escriben a un archivo temporal
+          y se cargan con LOAD DATA LOCAL INFILE en una sola sentencia. Si la
+          base no lo soporta (SQLite, local_infile deshabilitado) se vuelve
+          automáticamente a insert por lotes leyendo ese mismo archivo.
+        """
+        batch_size = current_app.config.get('UPLOAD_BATCH_SIZE', BATCH_SIZE)
+        
+        def _lote_confirmado(total):
+            # Con commit por lote sobre data, cada lote queda visible aunque la carga falle después
+            self.data_modificada = True
+            if progreso:
+                progreso(total)
+        
+        def _bulk_insert(filas):
+            return self.data_repository.bulk_insert(
+                filas,
+                batch_size=batch_size,
+                commit_per_batch=commit_por_lote,
+                table=tabla,
+                on_batch=_lote_confirmado if commit_por_lote and tabla is None else progreso
+            ), BACKEND_INSERT
+        
+        if (current_app.config.get('UPLOAD_BACKEND', BACKEND_INSERT) != BACKEND_LOAD_DATA
+                or not self.data_repository.supports_load_data()):
+            return _bulk_insert(filas)
+        
+        spool = tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.tsv', delete=False)
+        try:
+            # La validación ocurre mientras se escribe el archivo: LOAD DATA solo recibe filas válidas.
+            # Una línea inválida corta la escritura; el finally elimina el archivo a medias
+            with spool:
+                for fecha, hora, rut in filas:
+                    spool.write(f'{fecha}\t{hora}\t{rut}\n')
             
-            return {
-                'mensaje': f'Archivo procesado exitosamente. {registros_procesados} registros importados.',
-                'registros_procesados': registros_procesados
-            }
+            try:
+                total = self.data_repository.load_data(spool.name, table=tabla)
+            except Exception as e:
+                current_app.logger.warning(f'LOAD DATA no disponible, se usa insert por lotes: {str(e)}')
+                return _bulk_insert(self._leer_spool(spool.name))
             
+            if progreso:
+                progreso(total)
+            return total, BACKEND_LOAD_DATA
+        finally:
+            os.remove(spool.name)
+    
+    def _leer_spool(self, path):
+        """Genera las tuplas (fecha, hora, rut) de un archivo temporal de LOAD DATA"""
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                fecha, hora, rut = line.rstrip('\n').split('\t')
+                yield fecha, hora, rut
+    
+    def _aplicar_diff(self, filas, progreso=None):
+        """
+        Aplica solo las diferencias entre el archivo y la tabla data.
+        
+        Las claves (rut, fecha, hora) del archivo se cuentan en memoria y se
+        cruzan con un recorrido por cursor de la tabla actual: las filas
+        que ya existen se mantienen, las que sobran se eliminan y las que
+        faltan se insertan, todo en una sola transacción. Las marcaciones
+        repetidas del archivo se omiten (registros_omitidos).
+        """
+        inicio = time.perf_counter()
+        batch_size = current_app.config.get('UPLOAD_BATCH_SIZE', BATCH_SIZE)
+        
+        nuevas = Counter()
+        registros_procesados = 0
+        for fecha, hora, rut in filas:
+            nuevas[(rut, fecha, hora)] += 1
+            registros_procesados += 1
+        
+        ids_a_eliminar = []
+        sin_cambios = 0
+        for data_id, rut, fecha, hora in self.data_repository.iter_keys(batch_size):
+            clave = (rut, fecha, hora)
+            if nuevas[clave] > 0:
+                nuevas[clave] -= 1
+                sin_cambios += 1
+            else:
+                ids_a_eliminar.append(data_id)
+        
+        eliminados = self.data_repository.delete_by_ids(ids_a_eliminar, batch_size)
+        agregados = self.data_repository.bulk_insert(
+            ((fecha, hora, rut) for (rut, fecha, hora), cantidad in nuevas.items() for _ in range(cantidad)),
+            batch_size=batch_size,
+            on_batch=progreso
+        )
+        self._commit()
+        
+        duracion = time.perf_counter() - inicio
+        omitidos = registros_procesados - sin_cambios - agregados
+        
+        return {
+            'mensaje': (
+                f'Archivo procesado exitosamente. {agregados} registros agregados, '
+                f'{eliminados} eliminados y {sin_cambios} sin cambios.{_omitidos(omitidos)}'
+            ),
+            'registros_procesados': registros_procesados,
+            'registros_agregados': agregados,
+            'registros_eliminados': eliminados,
+            'registros_sin_cambios': sin_cambios,
+            'registros_omitidos': omitidos,
+            'duracion_segundos': round(duracion, 3),
+            'registros_por_segundo': round(registros_procesados / duracion, 1) if duracion > 0 else 0
+        }
+    
+    def _agregar(self, filas, progreso=None):
+        """
+        Inserta directamente sobre data las marcaciones que aún no existen.
+        Las repetidas se omiten por la clave única (rut, fecha, hora), con el
+        mismo insert por lotes que la carga completa, sin consultas previas.
+        """
+        inicio = time.perf_counter()
+        commit_por_lote = current_app.config.get('UPLOAD_COMMIT_MODE') == 'batch'
+        
+        registros_procesados = 0
+        
+        def _contar(filas):
+            nonlocal registros_procesados
+            for fila in filas:
+                registros_procesados += 1
+                yield fila
+        
+        agregados, backend = self._insertar(_contar(filas), commit_por_lote=commit_por_lote, progreso=progreso)
+        self._commit()
+        
+        duracion = time.perf_counter() - inicio
+        
+        return {
+            'mensaje': (
+                f'Archivo procesado exitosamente. {agregados} registros agregados, '
+                f'{registros_procesados - agregados} ya existían.'
+            ),
+            'registros_procesados': registros_procesados,
+            'registros_agregados': agregados,
+            'registros_omitidos': registros_procesados - agregados,
+            'backend': backend,
+            'duracion_segundos': round(duracion, 3),
+            'registros_por_segundo': round(registros_procesados / duracion, 1) if duracion > 0 else 0
+        }
+    
+    def _reemplazar_meses(self, filas, progreso=None):
+        """
+        Reemplaza solo los meses presentes en el archivo; el resto de data no cambia.
+        
+        Las filas se cargan primero en data_staging. Luego, por cada mes:
+        - Con particiones (DATA_PARTITIONING en MySQL): se copia a una tabla
+          data_mes_YYYYMM y se intercambia con la partición del mes
+          (EXCHANGE PARTITION), sin borrar fila a fila. Cada mes se
+          reemplaza atómicamente, uno después del otro.
+        - Sin particiones: se eliminan las filas del mes y se copian las nuevas,
+          todos los meses en una sola transacción.
+        """
+        inicio = time.perf_counter()
+        batch_size = current_app.config.get('UPLOAD_BATCH_SIZE', BATCH_SIZE)
+        
+        meses = set()
+        registros_procesados = 0
+        
+        def _contar(filas):
+            nonlocal registros_procesados
+            for fila in filas:
+                registros_procesados += 1
+                meses.add((int(fila[0][:4]), int(fila[0][5:7])))
+                yield fila
+        
+        self._crear_staging()
+        self.data_repository.bulk_insert(
+            _contar(filas), batch_size=batch_size, table=self.data_repository.staging_table(), on_batch=progreso
+        )
+        self._commit()
+        
+        meses = sorted(meses)
+        agregados = eliminados = 0
+        
+        if self.data_repository.supports_partitions():
+            self.data_repository.ensure_month_partitions(meses)
+            for mes in meses:
+                try:
+                    tabla = self.data_repository.create_month_table(*mes)
+                    agregados += self.data_repository.insert_from_staging(mes, tabla)
+                    self._commit()
+                    eliminados += self.data_repository.exchange_month(*mes)
+                    self.data_modificada = True
+                except Exception:
+                    self.data_repository.rollback()
+                    self.data_repository.drop_month_table(*mes)
+                    raise
+        else:
+            for mes in meses:
+                eliminados += self.data_repository.delete_month_rows(*mes)
+            agregados = self.data_repository.insert_from_staging()
+            self._commit()
+        
+        self.data_repository.drop_staging()
+        
+        duracion = time.perf_counter() - inicio
+        nombres = [f'{anio:04d}/{mes:02d}' for anio, mes in meses]
+        omitidos = registros_procesados - agregados
+        
+        return {
+            'mensaje': (
+                f'Archivo procesado exitosamente. {len(meses)} meses reemplazados: '
+                f'{agregados} registros cargados y {eliminados} eliminados.{_omitidos(omitidos)}'
+            ),
+            'registros_procesados': registros_procesados,
+            'registros_agregados': agregados,
+            'registros_eliminados': eliminados,
+            'registros_omitidos': omitidos,
+            'meses': nombres,
+            'duracion_segundos': round(duracion, 3),
+            'registros_por_segundo': round(registros_procesados / duracion, 1) if duracion > 0 else 0
+        }
+    
+    def purgar_mes(self, mes):
+        """
+        Elimina todas las marcaciones de un mes ('yyyy-MM' o 'yyyy/MM').
+        Con particiones es un TRUNCATE PARTITION en vez de un DELETE fila a fila.
+        """
+        partes = mes.replace('-', '/').split('/') if mes else []
+        if len(partes) != 2 or not all(p.isdigit() for p in partes) or len(partes[0]) != 4 or not 1 <= int(partes[1]) <= 12:
+            raise BadRequest(f'Mes inválido: {mes}. Debe estar en formato yyyy-MM')
+        anio, numero = int(partes[0]), int(partes[1])
+        
+        with _import_lock:
+            eliminados = self.data_repository.delete_month(anio, numero)
+            if eliminados:
+                self._recalcular_resumen()
+                # El archivo de la carga actual ya no representa data: subirlo de nuevo lo recarga
+                self.upload_log_repository.clear_current_hash()
+                self._nueva_generacion()
+        
+        return {
+            'mes': f'{anio:04d}/{numero:02d}',
+            'registros_eliminados': eliminados
+        }
+    
+    def _validar_modo(self, modo):
+        """Valida que el modo de carga sea uno de MODOS_CARGA"""
+        if modo not in MODOS_CARGA:
+            raise BadRequest(f'Modo de carga inválido: {modo}. Debe ser uno de: {", ".join(MODOS_CARGA)}')
+    
+    def _fallar_carga(self, e, log_id=None):
+        """
+        Revierte la transacción en curso, registra el error en upload_logs
+        y normaliza el error a BadRequest. Los errores HTTP (ej. 413 si el
+        cuerpo de la request supera MAX_CONTENT_LENGTH) se mantienen tal cual.
+        """
+        self.data_repository.rollback()
+        if self.staging_propia:
+            try:
+                self.data_repository.drop_staging()
+            except Exception:
+                self.data_repository.rollback()
+        
+        error = e if isinstance(e, HTTPException) else BadRequest(f'Error procesando archivo: {str(e)}')
+        
+        if log_id is not None:
+            self.upload_log_repository.finish(
+                log_id, 'error', error_message=error.description, metricas=self.metricas.resumen()
+            )
+        if self.data_modificada:
+            # Lo ya confirmado (lotes, limpieza, meses intercambiados) queda visible en data:
+            # la carga anterior ya no lo representa, así que subirla de nuevo debe recargarla
+            try:
+                self.upload_log_repository.clear_current_hash()
+                self._recalcular_resumen()
+            except Exception as e:
+                self.data_repository.rollback()
+                current_app.logger.warning(f'No se pudo invalidar la generación anterior: {str(e)}')
+            self._nueva_generacion()
+        
+        return error
+    
+    def _iniciar_registro(self, log_id, filename, file_size=None, file_path=None, modo=None):
+        """Crea el registro de upload_logs de la carga, salvo que ya exista (jobs)"""
+        if log_id is not None:
+            return log_id
+        return self.upload_log_repository.create(
+            filename, file_size=file_size, file_path=file_path, status='running', load_mode=modo
+        ).id
+    
+    def _completar_registro(self, log_id, resultado, file_hash, file_size=None):
+        """
+        Marca la carga como exitosa en upload_logs y agrega su id al resultado.
+        Guarda el resumen de la nueva generación (una carga sin cambios deja
+        vigente el anterior).
+        Con particiones, crea las de los meses nuevos que llegaron a los extremos.
+        """
+        if not resultado.get('sin_cambios'):
+            # Un reemplazo sin filas repetidas dejó en data exactamente lo contado al pasar
+            exacto = self.resumen is not None and self.resumen.total == resultado['registros_procesados']
+            self._guardar_resumen(log_id, self.resumen.resumen() if exacto else None)
+        
+        if not resultado.get('sin_cambios') and self.data_repository.supports_partitions():
+            try:
+                self.data_repository.ensure_month_partitions()
+            except Exception as e:
+                # Los datos ya están confirmados; las particiones se completan en la próxima carga
+                self.data_repository.rollback()
+                current_app.logger.warning(f'No se pudieron crear las particiones mensuales: {str(e)}')
+        
+        metricas = self.metricas.resumen()
+        self.upload_log_repository.finish(
+            log_id, 'success',
+            records_processed=resultado['registros_procesados'],
+            records_per_second=resultado['registros_por_segundo'],
+            file_hash=file_hash,
+            file_size=file_size,
+            metricas=metricas
+        )
+        if not resultado.get('sin_cambios'):
+            self._nueva_generacion()
+        
+        resultado['upload_id'] = log_id
+        resultado['lineas_leidas'] = metricas['lines_read']
+        resultado['tiempos'] = {
+            fase.removesuffix('_seconds'): segundos for fase, segundos in metricas.items() if fase != 'lines_read'
+        }
+        return resultado
+    
+    def _guardar_resumen(self, log_id, campos=None):
+        """
+        Guarda el resumen de la generación log_id: campos, si ya se contaron al
+        importar, o calculados con consultas agregadas sobre data (modos diff,
+        append y months, cargas con checkpoints, filas repetidas o un mes purgado).
+        Si falla se eliminan los resúmenes, para que las lecturas no usen uno
+        desactualizado y vuelvan a calcularse sobre data.
+        """
+        try:
+            self.data_summary_repository.save(log_id, **(campos or self._resumen_de_tabla()))
         except Exception as e:
             self.data_repository.rollback()
-            if isinstance(e, BadRequest):
-                raise e
-            else:
-                raise BadRequest(f'Error procesando archivo: {str(e)}')
+            current_app.logger.warning(f'No se pudo guardar el resumen de la carga {log_id}: {str(e)}')
+            self.data_summary_repository.delete_all()
     
-    def _limpiar_datos_previos(self):
+    def _nueva_generacion(self):
+        """
+        Incrementa la generación de los datos (data cambió), con lo que cambia
+        el ETag de las lecturas. Los datos ya están confirmados: si falla, solo
+        se registra.
+        """
+        try:
+            generacion_datos().incrementar()
+        except Exception as e:
+            self.data_repository.rollback()
+            current_app.logger.warning(f'No se pudo incrementar la generación de los datos: {str(e)}')
+    
+    def obtener_generacion(self):
+        """
+        Generación de los datos visibles: (número, fecha de modificación).
+        Se lee de memoria salvo cada DATA_GENERATION_TTL segundos.
+        """
+        return generacion_datos().actual()
+    
+    def _recalcular_resumen(self):
+        """
+        Recalcula sobre data el resumen vigente, después de un cambio que no es
+        una carga exitosa (un mes purgado o una carga fallida que ya confirmó filas)
+        """
+        actual = self.data_summary_repository.find_latest()
+        if actual is not None:
+            self._guardar_resumen(actual.upload_log_id)
+    
+    def _resumen_de_tabla(self):
+        """Campos de data_summary calculados con consultas agregadas sobre data"""
+        total, empleados, desde, hasta = self.data_repository.aggregate_stats()
+        return {
+            'total_records': total,
+            'total_employees': empleados,
+            'fecha_min': desde,
+            'fecha_max': hasta,
+            'records_per_day': self.data_repository.count_by_fecha(),
+            'records_per_rut': self.data_repository.count_by_rut()
+        }
+    
+    def _commit(self):
+        """Confirma la transacción de la carga, midiendo el tiempo del commit"""
+        with self.metricas.medir('commit'):
+            self.data_repository.commit()
+    
+    def _dedup_habilitado(self, modo=MODO_REEMPLAZO):
+        """
+        Indica si se debe comparar el hash del archivo con la generación actual.
+        Una carga en modo append o months no deja la tabla igual al archivo,
+        así que no se compara ni se registra su hash.
+        """
+        return modo not in (MODO_APPEND, MODO_MESES) and current_app.config.get('UPLOAD_DEDUP', True)
+    
+    def _calcular_hash(self, path):
+        """Calcula el SHA-256 del archivo leyéndolo por trozos"""
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as file:
+            while True:
+                chunk = file.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+        return hasher.hexdigest()
+    
+    def _es_generacion_actual(self, file_hash, log_id=None):
+        """Indica si el hash coincide con el de la última carga exitosa"""
+        actual = self.upload_log_repository.find_current(exclude_id=log_id)
+        return actual is not None and actual.file_hash == file_hash
+    
+    def _resultado_sin_cambios(self):
+        """Resultado de una carga idéntica a la generación actual"""
+        return {
+            'mensaje': 'El archivo es idéntico a la carga actual. No hay cambios.',
+            'registros_procesados': 0,
+            'sin_cambios': True,
+            'duracion_segundos': 0,
+            'registros_por_segundo': 0
+        }
+    
+    def _parsear_lineas(self, file, avance=None, posicion=None):
+        """
+        Genera tuplas (fecha, hora, rut) validadas, omitiendo líneas vacías.
+        avance(lineas, posicion()), si se entrega, se llama cada
+        UPLOAD_PROGRESS_EVERY_LINES líneas y al terminar el archivo.
+        """
+        cada = current_app.config.get('UPLOAD_PROGRESS_EVERY_LINES', PROGRESS_EVERY_LINES) if avance else 0
+        line_number = 0
+        
+        for line_number, line in enumerate(file, 1):
+            if cada and line_number % cada == 0:
+                avance(line_number, posicion() if posicion else None)
+            
+            line = line.strip()
+            
+            if not line:
+                continue
+            
+            yield self.validator.validate_line_format(line, line_number)
+        
+        if avance:
+            avance(line_number, posicion() if posicion else None)
+    
+    def _limpiar_datos_previos(self, commit=True):
         """
         Elimina todos los registros previos de marcación.
         
@@ -85,7 +1080,147 @@ class SubirDataService:
         - Justificativos relacionados
         - Autorizaciones relacionadas
         """
-        self.data_repository.delete_all()
+        self.data_repository.delete_all(commit=commit)
+    
+    def obtener_historial_cargas(self, limite=HISTORIAL_LIMITE, desde=0, status=None):
+        """
+        Historial de cargas registradas en upload_logs, de la más reciente a la
+        más antigua, con sus métricas (líneas, tiempos por fase, registros/s)
+        """
+        if not 1 <= limite <= HISTORIAL_LIMITE_MAXIMO:
+            raise BadRequest(f'limit debe estar entre 1 y {HISTORIAL_LIMITE_MAXIMO}')
+        if desde < 0:
+            raise BadRequest('offset debe ser un entero mayor o igual a 0')
+        if status is not None and status not in UPLOAD_STATUSES:
+            raise BadRequest(f'Estado inválido: {status}. Debe ser uno de: {", ".join(UPLOAD_STATUSES)}')
+        
+        return {
+            'uploads': [log.to_dict() for log in self.upload_log_repository.find_recent(limite, desde, status)],
+            'total': self.upload_log_repository.count(status)
+        }
+    
+    def obtener_pagina_datos(self, limite=None, cursor=None, rut=None, fecha_desde=None, fecha_hasta=None,
+                             hora_desde=None, hora_hasta=None):
+        """
+        Página de marcaciones ordenadas por fecha, hora e id, con filtros opcionales.
+        
+        cursor es el next_cursor de la página anterior (None para la primera).
+        Se lee una fila más que limite para saber si hay más páginas sin contar
+        la tabla. Retorna las filas como dicts, next_cursor y has_more.
+        """
+        if limite is None:
+            limite = current_app.config.get('DATA_PAGE_SIZE', PAGINA_DATOS)
+        maximo = current_app.config.get('DATA_PAGE_MAX_SIZE', PAGINA_DATOS_MAXIMO)
+        if not 1 <= limite <= maximo:
+            raise BadRequest(f'limit debe estar entre 1 y {maximo}')
+        
+        self._validar_filtros(rut, (fecha_desde, fecha_hasta), (hora_desde, hora_hasta))
+        
+        filas = self.data_repository.find_page(
+            limite + 1,
+            after=_decodificar_cursor(cursor) if cursor else None,
+            rut=rut,
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+            hora_desde=hora_desde,
+            hora_hasta=hora_hasta
+        )
+        
+        has_more = len(filas) > limite
+        filas = filas[:limite]
+        
+        return {
+            'data': [{'id': fila.id, 'fecha': fila.fecha, 'hora': fila.hora, 'rut': fila.rut} for fila in filas],
+            'next_cursor': _codificar_cursor(filas[-1].fecha, filas[-1].hora, filas[-1].id) if has_more else None,
+            'has_more': has_more
+        }
+    
+    def exportar_datos(self, formato=FORMATO_NDJSON, comprimir=False, rut=None, fecha_desde=None, fecha_hasta=None):
+        """
+        Exporta las marcaciones (en orden de id) como un generador de trozos de bytes.
+        
+        Las filas se leen con un cursor del lado del servidor de a
+        DATA_EXPORT_BATCH_SIZE y cada lote se formatea y entrega apenas se
+        lee, así que la memoria no depende del tamaño de la tabla.
+        formato es 'ndjson' (un objeto JSON por línea) o 'csv' (con encabezado);
+        comprimir entrega el contenido en gzip.
+        
+        Los parámetros se validan antes de retornar el generador, de modo que
+        un error se informa antes de empezar a responder.
+        """
+        if formato not in FORMATOS_EXPORTACION:
+            raise BadRequest(f'Formato inválido: {formato}. Debe ser uno de: {", ".join(FORMATOS_EXPORTACION)}')
+        self._validar_filtros(rut, (fecha_desde, fecha_hasta))
+        
+        lotes = self.data_repository.iter_export(
+            current_app.config.get('DATA_EXPORT_BATCH_SIZE', EXPORT_BATCH_SIZE),
+            rut=rut, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta
+        )
+        trozos = self._formatear_exportacion(lotes, formato)
+        return self._comprimir_gzip(trozos) if comprimir else trozos
+    
+    def _formatear_exportacion(self, lotes, formato):
+        """
+        Genera un trozo de bytes por lote de filas.
+        Los campos ya están validados (dígitos, '/', ':', '-' y K), así que
+        se escriben sin escapar, igual que los serializaría json o csv.
+        """
+        if formato == FORMATO_CSV:
+            yield b'id,fecha,hora,rut\n'
+            linea = '{},{},{},{}\n'.format
+        else:
+            linea = '{{"id":{},"fecha":"{}","hora":"{}","rut":"{}"}}\n'.format
+        
+        for lote in lotes:
+            yield ''.join([linea(*fila) for fila in lote]).encode('utf-8')
+    
+    def _comprimir_gzip(self, trozos):
+        """Comprime en formato gzip un generador de trozos de bytes, trozo a trozo"""
+        compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for trozo in trozos:
+            comprimido = compresor.compress(trozo)
+            if comprimido:
+                yield comprimido
+        yield compresor.flush()
+    
+    def _validar_filtros(self, rut=None, fechas=(), horas=()):
+        """Valida el formato de los filtros de consulta que se entreguen"""
+        if rut is not None:
+            self.validator.validate_rut(rut)
+        for fecha in fechas:
+            if fecha is not None:
+                self.validator.validate_fecha(fecha)
+        for hora in horas:
+            if hora is not None:
+                self.validator.validate_hora(hora)
+    
+    def obtener_estadisticas(self):
+        """
+        Estadísticas de los datos cargados, leídas del resumen de la generación
+        actual (data_summary). Sin resumen (ej. datos previos a data_summary)
+        se calculan con consultas agregadas (COUNT, COUNT DISTINCT, MIN/MAX y
+        GROUP BY fecha) sin leer las filas.
+        last_upload es la fecha de la última carga exitosa.
+        """
+        resumen = self.data_summary_repository.find_latest()
+        ultima = self.upload_log_repository.find_current()
+        
+        if resumen is not None:
+            total, empleados, desde, hasta = (
+                resumen.total_records, resumen.total_employees, resumen.fecha_min, resumen.fecha_max
+            )
+            por_dia = resumen.records_per_day
+        else:
+            total, empleados, desde, hasta = self.data_repository.aggregate_stats()
+            por_dia = self.data_repository.count_by_fecha()
+        
+        return {
+            'total_records': total,
+            'total_employees': empleados,
+            'date_range': {'earliest': desde, 'latest': hasta},
+            'last_upload': ultima.upload_date if ultima else None,
+            'records_per_day': por_dia
+        }
     
     def obtener_todos_los_datos(self):
         """Obtiene todos los registros de marcación"""
@@ -96,5 +1231,12 @@ class SubirDataService:
         return self.data_repository.find_by_rut(rut)
     
     def obtener_ruts_distintos(self):
-        """Obtiene todos los RUTs únicos en el sistema"""
-        return self.data_repository.find_distinct_rut()
\ No newline at end of file
+        """
+        Obtiene todos los RUTs únicos en el sistema, ordenados como strings
+        (del resumen de la generación actual, si existe). Se ordenan aquí y no
+        en SQL: con almacenamiento compacto la BD ordenaría por el entero.
+        """
+        resumen = self.data_summary_repository.find_latest()
+        if resumen is not None:
+            return sorted(resumen.records_per_rut)
+        return sorted(self.data_repository.find_distinct_rut())
\ No newline at end of file
@@ -0,0 +1,260 @@
+import os
+import time
+import threading
+import uuid
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.utils import secure_filename
+from src.repositories.upload_log_repository import UploadLogRepository
+from src.services.subir_data_service import SubirDataService, UPLOAD_FOLDER
+from src.services.upload_progress import ProgresoCarga
+from src.errors.errors import NotFound, ServiceUnavailable
+
+class UploadJobService:
+    """
+    Ejecuta cargas de DATA.TXT en segundo plano.
+
+    Cada job se persiste en upload_logs (su id es el job id). El progreso
+    en curso (un ProgresoCarga: líneas leídas, registros insertados,
+    throughput y ETA) se mantiene en memoria desde que el job se encola, se
+    mezcla con el registro persistido al consultar el estado y se puede
+    seguir en vivo con eventos().
+    """
+
+    def __init__(self, app):
+        self.app = app
+        workers = app.config.get('UPLOAD_JOB_WORKERS', 1)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upload-job')
+        # Jobs en ejecución + en cola; por sobre ese límite se rechazan nuevas cargas
+        self.cupos = threading.BoundedSemaphore(workers + app.config.get('UPLOAD_JOB_QUEUE_SIZE', 4))
+        self.progreso = {}
+        self.futures = {}
+        self.lock = threading.Lock()
+        self.detenido = threading.Event()
+
+    def encolar(self, file, **opciones):
+        """
+        Guarda el archivo con un nombre único, registra el job como 'pending'
+        y lo encola. Retorna el registro de upload_logs creado.
+        opciones (forzar, modo) se pasan tal cual a SubirDataService.leer_txt.
+        """
+        return self._encolar(
+            lambda: SubirDataService().guardar(file, nombre=f'{uuid.uuid4().hex}_{file.filename}'),
+            file.filename,
+            opciones
+        )
+
+    def encolar_archivo(self, path, filename, **opciones):
+        """
+        Encola un archivo que ya está en disco (ej. el ensamblado de una carga
+        por partes). Se mueve a uploads/ con un nombre único antes de encolarlo.
+        """
+        def _mover():
+            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+            destino = os.path.join(UPLOAD_FOLDER, secure_filename(f'{uuid.uuid4().hex}_{filename}'))
+            os.replace(path, destino)
+            return destino
+
+        return self._encolar(_mover, filename, opciones)
+
+    def _encolar(self, preparar, filename, opciones):
+        """Reserva un cupo, deja el archivo en uploads/ (preparar) y registra y encola el job"""
+        if not self.cupos.acquire(blocking=False):
+            raise ServiceUnavailable('Hay demasiadas cargas en curso. Intente nuevamente más tarde.')
+
+        try:
+            inicio = time.perf_counter()
+            path = preparar()
+            log = UploadLogRepository.create(
+                filename=filename,
+                file_size=os.path.getsize(path),
+                file_path=path,
+                load_mode=opciones.get('modo'),
+                save_seconds=round(time.perf_counter() - inicio, 3)
+            )
+
+            self._registrar(log.id, path, opciones)
+            return log
+        except Exception:
+            self.cupos.release()
+            raise
+
+    def estado(self, job_id):
+        """Retorna el estado del job, incluyendo el progreso si está en ejecución"""
+        log = UploadLogRepository.find_by_id(job_id)
+        if log is None:
+            raise NotFound(f'Job {job_id} no encontrado')
+
+        estado = log.to_dict()
+        with self.lock:
+            progreso = self.progreso.get(job_id)
+        if progreso is not None and not progreso.terminado:
+            estado.update(progreso.resumen())
+        return estado
+    
+    def eventos(self, job_id, keepalive=15):
+        """
+        Progreso del job a medida que cambia, para Server-Sent Events.
+        Lanza NotFound de inmediato si el job no existe; si existe retorna un
+        generador de ('progress', resumen) con cada avance, None si pasan
+        keepalive segundos sin cambios y, al terminar, ('done', estado) con
+        el registro final. Un job ya terminado genera directamente 'done'.
+        """
+        estado = self.estado(job_id)
+        with self.lock:
+            progreso = self.progreso.get(job_id)
+        return self._seguir(job_id, progreso, estado, keepalive)
+    
+    def _seguir(self, job_id, progreso, estado, keepalive):
+        version = None
+        while progreso is not None:
+            nueva = progreso.esperar(version, keepalive)
+            if progreso.terminado:
+                estado = UploadLogRepository.find_by_id(job_id, refresh=True).to_dict()
+                break
+            if nueva == version:
+                yield None
+                continue
+            version = nueva
+            yield 'progress', progreso.resumen()
+        
+        yield 'done', estado
+    
+    def esperar(self, job_id, timeout=None):
+        """Espera a que termine el job (útil en pruebas y procesos batch)"""
+        with self.lock:
+            future = self.futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+
+    def reanudar_interrumpidas(self):
+        """
+        Retoma las cargas que un reinicio dejó a medias (se llama al iniciar el
+        servicio y luego cada UPLOAD_RESUME_INTERVAL_SECONDS, ver vigilar_interrumpidas).
+        
+        - 'pending': el job nunca empezó; se vuelve a encolar desde el inicio.
+        - 'running' con checkpoint: se encola para continuar desde el último
+          lote confirmado (leer_txt con reanudar=True).
+        
+        Solo se consideran las cargas sin heartbeat en UPLOAD_RESUME_STALE_SECONDS
+        que no estén ya en el pool de este proceso, y cada una se toma con
+        claim(), de modo que otro proceso vivo del servicio no la ejecute dos
+        veces. Sin cupos en la cola no se toma ninguna más: quedan para la
+        próxima búsqueda u otro proceso.
+        Retorna los ids encolados.
+        """
+        limite = datetime.now() - timedelta(seconds=self.app.config.get('UPLOAD_RESUME_STALE_SECONDS', 300))
+        encolados = []
+        with self.lock:
+            propios = set(self.futures)
+        
+        for log in UploadLogRepository.find_interrupted(limite):
+            if log.id in propios:
+                continue
+            
+            reanudar = log.status == 'running'
+            if reanudar and log.checkpoint_offset is None:
+                # Nada confirmado por lotes: la carga no se puede retomar
+                continue
+            
+            if not os.path.exists(log.file_path):
+                UploadLogRepository.finish(
+                    log.id, 'error', error_message='Carga interrumpida: el archivo ya no está disponible'
+                )
+                continue
+            
+            # El cupo se toma antes del claim: un job tomado siempre se encola
+            if not self.cupos.acquire(blocking=False):
+                break
+            if not UploadLogRepository.claim(log.id, log.heartbeat_at):
+                self.cupos.release()
+                continue
+            
+            opciones = {'modo': log.load_mode or 'replace'}
+            if reanudar:
+                opciones['reanudar'] = True
+            
+            self._registrar(log.id, log.file_path, opciones)
+            encolados.append(log.id)
+            self.app.logger.info(
+                f"Carga {log.id} retomada" + (f" desde la línea {log.checkpoint_line}" if reanudar else '')
+            )
+        
+        return encolados
+
+    def vigilar_interrumpidas(self, intervalo):
+        """
+        Vuelve a buscar cargas interrumpidas cada intervalo segundos, en un hilo
+        aparte. Una carga que al iniciar aún tenía heartbeat reciente (ej. un
+        reinicio rápido) se retoma apenas pasa UPLOAD_RESUME_STALE_SECONDS.
+        """
+        def _vigilar():
+            while not self.detenido.wait(intervalo):
+                with self.app.app_context():
+                    try:
+                        self.reanudar_interrumpidas()
+                    except Exception as e:
+                        self.app.logger.error(f"Error retomando cargas interrumpidas: {str(e)}")
+        
+        thread = threading.Thread(target=_vigilar, name='upload-resume', daemon=True)
+        thread.start()
+        return thread
+    
+    def detener(self):
+        """Detiene la búsqueda periódica de cargas interrumpidas"""
+        self.detenido.set()
+
+    def _registrar(self, job_id, path, opciones):
+        """Crea el progreso del job y lo envía al pool"""
+        with self.lock:
+            self.progreso[job_id] = ProgresoCarga(total_bytes=os.path.getsize(path))
+            self.futures[job_id] = self.executor.submit(self._ejecutar, job_id, path, opciones)
+    
+    def _ejecutar(self, job_id, path, opciones):
+        """
+        Cuerpo del job: corre en un hilo del pool, con su propio app context.
+        leer_txt se encarga de dejar el registro en success o error; después
+        se elimina el archivo si la carga ya no se puede retomar.
+        """
+        try:
+            with self.app.app_context():
+                if not opciones.get('reanudar') and not UploadLogRepository.mark_running(job_id):
+                    # Otro proceso ya tomó el job
+                    return
+
+                with self.lock:
+                    progreso = self.progreso[job_id]
+
+                try:
+                    SubirDataService().leer_txt(path, progreso=progreso, log_id=job_id, **opciones)
+                except Exception as e:
+                    self.app.logger.error(f"Job de carga {job_id} falló: {str(e)}")
+
+                self._descartar_archivo(job_id, path)
+        finally:
+            with self.lock:
+                progreso = self.progreso.pop(job_id, None)
+                self.futures.pop(job_id, None)
+            if progreso is not None:
+                progreso.terminar()
+            self.cupos.release()
+
+    def _descartar_archivo(self, job_id, path):
+        """
+        Elimina el archivo del job si terminó en success, o en error sin
+        checkpoint. Con checkpoint (o si el registro no llegó a cerrarse) se
+        conserva, porque la carga puede continuar desde ahí.
+        """
+        log = UploadLogRepository.find_by_id(job_id, refresh=True)
+        if log.status != 'success' and (log.status != 'error' or log.checkpoint_offset is not None):
+            return
+
+        try:
+            os.remove(path)
+        except OSError as e:
+            self.app.logger.warning(f"No se pudo eliminar el archivo del job {job_id}: {str(e)}")
+
+def init_upload_jobs(app):
+    """Registra el servicio de jobs de carga en la aplicación"""
+    app.extensions['upload_jobs'] = UploadJobService(app)
+    return app.extensions['upload_jobs']
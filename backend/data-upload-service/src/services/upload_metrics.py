@@ -0,0 +1,105 @@
+import time
+import threading
+from itertools import islice
+from contextlib import contextmanager
+
+# Fases de una carga, en el orden en que ocurren
+FASES = ('save', 'hash', 'parse', 'wait', 'insert', 'commit')
+
+# Filas que se leen entre dos mediciones de cronometrar
+MEDIR_CADA = 5000
+
+
+class MetricasCarga:
+    """
+    Tiempo acumulado por fase de una carga, para registrarlo en upload_logs.
+
+    - save: guardar el archivo subido en disco.
+    - hash: calcular el SHA-256 del archivo.
+    - parse: leer, decodificar y validar las líneas (la validación es el
+      mismo patrón que separa los campos, así que no se mide aparte).
+    - wait: tiempo en que la escritura esperó lotes del hilo lector
+      (solo con UPLOAD_PIPELINE); si crece, el cuello de botella es el parseo.
+    - insert: sentencias de escritura en la BD (inserts, deletes, swap).
+    - commit: commits de la carga.
+
+    Con UPLOAD_PIPELINE parse corre en paralelo con insert, así que la suma
+    de las fases puede superar el total. Las fases que no ocurrieron en la
+    carga (ej. save en una carga en streaming) quedan en None.
+    """
+
+    def __init__(self):
+        self.tiempos = dict.fromkeys(FASES, 0.0)
+        self.medidas = set()
+        self.lineas_leidas = 0
+        self.inicio = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def sumar(self, fase, segundos):
+        # parse se suma desde el hilo lector del pipeline
+        with self.lock:
+            self.tiempos[fase] += segundos
+            self.medidas.add(fase)
+
+    @contextmanager
+    def medir(self, fase):
+        """Suma a fase el tiempo del bloque"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(fase, time.perf_counter() - inicio)
+
+    @contextmanager
+    def escritura(self, *descontar):
+        """
+        Suma a insert el tiempo del bloque, descontando lo que dentro de él
+        sumaron las fases indicadas en este mismo hilo (ej. leer las filas
+        y los commits)
+        """
+        previos = {fase: self.tiempos[fase] for fase in descontar}
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - inicio
+            descontado = sum(self.tiempos[fase] - previos[fase] for fase in descontar)
+            self.sumar('insert', max(duracion - descontado, 0))
+
+    def cronometrar(self, filas, fase='parse', cada=MEDIR_CADA):
+        """
+        Genera los elementos de filas sumando a fase el tiempo que toma
+        obtenerlos. Se mide por tramos de cada elementos, no uno a uno,
+        para no agregar dos llamadas al reloj por línea.
+        """
+        filas = iter(filas)
+        try:
+            while True:
+                inicio = time.perf_counter()
+                try:
+                    tramo = list(islice(filas, cada))
+                finally:
+                    # También se suma el tramo que terminó en error (ej. una línea inválida)
+                    self.sumar(fase, time.perf_counter() - inicio)
+                if not tramo:
+                    return
+                yield from tramo
+        finally:
+            cerrar = getattr(filas, 'close', None)
+            if cerrar:
+                cerrar()
+
+    def lineas(self, lineas, posicion=None):
+        """Registra las líneas leídas (misma firma que ProgresoCarga.lineas)"""
+        self.lineas_leidas = lineas
+
+    def resumen(self):
+        """Columnas de upload_logs con los tiempos de la carga, en segundos"""
+        with self.lock:
+            resumen = {
+                f'{fase}_seconds': round(segundos, 3) if fase in self.medidas else None
+                for fase, segundos in self.tiempos.items()
+            }
+        resumen['total_seconds'] = round(time.perf_counter() - self.inicio, 3)
+        resumen['lines_read'] = self.lineas_leidas
+        return resumen
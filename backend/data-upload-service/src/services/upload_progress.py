@@ -0,0 +1,89 @@
+import time
+import threading
+
+
+class ProgresoCarga:
+    """
+    Progreso en curso de una carga, compartido entre el hilo que la ejecuta
+    y los clientes que lo consultan (GET /upload/jobs/<id>, SSE).
+
+    - Llamar al objeto con registros informa las filas confirmadas en la BD
+      (misma firma que el callback progreso de SubirDataService).
+    - lineas(lineas, posicion) informa las líneas leídas y el byte del
+      archivo alcanzado; con total_bytes se calcula el porcentaje y el ETA.
+
+    Cada cambio incrementa version y despierta a quienes esperan en esperar().
+    """
+
+    def __init__(self, total_bytes=None):
+        self.total_bytes = total_bytes
+        self.lineas_leidas = 0
+        self.posicion = 0
+        self.posicion_inicial = 0
+        self.registros = 0
+        self.registros_iniciales = 0
+        self.inicio = None
+        self.terminado = False
+        self.version = 0
+        self.condicion = threading.Condition()
+
+    def iniciar(self, posicion=0, lineas=0, registros=0):
+        """Marca el inicio de la lectura; una carga reanudada parte desde su checkpoint"""
+        with self.condicion:
+            self.inicio = time.perf_counter()
+            self.posicion = self.posicion_inicial = posicion
+            self.lineas_leidas = lineas
+            self.registros = self.registros_iniciales = registros
+            self._notificar()
+
+    def __call__(self, registros):
+        with self.condicion:
+            self.registros = registros
+            self._notificar()
+
+    def lineas(self, lineas, posicion=None):
+        with self.condicion:
+            self.lineas_leidas = lineas
+            if posicion is not None:
+                self.posicion = posicion
+            self._notificar()
+
+    def terminar(self):
+        with self.condicion:
+            self.terminado = True
+            self._notificar()
+
+    def esperar(self, version, timeout=None):
+        """Espera un cambio posterior a version (o timeout) y retorna la versión actual"""
+        with self.condicion:
+            self.condicion.wait_for(lambda: self.version != version or self.terminado, timeout)
+            return self.version
+
+    def resumen(self):
+        """Vista del progreso: líneas leídas, registros confirmados, throughput y ETA"""
+        with self.condicion:
+            duracion = time.perf_counter() - self.inicio if self.inicio is not None else 0
+            leidos = self.posicion - self.posicion_inicial
+
+            porcentaje = eta = None
+            if self.total_bytes:
+                porcentaje = round(min(self.posicion / self.total_bytes, 1) * 100, 1)
+                if leidos > 0 and duracion > 0:
+                    eta = round(max(self.total_bytes - self.posicion, 0) * duracion / leidos, 1)
+
+            return {
+                'lines_parsed': self.lineas_leidas,
+                'records_processed': self.registros,
+                'records_per_second': (
+                    round((self.registros - self.registros_iniciales) / duracion, 1) if duracion > 0 else 0
+                ),
+                'lines_per_second': round(self.lineas_leidas / duracion, 1) if duracion > 0 else 0,
+                'bytes_read': self.posicion,
+                'total_bytes': self.total_bytes,
+                'percent': porcentaje,
+                'eta_seconds': eta
+            }
+
+    def _notificar(self):
+        self.version += 1
+        self.condicion.notify_all()
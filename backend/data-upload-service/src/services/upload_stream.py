@@ -0,0 +1,174 @@
+import io
+import bz2
+import gzip
+import lzma
+import zlib
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, NeedData, File, Data, Epilogue
+from src.errors.errors import BadRequest
+
+CHUNK_SIZE = 64 * 1024
+MAX_FORM_MEMORY_SIZE = 500 * 1024
+MAX_DECOMPRESSED_SIZE = 1024 * 1024 * 1024
+
+# Extensiones de compresión aceptadas y su códec de la biblioteca estándar
+CODECS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open
+}
+
+
+class MultipartFileReader:
+    """
+    Lee una parte de archivo de un cuerpo multipart/form-data directamente
+    desde el stream de la request, a medida que llegan los bytes.
+
+    A diferencia de request.files, no guarda el archivo en un temporal:
+    los bytes se entregan por trozos y se pueden parsear de inmediato.
+    """
+
+    def __init__(self, stream, content_type, chunk_size=CHUNK_SIZE):
+        mimetype, options = parse_options_header(content_type or '')
+        boundary = options.get('boundary')
+
+        if mimetype != 'multipart/form-data' or not boundary:
+            raise BadRequest('La carga en streaming requiere Content-Type multipart/form-data')
+
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = MultipartDecoder(boundary.encode('latin-1'), MAX_FORM_MEMORY_SIZE)
+        self.filename = None
+
+    def _next_event(self):
+        """Obtiene el siguiente evento del decoder, leyendo del stream si hace falta"""
+        event = self.decoder.next_event()
+        while isinstance(event, NeedData):
+            chunk = self.stream.read(self.chunk_size)
+            self.decoder.receive_data(chunk or None)
+            event = self.decoder.next_event()
+        return event
+
+    def find_file(self, field_name='file'):
+        """
+        Avanza hasta la parte de archivo con el nombre indicado.
+        Retorna el nombre del archivo o None si el cuerpo no lo contiene.
+        """
+        while True:
+            event = self._next_event()
+            if isinstance(event, File) and event.name == field_name:
+                self.filename = event.filename
+                return self.filename
+            if isinstance(event, Epilogue):
+                return None
+
+    def iter_chunks(self):
+        """Genera los bytes de la parte de archivo actual, trozo a trozo"""
+        while True:
+            event = self._next_event()
+            if not isinstance(event, Data):
+                return
+            if event.data:
+                yield event.data
+            if not event.more_data:
+                return
+
+
+class ChunkStream(io.RawIOBase):
+    """
+    Adapta un iterable de trozos de bytes a un stream binario de solo lectura.
+    Si se entrega tee, cada trozo leído se escribe además en ese archivo;
+    si se entrega hasher (ej. hashlib.sha256()), se actualiza con cada trozo.
+    size acumula los bytes leídos.
+    """
+
+    def __init__(self, chunks, tee=None, hasher=None):
+        self.chunks = iter(chunks)
+        self.tee = tee
+        self.hasher = hasher
+        self.size = 0
+        self.pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            try:
+                self.pending = next(self.chunks)
+            except StopIteration:
+                return 0
+            self.size += len(self.pending)
+            if self.tee is not None:
+                self.tee.write(self.pending)
+            if self.hasher is not None:
+                self.hasher.update(self.pending)
+
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+class DecompressedStream(io.RawIOBase):
+    """
+    Descomprime un stream binario a medida que se lee, sin materializarlo.
+    Lanza BadRequest si el contenido descomprimido supera max_size bytes
+    (protección contra archivos que se expanden desproporcionadamente)
+    o si los datos comprimidos están dañados.
+    """
+    
+    def __init__(self, raw, codec, max_size=MAX_DECOMPRESSED_SIZE):
+        self.file = codec(raw, 'rb')
+        self.max_size = max_size
+        self.size = 0
+    
+    def readable(self):
+        return True
+    
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+    
+    def readinto(self, buffer):
+        try:
+            size = self.file.readinto(buffer)
+        except (OSError, EOFError, lzma.LZMAError, zlib.error) as e:
+            raise BadRequest(f'Archivo comprimido inválido: {str(e)}')
+        
+        self.size += size
+        if self.size > self.max_size:
+            raise BadRequest(
+                f'El archivo descomprimido supera el máximo de {self.max_size // (1024 * 1024)}MB'
+            )
+        return size
+
+
+def codec_de(filename):
+    """Retorna el códec de compresión según la extensión del archivo, o None si es texto plano"""
+    for extension, codec in CODECS.items():
+        if (filename or '').lower().endswith(extension):
+            return codec
+    return None
+
+
+def descomprimir(raw, filename, max_size=MAX_DECOMPRESSED_SIZE):
+    """
+    Envuelve raw en un DecompressedStream si filename tiene una extensión
+    de compresión; si no, retorna raw tal cual.
+    """
+    codec = codec_de(filename)
+    if codec is None:
+        return raw
+    return DecompressedStream(raw, codec, max_size)
+
+
+def open_text(raw, errors='strict'):
+    """
+    Abre un stream binario (ej. ChunkStream) como archivo de texto UTF-8.
+    Se comporta igual que open(path, 'r', encoding='utf-8') en cuanto a
+    saltos de línea, de modo que la numeración de líneas no cambia.
+    errors='replace' reemplaza los bytes inválidos por U+FFFD en vez de fallar.
+    """
+    return io.TextIOWrapper(io.BufferedReader(raw, CHUNK_SIZE), encoding='utf-8', errors=errors)
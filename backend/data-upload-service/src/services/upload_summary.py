@@ -0,0 +1,45 @@
+from collections import Counter
+from itertools import islice
+
+# Filas que se cuentan de una vez (Counter.update recorre el tramo en C)
+CONTAR_CADA = 5000
+
+
+class ResumenCarga:
+    """
+    Cuenta las marcaciones por día y por RUT mientras pasan hacia la BD,
+    para guardar el resumen de la generación sin volver a leer data.
+    """
+
+    def __init__(self):
+        self.por_dia = Counter()
+        self.por_rut = Counter()
+        self.total = 0
+
+    def contar(self, filas, cada=CONTAR_CADA):
+        """Genera las tuplas (fecha, hora, rut) de filas, contándolas por tramos de cada filas"""
+        filas = iter(filas)
+        try:
+            while True:
+                tramo = list(islice(filas, cada))
+                if not tramo:
+                    return
+                self.por_dia.update([fila[0] for fila in tramo])
+                self.por_rut.update([fila[2] for fila in tramo])
+                self.total += len(tramo)
+                yield from tramo
+        finally:
+            cerrar = getattr(filas, 'close', None)
+            if cerrar:
+                cerrar()
+
+    def resumen(self):
+        """Campos de data_summary con lo contado"""
+        return {
+            'total_records': self.total,
+            'total_employees': len(self.por_rut),
+            'fecha_min': min(self.por_dia) if self.por_dia else None,
+            'fecha_max': max(self.por_dia) if self.por_dia else None,
+            'records_per_day': dict(sorted(self.por_dia.items())),
+            'records_per_rut': dict(sorted(self.por_rut.items()))
+        }
@@ -2,6 +2,20 @@ import re
 from datetime import datetime
 from src.errors.errors import BadRequest
 
+FECHA_PATTERN = re.compile(r'^\d{4}/\d{2}/\d{2}$')
+HORA_PATTERN = re.compile(r'^\d{2}:\d{2}$')
+RUT_PATTERN = re.compile(r'^\d{1,8}-[0-9Kk]$')
+
+# Línea completa fecha;hora;rut en un solo patrón (solo dígitos ASCII).
+# Cualquier línea que no calce se delega a la validación campo a campo,
+# que es la que genera los mensajes de error.
+LINE_PATTERN = re.compile(r'([0-9]{4})/([0-9]{2})/([0-9]{2});([0-9]{2}):([0-9]{2});([0-9]{1,8}-[0-9Kk])')
+
+DIAS_POR_MES = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# DATA.TXT puede venir comprimido con alguna de estas extensiones
+COMPRESSED_EXTENSIONS = ('.GZ', '.BZ2', '.XZ')
+
 class DataValidator:
     
     @staticmethod
@@ -15,8 +29,7 @@ class DataValidator:
             raise BadRequest('Fecha inválida: . Debe estar en formato yyyy/MM/dd')
         
         # Validar formato exacto con regex
-        pattern = r'^\d{4}/\d{2}/\d{2}$'
-        if not re.match(pattern, fecha):
+        if not FECHA_PATTERN.match(fecha):
             raise BadRequest(f'Fecha inválida: {fecha}. Debe estar en formato yyyy/MM/dd')
         
         try:
@@ -36,8 +49,7 @@ class DataValidator:
             raise BadRequest('Hora inválida: . Debe estar en formato HH:mm')
         
         # Validar formato exacto con regex
-        pattern = r'^\d{2}:\d{2}$'
-        if not re.match(pattern, hora):
+        if not HORA_PATTERN.match(hora):
             raise BadRequest(f'Hora inválida: {hora}. Debe estar en formato HH:mm')
         
         try:
@@ -53,14 +65,37 @@ class DataValidator:
             raise BadRequest('RUT no puede estar vacío')
         
         # Formato: números-dígito verificador
-        pattern = r'^\d{1,8}-[0-9Kk]$'
-        if not re.match(pattern, rut.strip()):
+        if not RUT_PATTERN.match(rut.strip()):
             raise BadRequest(f'RUT inválido: {rut}. Debe estar en formato xxxxxxxx-x')
         
         return True
     
     @staticmethod
     def validate_line_format(line, line_number):
+        """
+        Valida una línea fecha;hora;rut y retorna la tupla (fecha, hora, rut).
+        
+        Camino rápido: un solo patrón precompilado extrae los tres campos y
+        el calendario y los rangos se verifican con aritmética entera.
+        Si algo no calza se usa validate_line_fields, de modo que los
+        mensajes de error y números de línea son exactamente los mismos.
+        """
+        match = LINE_PATTERN.fullmatch(line)
+        if match is not None:
+            anio, mes, dia, horas, minutos, rut = match.groups()
+            anio, mes, dia = int(anio), int(mes), int(dia)
+            
+            if 1 <= mes <= 12 and anio >= 1 and int(horas) < 24 and int(minutos) < 60:
+                dias_mes = DIAS_POR_MES[mes]
+                if mes == 2 and anio % 4 == 0 and (anio % 100 != 0 or anio % 400 == 0):
+                    dias_mes = 29
+                if 1 <= dia <= dias_mes:
+                    return line[:10], line[11:16], rut
+        
+        return DataValidator.validate_line_fields(line, line_number)
+    
+    @staticmethod
+    def validate_line_fields(line, line_number):
         """Valida que una línea tenga exactamente 3 campos separados por punto y coma"""
         parts = line.strip().split(';')
         if len(parts) != 3:
@@ -80,10 +115,27 @@ class DataValidator:
         if not file:
             raise BadRequest('No se ha proporcionado ningún archivo')
         
-        if not hasattr(file, 'filename') or file.filename == '':
+        if not hasattr(file, 'filename'):
+            raise BadRequest('No se ha seleccionado ningún archivo')
+        
+        return DataValidator.validate_filename(file.filename)
+    
+    @staticmethod
+    def validate_filename(filename):
+        """Valida que el nombre del archivo sea exactamente DATA.TXT, opcionalmente comprimido"""
+        if not filename:
             raise BadRequest('No se ha seleccionado ningún archivo')
         
-        if file.filename.upper() != 'DATA.TXT':
-            raise BadRequest('El nombre del archivo debe ser exactamente "DATA.TXT"')
+        nombre = filename.upper()
+        for extension in COMPRESSED_EXTENSIONS:
+            if nombre.endswith(extension):
+                nombre = nombre[:-len(extension)]
+                break
+        
+        if nombre != 'DATA.TXT':
+            raise BadRequest(
+                'El nombre del archivo debe ser exactamente "DATA.TXT" '
+                '(o DATA.TXT.gz, DATA.TXT.bz2, DATA.TXT.xz si viene comprimido)'
+            )
         
         return True
\ No newline at end of file
@@ -2,6 +2,7 @@ import pytest
 import json
 from io import BytesIO
 from werkzeug.datastructures import FileStorage
+from datetime import datetime
 from unittest.mock import patch, MagicMock
 from src.models.data import Data
 
@@ -25,24 +26,40 @@ class TestSubirDataController:
         assert 'No se ha proporcionado ningún archivo' in data['error']
     
     def test_get_data_success(self, client, populated_db):
-        """Test de obtención exitosa de todos los datos"""
+        """Test de obtención exitosa de una página de datos"""
         with patch('src.blueprints.subir_data_controller.SubirDataService') as mock_service_class:
             mock_instance = MagicMock()
             mock_service_class.return_value = mock_instance
             
             # Crear datos mock
-            mock_data = [
-                Data(id=1, fecha='2023/10/15', hora='08:00', rut='12345678-9'),
-                Data(id=2, fecha='2023/10/15', hora='17:30', rut='12345678-9')
-            ]
-            mock_instance.obtener_todos_los_datos.return_value = mock_data
+            mock_instance.obtener_pagina_datos.return_value = {
+                'data': [
+                    {'id': 1, 'fecha': '2023/10/15', 'hora': '08:00', 'rut': '12345678-9'},
+                    {'id': 2, 'fecha': '2023/10/15', 'hora': '17:30', 'rut': '12345678-9'}
+                ],
+                'next_cursor': 'abc',
+                'has_more': True
+            }
             
-            response = client.get('/data')
+            response = client.get('/data?limit=2&rut=12345678-9')
             assert response.status_code == 200
             data = json.loads(response.data)
             assert data['success'] is True
             assert data['total_records'] == 2
             assert len(data['data']) == 2
+            assert data['next_cursor'] == 'abc'
+            assert data['has_more'] is True
+            
+            kwargs = mock_instance.obtener_pagina_datos.call_args.kwargs
+            assert kwargs['limite'] == 2
+            assert kwargs['rut'] == '12345678-9'
+            assert kwargs['cursor'] is None
+    
+    def test_get_data_invalid_filter(self, client):
+        """Test de /data con un filtro inválido"""
+        response = client.get('/data?fecha_desde=2023-10-15')
+        assert response.status_code == 400
+        assert 'Fecha inválida' in json.loads(response.data)['error']
     
     def test_upload_success(self, client, sample_data_file):
         """Test de carga exitosa de archivo"""
@@ -60,7 +77,7 @@ class TestSubirDataController:
             
             # Verificar que los métodos fueron llamados
             mock_instance.guardar.assert_called_once()
-            mock_instance.leer_txt.assert_called_once_with('/path/to/file.txt')
+            mock_instance.leer_txt.assert_called_once_with('/path/to/file.txt', forzar=False, modo='replace')
     
     def test_get_data_by_rut_error(self, client):
         """Test de error al obtener datos por RUT"""
@@ -96,17 +113,23 @@ class TestSubirDataController:
             mock_instance = MagicMock()
             mock_service_class.return_value = mock_instance
             
-            # Mock data
-            mock_data = [Data() for _ in range(10)]  # 10 registros
-            mock_ruts = ['12345678-9', '87654321-0']  # 2 empleados
-            
-            mock_instance.obtener_todos_los_datos.return_value = mock_data
-            mock_instance.obtener_ruts_distintos.return_value = mock_ruts
+            # Mock data: 10 registros de 2 empleados
+            mock_instance.obtener_estadisticas.return_value = {
+                'total_records': 10,
+                'total_employees': 2,
+                'date_range': {'earliest': '2023/10/15', 'latest': '2023/10/16'},
+                'last_upload': datetime(2023, 10, 17, 9, 30),
+                'records_per_day': {'2023/10/15': 6, '2023/10/16': 4}
+            }
             
             response = client.get('/stats')
             assert response.status_code == 200
             data = json.loads(response.data)
             assert data['success'] is True
+            assert data['stats']['date_range'] == {'earliest': '2023/10/15', 'latest': '2023/10/16'}
+            assert data['stats']['last_upload'] == '2023-10-17T09:30:00'
+            assert data['stats']['records_per_day']['2023/10/16'] == 4
+            mock_instance.obtener_todos_los_datos.assert_not_called()
             assert data['stats']['total_records'] == 10
             assert data['stats']['total_employees'] == 2
             assert data['stats']['service_status'] == 'active'
@@ -1,7 +1,10 @@
 import pytest
 import os
 import json
+import hashlib
+import tempfile
 from io import BytesIO
+from unittest.mock import patch
 from werkzeug.datastructures import FileStorage
 from src.main import create_app
 from src.database import db
@@ -78,6 +81,9 @@ class TestIntegration:
         stats_data = json.loads(response.data)
         assert stats_data['stats']['total_records'] == 4
         assert stats_data['stats']['total_employees'] == 2
+        assert stats_data['stats']['date_range']['earliest'] <= stats_data['stats']['date_range']['latest']
+        assert sum(stats_data['stats']['records_per_day'].values()) == 4
+        assert stats_data['stats']['last_upload'] is not None
     
     def test_upload_replaces_previous_data(self, client):
         """Test que la carga de archivo reemplaza datos previos"""
@@ -125,6 +131,647 @@ class TestIntegration:
         assert '11111111-1' in ruts_data['ruts']
         assert '12345678-9' not in ruts_data['ruts']  # Del primer archivo
     
+    def test_upload_diff_mode(self, client):
+        """Test de recarga incremental con mode=diff"""
+        file1_content = """2023/10/15;08:00;12345678-9
+2023/10/15;17:30;12345678-9
+2023/10/15;17:30;12345678-9"""
+        response = client.post('/upload', data={
+            'file': FileStorage(stream=BytesIO(file1_content.encode('utf-8')), filename='DATA.TXT')
+        })
+        assert response.status_code == 200
+        # La línea repetida no se carga dos veces y se informa
+        assert json.loads(response.data)['registros_procesados'] == 2
+        assert json.loads(response.data)['registros_omitidos'] == 1
+        
+        file2_content = """2023/10/15;08:00;12345678-9
+2023/10/16;08:05;12345678-9"""
+        response = client.post('/upload?mode=diff', data={
+            'file': FileStorage(stream=BytesIO(file2_content.encode('utf-8')), filename='DATA.TXT')
+        })
+        assert response.status_code == 200
+        upload_data = json.loads(response.data)
+        assert upload_data['registros_agregados'] == 1
+        assert upload_data['registros_eliminados'] == 1
+        assert upload_data['registros_sin_cambios'] == 1
+        
+        response = client.get('/data')
+        data = json.loads(response.data)
+        assert data['total_records'] == 2
+        
+        # Modo desconocido
+        response = client.post('/upload?mode=merge', data={
+            'file': FileStorage(stream=BytesIO(file2_content.encode('utf-8')), filename='DATA.TXT')
+        })
+        assert response.status_code == 400
+    
+    def test_upload_append_mode(self, client):
+        """Test de carga parcial con mode=append"""
+        file1_content = """2023/10/15;08:00;12345678-9
+2023/10/15;17:30;12345678-9"""
+        response = client.post('/upload', data={
+            'file': FileStorage(stream=BytesIO(file1_content.encode('utf-8')), filename='DATA.TXT')
+        })
+        assert response.status_code == 200
+        
+        file2_content = """2023/10/15;17:30;12345678-9
+2023/10/16;08:05;12345678-9"""
+        response = client.post('/upload?mode=append', data={
+            'file': FileStorage(stream=BytesIO(file2_content.encode('utf-8')), filename='DATA.TXT')
+        })
+        assert response.status_code == 200
+        upload_data = json.loads(response.data)
+        assert upload_data['registros_agregados'] == 1
+        assert upload_data['registros_omitidos'] == 1
+        
+        response = client.get('/data')
+        data = json.loads(response.data)
+        assert data['total_records'] == 3
+    
+    def test_upload_gzip_streaming(self, client, tmp_path, monkeypatch):
+        """Test de carga de DATA.TXT.gz en modo streaming"""
+        import gzip
+        monkeypatch.chdir(tmp_path)
+        file_content = gzip.compress(b"2023/10/15;08:00;12345678-9\n2023/10/15;17:30;87654321-0\n")
+        
+        response = client.post('/upload?stream=true', data={
+            'file': FileStorage(stream=BytesIO(file_content), filename='DATA.TXT.gz')
+        })
+        assert response.status_code == 200
+        assert json.loads(response.data)['registros_procesados'] == 2
+        
+        response = client.get('/ruts')
+        assert json.loads(response.data)['total_ruts'] == 2
+    
+    def test_streaming_upload_flow(self, client, tmp_path, monkeypatch):
+        """Test de carga en modo streaming, sin guardar el archivo en disco"""
+        monkeypatch.chdir(tmp_path)
+        file_content = """2023/10/15;08:00;12345678-9
+
+2023/10/15;17:30;12345678-9
+2023/10/15;08:15;87654321-0"""
+        
+        file_data = FileStorage(
+            stream=BytesIO(file_content.encode('utf-8')),
+            filename='DATA.TXT',
+            content_type='text/plain'
+        )
+        
+        response = client.post('/upload?stream=true', data={'file': file_data})
+        assert response.status_code == 200
+        upload_data = json.loads(response.data)
+        assert upload_data['success'] is True
+        assert upload_data['registros_procesados'] == 3
+        assert not os.path.exists(tmp_path / 'uploads' / 'DATA.TXT')
+        
+        response = client.get('/ruts')
+        assert set(json.loads(response.data)['ruts']) == {'12345678-9', '87654321-0'}
+    
+    def test_streaming_upload_archive(self, client, tmp_path, monkeypatch):
+        """Test de carga en streaming que archiva el archivo crudo"""
+        monkeypatch.chdir(tmp_path)
+        file_content = b"2023/10/15;08:00;12345678-9\n2023/10/15;17:30;12345678-9\n"
+        
+        file_data = FileStorage(stream=BytesIO(file_content), filename='DATA.TXT')
+        
+        response = client.post('/upload?stream=true&archivar=true', data={'file': file_data})
+        assert response.status_code == 200
+        assert (tmp_path / 'uploads' / 'DATA.TXT').read_bytes() == file_content
+    
+    def test_streaming_upload_errors(self, client):
+        """Test de errores en modo streaming"""
+        # Nombre de archivo incorrecto
+        wrong_file = FileStorage(stream=BytesIO(b'content'), filename='WRONG.TXT')
+        response = client.post('/upload?stream=true', data={'file': wrong_file})
+        assert response.status_code == 400
+        assert 'DATA.TXT' in json.loads(response.data)['error']
+        
+        # Sin archivo
+        response = client.post('/upload?stream=true', data={'otro': 'valor'}, content_type='multipart/form-data')
+        assert response.status_code == 400
+        assert 'No se ha proporcionado' in json.loads(response.data)['error']
+    
+    def test_streaming_upload_too_large(self, app, client):
+        """Test de que un cuerpo sobre MAX_CONTENT_LENGTH en modo streaming responde 413, no 400"""
+        app.config['MAX_CONTENT_LENGTH'] = 1024
+        file_content = b'2023/10/15;08:00;12345678-9\n' * 100
+        
+        response = client.post('/upload?stream=true', data={
+            'file': FileStorage(stream=BytesIO(file_content), filename='DATA.TXT')
+        })
+        assert response.status_code == 413
+        assert json.loads(response.data)['success'] is False
+        
+        # Línea inválida: no se importa nada
+        invalid_file = FileStorage(
+            stream=BytesIO(b"2023/10/15;08:00;12345678-9\n2023/10/15;25:00;12345678-9"),
+            filename='DATA.TXT'
+        )
+        response = client.post('/upload?stream=true', data={'file': invalid_file})
+        assert response.status_code == 400
+        assert 'Hora inválida' in json.loads(response.data)['error']
+        assert json.loads(client.get('/data').data)['total_records'] == 0
+    
+    def test_async_upload_job_flow(self, app, client, tmp_path, monkeypatch):
+        """Test de carga asíncrona: 202 con job id y consulta de estado"""
+        monkeypatch.chdir(tmp_path)
+        file_content = """2023/10/15;08:00;12345678-9
+2023/10/15;17:30;12345678-9
+2023/10/15;08:15;87654321-0"""
+        
+        file_data = FileStorage(stream=BytesIO(file_content.encode('utf-8')), filename='DATA.TXT')
+        
+        response = client.post('/upload?async=true', data={'file': file_data})
+        assert response.status_code == 202
+        job = json.loads(response.data)
+        assert job['success'] is True
+        assert job['status'] == 'pending'
+        assert job['status_url'] == f"/upload/jobs/{job['job_id']}"
+        
+        app.extensions['upload_jobs'].esperar(job['job_id'], timeout=10)
+        
+        response = client.get(job['status_url'])
+        assert response.status_code == 200
+        estado = json.loads(response.data)['job']
+        assert estado['status'] == 'success'
+        assert estado['records_processed'] == 3
+        assert estado['finished_at'] is not None
+        
+        response = client.get('/data')
+        assert json.loads(response.data)['total_records'] == 3
+        
+        # Terminado el job, su archivo ya no se necesita
+        assert os.listdir(tmp_path / 'uploads') == []
+    
+    def test_async_upload_events_stream(self, app, client, tmp_path, monkeypatch):
+        """Test del stream SSE de progreso de una carga asíncrona"""
+        monkeypatch.chdir(tmp_path)
+        app.config['UPLOAD_PROGRESS_EVERY_LINES'] = 1
+        file_content = "\n".join(f"2023/10/15;08:{m:02d};12345678-9" for m in range(50))
+        
+        file_data = FileStorage(stream=BytesIO(file_content.encode('utf-8')), filename='DATA.TXT')
+        job = json.loads(client.post('/upload?async=true', data={'file': file_data}).data)
+        assert job['events_url'] == f"/upload/{job['job_id']}/events"
+        
+        response = client.get(job['events_url'])
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        
+        eventos = [bloque.split('\n') for bloque in response.get_data(as_text=True).strip().split('\n\n')]
+        eventos = [(e[0][len('event: '):], json.loads(e[1][len('data: '):])) for e in eventos if e[0].startswith('event:')]
+        
+        # El stream termina con el estado final del job
+        nombre, estado = eventos[-1]
+        assert nombre == 'done'
+        assert estado['status'] == 'success'
+        assert estado['records_processed'] == 50
+        
+        for nombre, progreso in eventos[:-1]:
+            assert nombre == 'progress'
+            assert progreso['total_bytes'] == len(file_content)
+            assert 0 <= progreso['lines_parsed'] <= 50
+        
+        # Un job ya terminado responde directamente con done
+        response = client.get(job['events_url'])
+        assert response.get_data(as_text=True).startswith('event: done')
+        
+        response = client.get('/upload/9999/events')
+        assert response.status_code == 404
+    
+    def test_async_upload_job_error(self, app, client, tmp_path, monkeypatch):
+        """Test de job asíncrono con línea inválida"""
+        monkeypatch.chdir(tmp_path)
+        file_data = FileStorage(stream=BytesIO(b'2023/10/15;08:00'), filename='DATA.TXT')
+        
+        response = client.post('/upload?async=true', data={'file': file_data})
+        job_id = json.loads(response.data)['job_id']
+        app.extensions['upload_jobs'].esperar(job_id, timeout=10)
+        
+        estado = json.loads(client.get(f'/upload/jobs/{job_id}').data)['job']
+        assert estado['status'] == 'error'
+        assert 'Línea 1 mal formateada' in estado['error_message']
+        
+        # Sin checkpoint la carga no se puede retomar: el archivo se elimina
+        assert os.listdir(tmp_path / 'uploads') == []
+        
+        # Job inexistente
+        response = client.get('/upload/jobs/9999')
+        assert response.status_code == 404
+        assert json.loads(response.data)['success'] is False
+    
+    def test_async_upload_queue_full(self, app, client, tmp_path, monkeypatch):
+        """Test de rechazo cuando el pool de jobs está lleno"""
+        monkeypatch.chdir(tmp_path)
+        jobs = app.extensions['upload_jobs']
+        
+        with patch.object(jobs.cupos, 'acquire', return_value=False):
+            file_data = FileStorage(stream=BytesIO(b'2023/10/15;08:00;1-9'), filename='DATA.TXT')
+            response = client.post('/upload?async=true', data={'file': file_data})
+        
+        assert response.status_code == 503
+        assert json.loads(response.data)['success'] is False
+    
+    def test_delete_month_endpoint(self, client):
+        """Test de DELETE /data/mes/<yyyy-MM>"""
+        file_content = "2023/10/15;08:00;12345678-9\n2023/10/16;08:00;12345678-9\n2023/11/01;08:00;12345678-9"
+        client.post('/upload', data={
+            'file': FileStorage(stream=BytesIO(file_content.encode('utf-8')), filename='DATA.TXT')
+        })
+        
+        response = client.delete('/data/mes/2023-10')
+        assert response.status_code == 200
+        resultado = json.loads(response.data)
+        assert resultado['mes'] == '2023/10'
+        assert resultado['registros_eliminados'] == 2
+        assert json.loads(client.get('/data').data)['total_records'] == 1
+        
+        response = client.delete('/data/mes/2023-99')
+        assert response.status_code == 400
+        assert 'Mes inválido' in json.loads(response.data)['error']
+    
+    def test_conditional_get_by_generation(self, client):
+        """Test de ETag por generación: 304 sin consultar los datos hasta la siguiente carga"""
+        def _subir(contenido):
+            return client.post('/upload', data={
+                'file': FileStorage(stream=BytesIO(contenido.encode('utf-8')), filename='DATA.TXT')
+            })
+        
+        _subir("2023/10/15;08:00;12345678-9\n2023/10/16;08:00;87654321-0")
+        
+        urls = ('/data', '/data/rut/12345678-9', '/ruts', '/stats')
+        etags = {}
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == 200
+            assert response.headers['Cache-Control'] == 'no-cache'
+            etags[url] = response.headers['ETag']
+            ultima = response.headers['Last-Modified']
+        assert len(set(etags.values())) == 1
+        
+        with patch('src.services.subir_data_service.DataRepository') as mock_data, \
+             patch('src.services.subir_data_service.DataSummaryRepository') as mock_summary:
+            for url in urls:
+                response = client.get(url, headers={'If-None-Match': etags[url]})
+                assert response.status_code == 304
+                assert response.headers['ETag'] == etags[url]
+                assert response.data == b''
+            
+            response = client.get('/stats', headers={'If-Modified-Since': ultima})
+            assert response.status_code == 304
+        assert not mock_data.method_calls
+        assert not mock_summary.method_calls
+        
+        # Una carga nueva cambia la etiqueta
+        _subir("2023/10/17;08:00;12345678-9")
+        response = client.get('/data', headers={'If-None-Match': etags['/data']})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etags['/data']
+        assert json.loads(response.data)['total_records'] == 1
+    
+    def test_export_endpoint(self, client):
+        """Test de GET /data/export en streaming"""
+        import gzip
+        client.post('/upload', data={
+            'file': FileStorage(
+                stream=BytesIO(b"2023/10/15;08:00;12345678-9\n2023/10/15;17:30;12345678-9\n"),
+                filename='DATA.TXT'
+            )
+        })
+        
+        response = client.get('/data/export')
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'application/x-ndjson'
+        lineas = [json.loads(linea) for linea in response.data.splitlines()]
+        assert [linea['hora'] for linea in lineas] == ['08:00', '17:30']
+        
+        response = client.get('/data/export?format=csv&gzip=true')
+        assert response.status_code == 200
+        assert 'marcaciones.csv.gz' in response.headers['Content-Disposition']
+        assert gzip.decompress(response.data).decode('utf-8').splitlines()[0] == 'id,fecha,hora,rut'
+        
+        response = client.get('/data/export?format=xml')
+        assert response.status_code == 400
+    
+    def test_uploads_history_endpoint(self, client):
+        """Test de GET /uploads con las métricas de cada carga"""
+        client.post('/upload', data={
+            'file': FileStorage(stream=BytesIO(b"2023/10/15;08:00;12345678-9\n"), filename='DATA.TXT')
+        })
+        
+        response = client.get('/uploads?limit=10')
+        assert response.status_code == 200
+        resultado = json.loads(response.data)
+        assert resultado['total_uploads'] == 1
+        carga = resultado['uploads'][0]
+        assert carga['status'] == 'success'
+        assert carga['lines_read'] == 1
+        assert carga['timings']['save'] is not None
+        assert set(carga['timings']) == {'save', 'hash', 'parse', 'wait', 'insert', 'commit', 'total'}
+        
+        response = client.get('/uploads?limit=1000')
+        assert response.status_code == 400
+    
+    def test_validate_endpoint_dry_run(self, client):
+        """Test de validación sin carga: reporta todos los errores y no escribe en la BD"""
+        file_content = """2023/10/15;08:00;12345678-9
+2023/10/15;99:00;12345678-9
+2023/10/15;17:30;12345678-9
+fecha;hora
+2023/02/30;08:00;12345678-9"""
+        
+        response = client.post('/upload/validate', data={
+            'file': FileStorage(stream=BytesIO(file_content.encode('utf-8')), filename='DATA.TXT')
+        })
+        assert response.status_code == 200
+        reporte = json.loads(response.data)
+        assert reporte['success'] is True
+        assert reporte['valido'] is False
+        assert reporte['total_errores'] == 3
+        assert [e['linea'] for e in reporte['errores']] == [2, 4, 5]
+        assert reporte['registros_validos'] == 2
+        
+        # Límite de errores detallados
+        response = client.post('/upload/validate?max_errores=1', data={
+            'file': FileStorage(stream=BytesIO(file_content.encode('utf-8')), filename='DATA.TXT')
+        })
+        reporte = json.loads(response.data)
+        assert len(reporte['errores']) == 1
+        assert reporte['truncado'] is True
+        
+        # Nombre de archivo inválido
+        response = client.post('/upload/validate', data={
+            'file': FileStorage(stream=BytesIO(b'x'), filename='OTRO.TXT')
+        })
+        assert response.status_code == 400
+        
+        assert json.loads(client.get('/data').data)['total_records'] == 0
+    
+    def _subir_chunk(self, client, upload_id, numero, datos, checksum=None):
+        return client.put(
+            f'/upload/chunked/{upload_id}/{numero}',
+            data=datos,
+            headers={'X-Chunk-SHA256': checksum or hashlib.sha256(datos).hexdigest()}
+        )
+    
+    def test_chunked_upload_flow(self, client, tmp_path, monkeypatch):
+        """Test de carga por partes con chunks fuera de orden y reanudación"""
+        monkeypatch.chdir(tmp_path)
+        contenido = b"""2023/10/15;08:00;12345678-9
+2023/10/15;17:30;12345678-9
+2023/10/15;08:15;87654321-0
+2023/10/15;17:45;87654321-0"""
+        chunks = [contenido[i:i + 20] for i in range(0, len(contenido), 20)]
+        
+        response = client.post('/upload/chunked', json={
+            'filename': 'DATA.TXT',
+            'total_chunks': len(chunks),
+            'total_size': len(contenido),
+            'sha256': hashlib.sha256(contenido).hexdigest()
+        })
+        assert response.status_code == 201
+        upload_id = json.loads(response.data)['upload']['upload_id']
+        
+        # Se envían el primero y el último; la conexión "se corta"
+        assert self._subir_chunk(client, upload_id, 0, chunks[0]).status_code == 200
+        assert self._subir_chunk(client, upload_id, len(chunks) - 1, chunks[-1]).status_code == 200
+        
+        estado = json.loads(client.get(f'/upload/chunked/{upload_id}').data)['upload']
+        assert estado['recibidos'] == [0, len(chunks) - 1]
+        assert estado['siguiente_chunk'] == 1
+        
+        # Completar antes de tiempo falla sin perder lo recibido
+        response = client.post(f'/upload/chunked/{upload_id}/complete')
+        assert response.status_code == 400
+        assert 'Faltan chunks' in json.loads(response.data)['error']
+        
+        # Reanudar desde siguiente_chunk; reenviar un chunk ya aceptado es idempotente
+        for numero in range(estado['siguiente_chunk'], len(chunks) - 1):
+            assert self._subir_chunk(client, upload_id, numero, chunks[numero]).status_code == 200
+        assert self._subir_chunk(client, upload_id, 0, chunks[0]).status_code == 200
+        
+        response = client.post(f'/upload/chunked/{upload_id}/complete')
+        assert response.status_code == 200
+        assert json.loads(response.data)['registros_procesados'] == 4
+        assert json.loads(client.get('/data').data)['total_records'] == 4
+        
+        # La carga se elimina al procesarse
+        assert client.get(f'/upload/chunked/{upload_id}').status_code == 404
+    
+    def test_chunked_upload_errors(self, client, tmp_path, monkeypatch):
+        """Test de checksum incorrecto y de línea inválida detectada antes del último chunk"""
+        monkeypatch.chdir(tmp_path)
+        
+        response = client.post('/upload/chunked', json={'filename': 'WRONG.TXT', 'total_chunks': 1})
+        assert response.status_code == 400
+        
+        response = client.post('/upload/chunked', json={'filename': 'DATA.TXT', 'total_chunks': 3})
+        upload_id = json.loads(response.data)['upload']['upload_id']
+        
+        response = self._subir_chunk(client, upload_id, 0, b'2023/10/15;08:00;1-9\n', checksum='0' * 64)
+        assert response.status_code == 400
+        assert 'SHA-256' in json.loads(response.data)['error']
+        
+        assert self._subir_chunk(client, upload_id, 0, b'2023/10/15;08:00;1-9\n').status_code == 200
+        response = self._subir_chunk(client, upload_id, 1, b'2023/10/15;99:00;1-9\n2023')
+        assert response.status_code == 400
+        assert 'Hora inválida' in json.loads(response.data)['error']
+        
+        # La carga queda marcada con el error y se puede cancelar
+        assert self._subir_chunk(client, upload_id, 2, b'/10/15;08:00;1-9').status_code == 400
+        assert client.delete(f'/upload/chunked/{upload_id}').status_code == 200
+        assert client.get(f'/upload/chunked/{upload_id}').status_code == 404
+    
+    def test_chunk_larger_than_max_content_length(self, app, client, tmp_path, monkeypatch):
+        """Test de que un chunk sobre MAX_CONTENT_LENGTH responde 413 y la carga sigue aceptando chunks"""
+        monkeypatch.chdir(tmp_path)
+        app.config['MAX_CONTENT_LENGTH'] = 1024
+        
+        response = client.post('/upload/chunked', json={'filename': 'DATA.TXT', 'total_chunks': 1})
+        upload_id = json.loads(response.data)['upload']['upload_id']
+        
+        response = self._subir_chunk(client, upload_id, 0, b'2023/10/15;08:00;1-9\n' * 100)
+        assert response.status_code == 413
+        assert json.loads(response.data)['success'] is False
+        
+        assert self._subir_chunk(client, upload_id, 0, b'2023/10/15;08:00;1-9\n').status_code == 200
+    
+    def test_chunked_upload_async(self, app, client, tmp_path, monkeypatch):
+        """Test de carga por partes procesada como job asíncrono"""
+        monkeypatch.chdir(tmp_path)
+        contenido = b'2023/10/15;08:00;12345678-9\n2023/10/15;17:30;12345678-9\n'
+        
+        response = client.post('/upload/chunked', json={'filename': 'DATA.TXT', 'total_chunks': 1})
+        upload_id = json.loads(response.data)['upload']['upload_id']
+        self._subir_chunk(client, upload_id, 0, contenido)
+        
+        response = client.post(f'/upload/chunked/{upload_id}/complete?async=true')
+        assert response.status_code == 202
+        job_id = json.loads(response.data)['job_id']
+        app.extensions['upload_jobs'].esperar(job_id, timeout=10)
+        
+        estado = json.loads(client.get(f'/upload/jobs/{job_id}').data)['job']
+        assert estado['status'] == 'success'
+        assert estado['records_processed'] == 2
+    
+    def test_resume_interrupted_uploads(self, app, client, tmp_path, monkeypatch):
+        """Test de reanudación al iniciar: job pendiente y carga con checkpoint"""
+        from datetime import datetime, timedelta
+        from src.repositories.upload_log_repository import UploadLogRepository
+        from src.repositories.data_repository import DataRepository
+        monkeypatch.chdir(tmp_path)
+        app.config['UPLOAD_COMMIT_MODE'] = 'batch'
+        
+        path = tmp_path / 'DATA.TXT'
+        contenido = b'2023/10/15;08:00;12345678-9\n2023/10/15;17:30;12345678-9\n'
+        path.write_bytes(contenido)
+        hace_una_hora = datetime.now() - timedelta(hours=1)
+        
+        # Carga que confirmó la primera línea en staging antes de caerse
+        DataRepository.create_staging()
+        DataRepository.bulk_insert([('2023/10/15', '08:00', '12345678-9')], table=DataRepository.staging_table())
+        interrumpida = UploadLogRepository.create('DATA.TXT', file_path=str(path), status='running', load_mode='replace')
+        UploadLogRepository.set_source_hash(interrumpida.id, hashlib.sha256(contenido).hexdigest())
+        UploadLogRepository.checkpoint(interrumpida.id, 28, 1, 1)
+        interrumpida.heartbeat_at = hace_una_hora
+        db.session.commit()
+        
+        jobs = app.extensions['upload_jobs']
+        encolados = jobs.reanudar_interrumpidas()
+        assert encolados == [interrumpida.id]
+        jobs.esperar(interrumpida.id, timeout=10)
+        db.session.expire_all()
+        
+        estado = json.loads(client.get(f'/upload/jobs/{interrumpida.id}').data)['job']
+        assert estado['status'] == 'success'
+        assert estado['checkpoint'] == {'offset': len(contenido), 'line': 2, 'rows': 2}
+        assert json.loads(client.get('/data').data)['total_records'] == 2
+        assert not path.exists()
+        
+        # Job pendiente que nunca empezó: se ejecuta desde el inicio
+        path.write_text('2023/10/15;08:00;12345678-9\n', encoding='utf-8')
+        pendiente = UploadLogRepository.create('DATA.TXT', file_path=str(path), load_mode='append')
+        pendiente.heartbeat_at = hace_una_hora
+        db.session.commit()
+        
+        assert jobs.reanudar_interrumpidas() == [pendiente.id]
+        jobs.esperar(pendiente.id, timeout=10)
+        db.session.expire_all()
+        assert UploadLogRepository.find_by_id(pendiente.id).status == 'success'
+        
+        # Nada más que retomar
+        assert jobs.reanudar_interrumpidas() == []
+    
+    def test_resume_without_free_slots_leaves_job_unclaimed(self, app, tmp_path, monkeypatch):
+        """Test de que sin cupos en la cola un job interrumpido no se toma, y se retoma después"""
+        from datetime import datetime, timedelta
+        from src.repositories.upload_log_repository import UploadLogRepository
+        monkeypatch.chdir(tmp_path)
+        
+        path = tmp_path / 'DATA.TXT'
+        path.write_text('2023/10/15;08:00;12345678-9\n', encoding='utf-8')
+        hace_una_hora = datetime.now() - timedelta(hours=1)
+        pendiente = UploadLogRepository.create('DATA.TXT', file_path=str(path))
+        pendiente.heartbeat_at = hace_una_hora
+        db.session.commit()
+        
+        jobs = app.extensions['upload_jobs']
+        ocupados = 0
+        while jobs.cupos.acquire(blocking=False):
+            ocupados += 1
+        
+        assert jobs.reanudar_interrumpidas() == []
+        db.session.expire_all()
+        assert UploadLogRepository.find_by_id(pendiente.id).heartbeat_at == hace_una_hora
+        
+        for _ in range(ocupados):
+            jobs.cupos.release()
+        assert jobs.reanudar_interrumpidas() == [pendiente.id]
+        jobs.esperar(pendiente.id, timeout=10)
+    
+    def test_resume_scan_repeats_after_startup(self, app, tmp_path, monkeypatch):
+        """Test de que una carga con heartbeat reciente al iniciar se retoma en una búsqueda posterior"""
+        import threading
+        from datetime import datetime, timedelta
+        from src.repositories.upload_log_repository import UploadLogRepository
+        monkeypatch.chdir(tmp_path)
+        
+        path = tmp_path / 'DATA.TXT'
+        path.write_text('2023/10/15;08:00;12345678-9\n', encoding='utf-8')
+        # Reinicio rápido: el job todavía tiene señal de vida
+        pendiente = UploadLogRepository.create('DATA.TXT', file_path=str(path))
+        
+        jobs = app.extensions['upload_jobs']
+        assert jobs.reanudar_interrumpidas() == []
+        
+        pendiente.heartbeat_at = datetime.now() - timedelta(hours=1)
+        db.session.commit()
+        
+        # Un job que ya está en el pool de este proceso no se vuelve a encolar
+        jobs.futures[pendiente.id] = None
+        assert jobs.reanudar_interrumpidas() == []
+        del jobs.futures[pendiente.id]
+        
+        retomadas = []
+        buscada = threading.Event()
+        reanudar = jobs.reanudar_interrumpidas
+        
+        def _reanudar():
+            retomadas.extend(reanudar())
+            buscada.set()
+        
+        with patch.object(jobs, 'reanudar_interrumpidas', side_effect=_reanudar):
+            thread = jobs.vigilar_interrumpidas(0.01)
+            assert buscada.wait(timeout=10)
+            jobs.detener()
+            thread.join(timeout=10)
+        
+        assert retomadas == [pendiente.id]
+        jobs.esperar(pendiente.id, timeout=10)
+        db.session.expire_all()
+        assert UploadLogRepository.find_by_id(pendiente.id).status == 'success'
+    
+    def test_reupload_same_file_no_changes(self, client, tmp_path, monkeypatch):
+        """Test de re-subida del mismo archivo: responde sin cambios"""
+        monkeypatch.chdir(tmp_path)
+        file_content = b"2023/10/15;08:00;12345678-9\n2023/10/15;17:30;12345678-9\n"
+        
+        for stream in ('false', 'true'):
+            response = client.post(
+                f'/upload?stream={stream}',
+                data={'file': FileStorage(stream=BytesIO(file_content), filename='DATA.TXT')}
+            )
+            assert response.status_code == 200
+        
+        data = json.loads(response.data)
+        assert data['sin_cambios'] is True
+        assert data['registros_procesados'] == 0
+        assert json.loads(client.get('/data').data)['total_records'] == 2
+        
+        response = client.post(
+            '/upload?stream=true&forzar=true',
+            data={'file': FileStorage(stream=BytesIO(file_content), filename='DATA.TXT')}
+        )
+        data = json.loads(response.data)
+        assert data['sin_cambios'] is False
+        assert data['registros_procesados'] == 2
+    
+    def test_load_data_spool_removed_after_invalid_line(self, app, client, tmp_path, monkeypatch):
+        """Test de que el archivo temporal de LOAD DATA no queda en disco si una línea es inválida"""
+        spool = tmp_path / 'spool'
+        spool.mkdir()
+        monkeypatch.setattr(tempfile, 'tempdir', str(spool))
+        app.config['UPLOAD_BACKEND'] = 'load_data'
+        
+        file_content = "2023/10/15;08:00;12345678-9\n2023/10/15;25:00;12345678-9"
+        with patch('src.services.subir_data_service.DataRepository.supports_load_data', return_value=True):
+            response = client.post('/upload', data={
+                'file': FileStorage(stream=BytesIO(file_content.encode('utf-8')), filename='DATA.TXT')
+            })
+        
+        assert response.status_code == 400
+        assert list(spool.iterdir()) == []
+    
     def test_error_handling_integration(self, client):
         """Test de manejo de errores de integración"""
         # 1. Test archivo con nombre incorrecto
@@ -145,7 +145,7 @@ class TestErrorHandlers:
         with app.test_client() as client:
             with patch('src.blueprints.subir_data_controller.SubirDataService') as mock_service:
                 # Simular error interno
-                mock_service.return_value.obtener_todos_los_datos.side_effect = Exception('Internal error')
+                mock_service.return_value.obtener_pagina_datos.side_effect = Exception('Internal error')
                 
                 response = client.get('/data')
                 assert response.status_code == 500
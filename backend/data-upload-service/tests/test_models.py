@@ -1,5 +1,8 @@
 import pytest
+from datetime import date
+from sqlalchemy import Table, Column, Integer, MetaData, insert, select, text
 from src.models.data import Data
+from src.models.types import FechaCompacta, HoraCompacta, RutCompacto, rut_canonico
 
 class TestDataModel:
     """Pruebas para el modelo Data"""
@@ -164,3 +167,72 @@ class TestDataModel:
         assert data1.id == data2.id
         # Objetos con diferente ID son diferentes
         assert data1.id != data3.id
+
+
+class TestTiposCompactos:
+    """Pruebas de los tipos de DATA_STORAGE = 'compact'"""
+    
+    @pytest.mark.parametrize('tipo,valor,guardado', [
+        (FechaCompacta(), '2024/02/29', date(2024, 2, 29)),
+        (HoraCompacta(), '08:05', 485),
+        (HoraCompacta(), '23:59', 1439),
+        (RutCompacto(), '12345678-9', 12345678 * 11 + 9),
+        (RutCompacto(), '671-K', 671 * 11 + 10),
+        (RutCompacto(), '99999999-K', 99999999 * 11 + 10)
+    ])
+    def test_round_trip(self, tipo, valor, guardado):
+        """Test de conversión string -> valor compacto -> string"""
+        assert tipo.process_bind_param(valor, None) == guardado
+        assert tipo.process_result_value(guardado, None) == valor
+    
+    @pytest.mark.parametrize('tipo,valor', [
+        (FechaCompacta(), 'no-es-fecha'),
+        (HoraCompacta(), 'xx:yy'),
+        (RutCompacto(), '123456789-1'),
+        (RutCompacto(), '12345678-X'),
+        (RutCompacto(), 'abc')
+    ])
+    def test_invalid_values_match_nothing(self, tipo, valor):
+        """Test de que un valor inválido (ej. en un filtro) se convierte en NULL"""
+        assert tipo.process_bind_param(valor, None) is None
+    
+    @pytest.mark.parametrize('valor', ['01234567-k', '1234567-K', '00001234-9', '0-0'])
+    def test_rut_canonico_is_the_stored_string(self, valor):
+        """Test de que rut_canonico entrega lo mismo que RutCompacto al leer lo guardado"""
+        tipo = RutCompacto()
+        assert rut_canonico(valor) == tipo.process_result_value(tipo.process_bind_param(valor, None), None)
+    
+    def test_compact_table_queries(self, app):
+        """Test de inserción y consultas sobre una tabla con tipos compactos"""
+        with app.app_context():
+            from src.database import db
+            
+            tabla = Table(
+                'data_compacta', MetaData(),
+                Column('id', Integer, primary_key=True),
+                Column('fecha', FechaCompacta(), nullable=False),
+                Column('hora', HoraCompacta(), nullable=False),
+                Column('rut', RutCompacto(), nullable=False)
+            )
+            tabla.create(bind=db.session.connection())
+            
+            db.session.execute(insert(tabla), [
+                {'fecha': '2023/10/15', 'hora': '08:00', 'rut': '12345678-9'},
+                {'fecha': '2023/10/15', 'hora': '17:30', 'rut': '12345678-9'},
+                {'fecha': '2023/10/16', 'hora': '08:15', 'rut': '1-k'}
+            ])
+            
+            filas = db.session.execute(
+                select(tabla.c.fecha, tabla.c.hora, tabla.c.rut)
+                .where(tabla.c.fecha >= '2023/10/15', tabla.c.hora < '17:00')
+                .order_by(tabla.c.fecha, tabla.c.hora)
+            ).all()
+            assert [tuple(f) for f in filas] == [('2023/10/15', '08:00', '12345678-9'), ('2023/10/16', '08:15', '1-K')]
+            
+            assert db.session.execute(select(tabla.c.id).where(tabla.c.rut == '1-K')).scalar() == 3
+            assert db.session.execute(select(tabla.c.id).where(tabla.c.rut == 'abc')).first() is None
+            
+            # Se guarda como enteros, no como texto
+            assert db.session.execute(text('SELECT hora, rut FROM data_compacta WHERE id = 1')).one() == (480, 135802467)
+            
+            db.session.rollback()
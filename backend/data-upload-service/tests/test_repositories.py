@@ -1,6 +1,10 @@
 import pytest
 from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta
 from src.repositories.data_repository import DataRepository
+from src.repositories.upload_log_repository import UploadLogRepository
+from src.repositories.data_summary_repository import DataSummaryRepository
+from src.repositories.data_generation_repository import DataGenerationRepository
 from src.models.data import Data
 from src.database import db
 
@@ -40,6 +44,180 @@ class TestDataRepository:
             assert saved_record.hora == '08:00'
             assert saved_record.rut == '12345678-9'
     
+    def test_bulk_insert(self, app):
+        """Test de inserción masiva por lotes sin commit implícito"""
+        with app.app_context():
+            rows = [
+                ('2023/10/15', '08:00', '12345678-9'),
+                ('2023/10/15', '17:30', '12345678-9'),
+                ('2023/10/16', '08:15', '87654321-0')
+            ]
+            
+            total = DataRepository.bulk_insert(iter(rows), batch_size=2)
+            
+            assert total == 3
+            assert Data.query.count() == 3
+            
+            # Sin commit_per_batch el llamador decide: rollback descarta todo
+            DataRepository.rollback()
+            assert Data.query.count() == 0
+    
+    def test_bulk_insert_ignores_duplicates(self, app):
+        """Test de que las marcaciones repetidas se omiten sin error"""
+        with app.app_context():
+            db.session.add(Data(fecha='2023/10/15', hora='08:00', rut='12345678-9'))
+            db.session.commit()
+            
+            rows = [
+                ('2023/10/15', '08:00', '12345678-9'),
+                ('2023/10/15', '17:30', '12345678-9'),
+                ('2023/10/15', '17:30', '12345678-9')
+            ]
+            
+            assert DataRepository.bulk_insert(rows) == 1
+            DataRepository.commit()
+            assert Data.query.count() == 2
+    
+    def test_supports_load_data_sqlite(self, app):
+        """Test de que LOAD DATA solo se ofrece en MySQL"""
+        with app.app_context():
+            assert DataRepository.supports_load_data() is False
+    
+    def test_staging_swap(self, app):
+        """Test de carga en staging e intercambio con la tabla data"""
+        with app.app_context():
+            db.session.add(Data(fecha='2023/10/15', hora='08:00', rut='12345678-9'))
+            db.session.commit()
+            
+            DataRepository.create_staging()
+            DataRepository.bulk_insert(
+                [('2023/10/16', '09:00', '87654321-0')],
+                table=DataRepository.staging_table()
+            )
+            DataRepository.commit()
+            
+            # Antes del intercambio los lectores siguen viendo la generación anterior
+            assert DataRepository.find_distinct_rut() == ['12345678-9']
+            
+            DataRepository.swap_staging()
+            DataRepository.drop_old()
+            
+            assert DataRepository.find_distinct_rut() == ['87654321-0']
+    
+    def test_failed_swap_keeps_data(self, app):
+        """Test de que un intercambio que falla a medias no deja data renombrada"""
+        with app.app_context():
+            db.session.add(Data(fecha='2023/10/15', hora='08:00', rut='12345678-9'))
+            db.session.commit()
+            
+            # Sin data_staging el segundo RENAME falla después del primero
+            DataRepository.drop_staging()
+            with pytest.raises(Exception):
+                DataRepository.swap_staging()
+            DataRepository.rollback()
+            
+            assert DataRepository.find_distinct_rut() == ['12345678-9']
+    
+    def test_delete_month_without_partitions(self, app):
+        """Test de eliminación de un mes por rango de fechas (SQLite, sin particiones)"""
+        with app.app_context():
+            DataRepository.bulk_insert([
+                ('2023/09/30', '08:00', '1-9'),
+                ('2023/10/01', '08:00', '1-9'),
+                ('2023/10/31', '18:00', '1-9'),
+                ('2023/11/01', '08:00', '1-9')
+            ])
+            DataRepository.commit()
+            
+            assert DataRepository.supports_partitions() is False
+            assert DataRepository.delete_month(2023, 10) == 2
+            assert DataRepository.get_all_dates() == ['2023/09/30', '2023/11/01']
+    
+    def test_insert_from_staging_by_month(self, app):
+        """Test de copia de un mes desde data_staging"""
+        with app.app_context():
+            DataRepository.create_staging()
+            DataRepository.bulk_insert(
+                [('2023/10/15', '08:00', '1-9'), ('2023/11/15', '08:00', '1-9')],
+                table=DataRepository.staging_table()
+            )
+            
+            assert DataRepository.insert_from_staging((2023, 11)) == 1
+            DataRepository.commit()
+            DataRepository.drop_staging()
+            
+            assert DataRepository.get_all_dates() == ['2023/11/15']
+    
+    def test_aggregate_stats_and_count_by_fecha(self, app, sample_data_records):
+        """Test de los totales agregados y de la cuenta por día"""
+        with app.app_context():
+            for record in sample_data_records:
+                db.session.add(record)
+            db.session.commit()
+            
+            assert DataRepository.aggregate_stats() == (6, 2, '2023/10/15', '2023/10/16')
+            assert DataRepository.count_by_fecha() == {'2023/10/15': 4, '2023/10/16': 2}
+    
+    def test_aggregate_stats_empty(self, app):
+        """Test de los totales agregados sin datos"""
+        with app.app_context():
+            assert DataRepository.aggregate_stats() == (0, 0, None, None)
+            assert DataRepository.count_by_fecha() == {}
+    
+    @patch('src.repositories.data_repository.ALMACENAMIENTO_COMPACTO', False)
+    def test_partition_definitions(self):
+        """Test de las definiciones de particiones mensuales contiguas"""
+        meses = DataRepository._month_range((2023, 11), (2024, 1))
+        assert meses == [(2023, 11), (2023, 12), (2024, 1)]
+        
+        definiciones = DataRepository._partition_definitions(meses)
+        assert definiciones == (
+            "PARTITION pantiguo VALUES LESS THAN ('2023/11/01'), "
+            "PARTITION p202311 VALUES LESS THAN ('2023/12/01'), "
+            "PARTITION p202312 VALUES LESS THAN ('2024/01/01'), "
+            "PARTITION p202401 VALUES LESS THAN ('2024/02/01'), "
+            "PARTITION pmax VALUES LESS THAN (MAXVALUE)"
+        )
+        assert DataRepository._partition_definitions([], low=False) == 'PARTITION pmax VALUES LESS THAN (MAXVALUE)'
+    
+    def test_ensure_month_partitions_splits_edges(self, app):
+        """Test de que los meses nuevos se agregan dividiendo solo los extremos"""
+        with app.app_context():
+            particiones = ['pantiguo', 'p202310', 'p202311', 'pmax']
+            with patch.object(DataRepository, '_partitions', return_value=particiones), \
+                 patch.object(DataRepository, '_months_in', return_value=['2023/08', '2024/01']) as months_in, \
+                 patch.object(DataRepository, '_reorganize') as reorganize:
+                agregados = DataRepository.ensure_month_partitions()
+            
+            months_in.assert_called_once_with('data', ['pantiguo', 'pmax'])
+            assert agregados == [(2023, 12), (2024, 1), (2023, 8), (2023, 9)]
+            assert reorganize.call_args_list[0].args == ('data', ['pmax'], [(2023, 12), (2024, 1)])
+            assert reorganize.call_args_list[0].kwargs == {'high': True}
+            assert reorganize.call_args_list[1].args == ('data', ['pantiguo'], [(2023, 8), (2023, 9)])
+            assert reorganize.call_args_list[1].kwargs == {'low': True}
+            
+            # Sin meses nuevos no se reorganiza nada
+            with patch.object(DataRepository, '_partitions', return_value=particiones), \
+                 patch.object(DataRepository, '_reorganize') as reorganize:
+                assert DataRepository.ensure_month_partitions([(2023, 10)]) == []
+            reorganize.assert_not_called()
+    
+    def test_iter_keys_and_delete_by_ids(self, app, sample_data_records):
+        """Test de recorrido de claves y borrado por ids en lotes"""
+        with app.app_context():
+            for record in sample_data_records:
+                db.session.add(record)
+            db.session.commit()
+            
+            claves = list(DataRepository.iter_keys(batch_size=2))
+            assert len(claves) == len(sample_data_records)
+            
+            ids = [data_id for data_id, rut, fecha, hora in claves if fecha == '2023/10/16']
+            assert DataRepository.delete_by_ids(ids, batch_size=1) == 2
+            DataRepository.commit()
+            
+            assert Data.query.count() == len(sample_data_records) - 2
+    
     def test_rollback(self, app):
         """Test de rollback de transacción"""
         with app.app_context():
@@ -232,3 +410,90 @@ class TestDataRepository:
             # Debe haber 2 fechas únicas ordenadas
             assert len(result) == 2
             assert result == ['2023/10/15', '2023/10/16']  # Ordenadas ASC
+
+
+class TestUploadLogRepository:
+    """Pruebas para el repositorio de upload_logs"""
+    
+    def test_mark_running_only_once(self, app):
+        """Test de que un job pendiente solo lo toma un proceso"""
+        with app.app_context():
+            log = UploadLogRepository.create('DATA.TXT', file_path='uploads/DATA.TXT')
+            
+            assert UploadLogRepository.mark_running(log.id) is True
+            assert UploadLogRepository.mark_running(log.id) is False
+    
+    def test_find_recent_and_finish_metrics(self, app):
+        """Test del historial paginado y de que finish no pisa métricas ya registradas"""
+        with app.app_context():
+            ids = [UploadLogRepository.create('DATA.TXT', save_seconds=0.5).id for _ in range(3)]
+            
+            UploadLogRepository.finish(
+                ids[0], 'success', metricas={'save_seconds': None, 'parse_seconds': 1.25, 'lines_read': 10}
+            )
+            
+            assert [log.id for log in UploadLogRepository.find_recent(limit=2)] == [ids[2], ids[1]]
+            assert [log.id for log in UploadLogRepository.find_recent(limit=2, offset=2)] == [ids[0]]
+            assert UploadLogRepository.count() == 3
+            assert UploadLogRepository.count('success') == 1
+            
+            log = UploadLogRepository.find_by_id(ids[0])
+            assert log.save_seconds == 0.5
+            assert log.parse_seconds == 1.25
+            assert log.lines_read == 10
+    
+    def test_find_interrupted_and_claim(self, app):
+        """Test de búsqueda de cargas sin señal de vida y de su toma exclusiva"""
+        with app.app_context():
+            vieja = UploadLogRepository.create('DATA.TXT', file_path='uploads/a', status='running')
+            UploadLogRepository.create('DATA.TXT', file_path='uploads/b', status='running')
+            UploadLogRepository.create('DATA.TXT', status='pending')
+            vieja.heartbeat_at = datetime.now() - timedelta(hours=1)
+            db.session.commit()
+            
+            interrumpidas = UploadLogRepository.find_interrupted(datetime.now() - timedelta(minutes=5))
+            assert [log.id for log in interrumpidas] == [vieja.id]
+            
+            heartbeat = interrumpidas[0].heartbeat_at
+            assert UploadLogRepository.claim(vieja.id, heartbeat) is True
+            assert UploadLogRepository.claim(vieja.id, heartbeat) is False
+
+
+class TestDataSummaryRepository:
+    """Pruebas para el repositorio de data_summary"""
+    
+    def test_save_replaces_and_find_latest(self, app):
+        """Test de que save reemplaza el resumen de una generación y find_latest entrega la última"""
+        with app.app_context():
+            primera = UploadLogRepository.create('DATA.TXT', status='success').id
+            segunda = UploadLogRepository.create('DATA.TXT', status='success').id
+            assert DataSummaryRepository.find_latest() is None
+            
+            DataSummaryRepository.save(primera, 1, 1, '2023/10/15', '2023/10/15', {'2023/10/15': 1}, {'1-9': 1})
+            DataSummaryRepository.save(segunda, 2, 1, '2023/10/15', '2023/10/16', {}, {})
+            DataSummaryRepository.save(segunda, 3, 2, '2023/10/15', '2023/10/17', {'2023/10/17': 3}, {})
+            
+            resumen = DataSummaryRepository.find_latest()
+            assert resumen.upload_log_id == segunda
+            assert resumen.total_records == 3
+            assert resumen.records_per_day == {'2023/10/17': 3}
+            
+            DataSummaryRepository.delete_all()
+            assert DataSummaryRepository.find_latest() is None
+
+class TestDataGenerationRepository:
+    """Pruebas para el repositorio de data_generation"""
+    
+    def test_bump_creates_and_increments(self, app):
+        """Test de que bump crea la fila con la generación 1 y luego la incrementa"""
+        with app.app_context():
+            assert DataGenerationRepository.find() is None
+            
+            primera = DataGenerationRepository.bump()
+            assert primera.generation == 1
+            modificado = primera.updated_at
+            
+            segunda = DataGenerationRepository.bump()
+            assert segunda.generation == 2
+            assert segunda.updated_at >= modificado
+            assert DataGenerationRepository.find().generation == 2
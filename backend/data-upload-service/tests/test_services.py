@@ -1,12 +1,23 @@
 import pytest
 import os
+import hashlib
 import tempfile
 from unittest.mock import patch, MagicMock, mock_open
 from io import BytesIO
 from werkzeug.datastructures import FileStorage
 from src.services.subir_data_service import SubirDataService
-from src.errors.errors import BadRequest
+from src.services.chunked_upload_service import ChunkedUploadService
+from src.services import chunked_upload_service
+from src.services.import_pipeline import en_segundo_plano
+from src.validators.data_validator import DataValidator
+from src.repositories.data_repository import DataRepository
+from src.repositories.upload_log_repository import UploadLogRepository
+from src.repositories.data_summary_repository import DataSummaryRepository
+from src.models.upload_log import UploadLog
+from src.errors.errors import BadRequest, NotFound, ServiceUnavailable
 from src.models.data import Data
+from src.database import db
+from sqlalchemy import inspect
 
 class TestSubirDataService:
     """Pruebas para el servicio de subida de datos"""
@@ -60,13 +71,14 @@ class TestSubirDataService:
     def test_leer_txt_success(self, service, app):
         """Test de lectura exitosa de archivo TXT"""
         with app.app_context():
+            app.config['UPLOAD_DEDUP'] = False
+            app.config['UPLOAD_REPLACE_STRATEGY'] = 'delete'
             file_content = """2023/10/15;08:00;12345678-9
 2023/10/15;17:30;12345678-9
 2023/10/16;08:15;87654321-0"""
             
             with patch('builtins.open', mock_open(read_data=file_content)), \
                  patch.object(service, '_limpiar_datos_previos') as mock_limpiar, \
-                 patch.object(service.data_repository, 'add') as mock_add, \
                  patch.object(service.validator, 'validate_line_format') as mock_validate:
                 
                 # Configurar mock del validador
@@ -80,26 +92,30 @@ class TestSubirDataService:
                 
                 # Verificaciones
                 mock_limpiar.assert_called_once()
-                assert mock_add.call_count == 3
+                assert Data.query.count() == 3
                 assert result['registros_procesados'] == 3
                 assert 'exitosamente' in result['mensaje']
+                assert result['registros_por_segundo'] >= 0
     
     def test_leer_txt_empty_file(self, service, app):
         """Test de lectura de archivo vacío"""
         with app.app_context():
+            app.config['UPLOAD_DEDUP'] = False
+            app.config['UPLOAD_REPLACE_STRATEGY'] = 'delete'
             with patch('builtins.open', mock_open(read_data="")), \
-                 patch.object(service, '_limpiar_datos_previos') as mock_limpiar, \
-                 patch.object(service.data_repository, 'add') as mock_add:
+                 patch.object(service, '_limpiar_datos_previos') as mock_limpiar:
                 
                 result = service.leer_txt('/fake/path/DATA.TXT')
                 
                 mock_limpiar.assert_called_once()
-                mock_add.assert_not_called()
+                assert Data.query.count() == 0
                 assert result['registros_procesados'] == 0
     
     def test_leer_txt_with_empty_lines(self, service, app):
         """Test de lectura de archivo con líneas vacías"""
         with app.app_context():
+            app.config['UPLOAD_DEDUP'] = False
+            app.config['UPLOAD_REPLACE_STRATEGY'] = 'delete'
             file_content = """2023/10/15;08:00;12345678-9
 
 2023/10/15;17:30;12345678-9
@@ -108,7 +124,6 @@ class TestSubirDataService:
             
             with patch('builtins.open', mock_open(read_data=file_content)), \
                  patch.object(service, '_limpiar_datos_previos'), \
-                 patch.object(service.data_repository, 'add') as mock_add, \
                  patch.object(service.validator, 'validate_line_format') as mock_validate:
                 
                 mock_validate.side_effect = [
@@ -120,12 +135,13 @@ class TestSubirDataService:
                 result = service.leer_txt('/fake/path/DATA.TXT')
                 
                 # Solo debe procesar 3 líneas (ignorando las vacías)
-                assert mock_add.call_count == 3
+                assert Data.query.count() == 3
                 assert result['registros_procesados'] == 3
     
     def test_leer_txt_validation_error(self, service, app):
         """Test de lectura con error de validación"""
         with app.app_context():
+            app.config['UPLOAD_DEDUP'] = False
             file_content = """2023/10/15;08:00;12345678-9
 invalid;line;format"""
             
@@ -158,12 +174,936 @@ invalid;line;format"""
                 assert 'Error procesando archivo' in str(exc_info.value)
                 mock_rollback.assert_called_once()
     
+    def test_leer_txt_batches(self, service, app, tmp_path):
+        """Test de inserción por lotes con commit por lote"""
+        path = tmp_path / 'DATA.TXT'
+        path.write_text("""2023/10/15;08:00;12345678-9
+2023/10/15;17:30;12345678-9
+2023/10/16;08:15;87654321-0""", encoding='utf-8')
+        
+        with app.app_context():
+            app.config['UPLOAD_DEDUP'] = False
+            app.config['UPLOAD_BATCH_SIZE'] = 2
+            app.config['UPLOAD_COMMIT_MODE'] = 'batch'
+            
+            with patch.object(DataRepository, '_insert_batch', wraps=DataRepository._insert_batch) as mock_batch:
+                
+                result = service.leer_txt(str(path))
+                
+                assert mock_batch.call_count == 2
+                assert result['registros_procesados'] == 3
+                assert Data.query.count() == 3
+    
+    def test_leer_txt_validation_error_keeps_previous_data(self, service, app, sample_data_records):
+        """Test de que un error de validación no deja la tabla vacía ni a medias"""
+        with app.app_context():
+            app.config['UPLOAD_DEDUP'] = False
+            for record in sample_data_records:
+                db.session.add(record)
+            db.session.commit()
+            
+            file_content = """2023/10/15;08:00;11111111-1
+2023/10/15;25:00;11111111-1"""
+            
+            with patch('builtins.open', mock_open(read_data=file_content)):
+                with pytest.raises(BadRequest):
+                    service.leer_txt('/fake/path/DATA.TXT')
+            
+            assert Data.query.count() == len(sample_data_records)
+            assert Data.query.filter_by(rut='11111111-1').count() == 0
+    
+    def test_leer_txt_swap_replaces_generation(self, service, app, sample_data_records):
+        """Test de reemplazo vía tabla de staging e intercambio atómico"""
+        with app.app_context():
+            app.config['UPLOAD_DEDUP'] = False
+            for record in sample_data_records:
+                db.session.add(record)
+            db.session.commit()
+            
+            file_content = """2023/10/20;08:00;11111111-1
+2023/10/20;17:00;11111111-1"""
+            
+            with patch('builtins.open', mock_open(read_data=file_content)), \
+                 patch.object(service, '_limpiar_datos_previos') as mock_limpiar:
+                result = service.leer_txt('/fake/path/DATA.TXT')
+            
+            mock_limpiar.assert_not_called()
+            assert result['registros_procesados'] == 2
+            assert Data.query.count() == 2
+            assert DataRepository.find_distinct_rut() == ['11111111-1']
+            
+            tablas = set(inspect(db.engine).get_table_names())
+            assert 'data_staging' not in tablas
+            assert 'data_old' not in tablas
+    
+    def test_leer_txt_swap_error_drops_staging(self, service, app, sample_data_records):
+        """Test de que un error descarta la tabla de staging sin tocar data"""
+        with app.app_context():
+            app.config['UPLOAD_DEDUP'] = False
+            for record in sample_data_records:
+                db.session.add(record)
+            db.session.commit()
+            
+            with patch('builtins.open', mock_open(read_data='2023/10/20;99:00;11111111-1')):
+                with pytest.raises(BadRequest):
+                    service.leer_txt('/fake/path/DATA.TXT')
+            
+            assert Data.query.count() == len(sample_data_records)
+            assert 'data_staging' not in inspect(db.engine).get_table_names()
+    
+    def test_leer_txt_diff_applies_only_changes(self, service, app, sample_data_records):
+        """Test del modo diff: solo inserta y elimina las diferencias"""
+        with app.app_context():
+            app.config['UPLOAD_DEDUP'] = False
+            for record in sample_data_records:
+                db.session.add(record)
+            db.session.commit()
+            ids_previos = {d.id for d in Data.query.filter_by(fecha='2023/10/15').all()}
+            
+            # Se mantiene el 15/10, se quita el 16/10 y se agrega el 17/10
+            file_content = """2023/10/15;08:00;12345678-9
+2023/10/15;17:30;12345678-9
+2023/10/15;08:15;87654321-0
+2023/10/15;17:45;87654321-0
+2023/10/17;08:00;11111111-1"""
+            
+            with patch('builtins.open', mock_open(read_data=file_content)):
+                result = service.leer_txt('/fake/path/DATA.TXT', modo='diff')
+            
+            assert result['registros_procesados'] == 5
+            assert result['registros_agregados'] == 1
+            assert result['registros_eliminados'] == 2
+            assert result['registros_sin_cambios'] == 4
+            assert Data.query.count() == 5
+            assert Data.query.filter_by(fecha='2023/10/16').count() == 0
+            # Las filas sin cambios no se reescriben
+            assert ids_previos <= {d.id for d in Data.query.all()}
+    
+    def test_leer_txt_replace_reports_skipped_duplicates(self, service, app):
+        """Test de que un reemplazo informa las marcaciones repetidas del archivo"""
+        file_content = """2023/10/15;08:00;12345678-9
+2023/10/15;08:00;12345678-9
+2023/10/15;17:30;12345678-9"""
+        
+        with app.app_context():
+            app.config['UPLOAD_DEDUP'] = False
+            for modo in ('replace', 'diff'):
+                with patch('builtins.open', mock_open(read_data=file_content)):
+                    result = service.leer_txt('/fake/path/DATA.TXT', modo=modo)
+                
+                assert result['registros_omitidos'] == 1
+                assert '1 registros repetidos omitidos' in result['mensaje']
+                assert Data.query.count() == 2
+    
+    def test_leer_txt_append_skips_existing(self, service, app, sample_data_records):
+        """Test del modo append: agrega solo marcaciones nuevas sin borrar datos"""
+        with app.app_context():
+            for record in sample_data_records:
+                db.session.add(record)
+            db.session.commit()
+            
+            # Una marcación ya existe y otra viene repetida en el archivo
+            file_content = """2023/10/15;08:00;12345678-9
+2023/10/17;08:00;11111111-1
+2023/10/17;08:00;11111111-1
+2023/10/17;17:00;11111111-1"""
+            
+            with patch('builtins.open', mock_open(read_data=file_content)):
+                result = service.leer_txt('/fake/path/DATA.TXT', modo='append')
+            
+            assert result['registros_procesados'] == 4
+            assert result['registros_agregados'] == 2
+            assert result['registros_omitidos'] == 2
+            assert Data.query.count() == len(sample_data_records) + 2
+            # El hash de una carga parcial no se registra como generación
+            assert db.session.get(UploadLog, result['upload_id']).file_hash is None
+    
+    def test_leer_txt_load_data_backend(self, service, app, tmp_path):
+        """Test del backend LOAD DATA: recibe un archivo con las filas ya validadas"""
+        path = tmp_path / 'DATA.TXT'
+        path.write_text("2023/10/15;08:00;12345678-9\n\n2023/10/15;17:30;12345678-9\n", encoding='utf-8')
+        cargado = {}
+        
+        def _load_data(spool, table=None):
+            with open(spool, encoding='utf-8') as file:
+                cargado['contenido'] = file.read()
+            return 2
+        
+        with app.app_context():
+            app.config['UPLOAD_BACKEND'] = 'load_data'
+            
+            with patch.object(DataRepository, 'supports_load_data', return_value=True), \
+                 patch.object(DataRepository, 'load_data', side_effect=_load_data):
+                result = service.leer_txt(str(path))
+            
+            assert result['backend'] == 'load_data'
+            assert result['registros_procesados'] == 2
+            assert cargado['contenido'] == '2023/10/15\t08:00\t12345678-9\n2023/10/15\t17:30\t12345678-9\n'
+    
+    def test_leer_txt_load_data_fallback(self, service, app, tmp_path):
+        """Test de vuelta a insert por lotes cuando LOAD DATA falla o no está disponible"""
+        path = tmp_path / 'DATA.TXT'
+        path.write_text("2023/10/15;08:00;12345678-9\n2023/10/15;17:30;12345678-9\n", encoding='utf-8')
+        
+        with app.app_context():
+            app.config['UPLOAD_BACKEND'] = 'load_data'
+            
+            # SQLite no soporta LOAD DATA
+            result = service.leer_txt(str(path), forzar=True)
+            assert result['backend'] == 'insert'
+            
+            with patch.object(DataRepository, 'supports_load_data', return_value=True), \
+                 patch.object(DataRepository, 'load_data', side_effect=Exception('Loading local data is disabled')):
+                result = service.leer_txt(str(path), forzar=True)
+            
+            assert result['backend'] == 'insert'
+            assert result['registros_procesados'] == 2
+            assert Data.query.count() == 2
+    
+    def test_leer_txt_months_mode(self, service, app, tmp_path):
+        """Test del modo months: reemplaza solo los meses presentes en el archivo"""
+        with app.app_context():
+            DataRepository.bulk_insert([
+                ('2023/09/15', '08:00', '12345678-9'),
+                ('2023/10/15', '08:00', '12345678-9'),
+                ('2023/10/16', '08:00', '12345678-9')
+            ])
+            DataRepository.commit()
+            
+            path = tmp_path / 'DATA.TXT'
+            path.write_text('2023/10/20;08:00;12345678-9\n2023/11/02;09:00;87654321-0\n', encoding='utf-8')
+            
+            result = service.leer_txt(str(path), modo='months')
+            
+            assert result['meses'] == ['2023/10', '2023/11']
+            assert result['registros_agregados'] == 2
+            assert result['registros_eliminados'] == 2
+            assert DataRepository.get_all_dates() == ['2023/09/15', '2023/10/20', '2023/11/02']
+            assert not DataRepository.staging_exists()
+            
+            # No participa en la detección de archivos sin cambios
+            assert UploadLogRepository.find_by_id(result['upload_id']).file_hash is None
+            assert not service.leer_txt(str(path), modo='months').get('sin_cambios')
+    
+    def test_purgar_mes(self, service, app):
+        """Test de eliminación de un mes completo"""
+        with app.app_context():
+            DataRepository.bulk_insert([('2023/10/15', '08:00', '1-9'), ('2023/11/15', '08:00', '1-9')])
+            DataRepository.commit()
+            
+            assert service.purgar_mes('2023-10') == {'mes': '2023/10', 'registros_eliminados': 1}
+            assert DataRepository.get_all_dates() == ['2023/11/15']
+            
+            for invalido in ('2023-13', '23-10', '2023', 'octubre'):
+                with pytest.raises(BadRequest):
+                    service.purgar_mes(invalido)
+    
+    def test_leer_stream_keeps_request_entity_too_large(self, service, app):
+        """Test de que un 413 al leer el cuerpo en streaming no se convierte en 400"""
+        from werkzeug.exceptions import RequestEntityTooLarge
+        
+        cuerpo = (
+            b'--limite\r\nContent-Disposition: form-data; name="file"; filename="DATA.TXT"\r\n\r\n'
+            + b'2023/10/15;08:00;12345678-9\n' * 10
+        )
+        
+        class _Limitado:
+            """Cuerpo sin Content-Length: werkzeug corta la lectura al pasar el límite"""
+            def __init__(self):
+                self.stream = BytesIO(cuerpo)
+            
+            def read(self, size=-1):
+                datos = self.stream.read(size)
+                if not datos:
+                    raise RequestEntityTooLarge()
+                return datos
+        
+        with app.app_context():
+            with pytest.raises(RequestEntityTooLarge):
+                service.leer_stream(_Limitado(), 'multipart/form-data; boundary=limite')
+            
+            log = UploadLogRepository.find_recent(limit=1)[0]
+            assert log.status == 'error'
+            assert Data.query.count() == 0
+    
+    def test_purgar_mes_then_reupload_reloads(self, service, app, tmp_path):
+        """Test de que después de purgar un mes, subir el mismo archivo lo vuelve a cargar"""
+        with app.app_context():
+            path = tmp_path / 'DATA.TXT'
+            path.write_text('2023/10/15;08:00;12345678-9\n2023/11/01;08:00;12345678-9\n2023/11/02;08:00;12345678-9\n')
+            service.leer_txt(str(path))
+            
+            SubirDataService().purgar_mes('2023-11')
+            assert Data.query.count() == 1
+            
+            resultado = SubirDataService().leer_txt(str(path))
+            assert not resultado.get('sin_cambios')
+            assert Data.query.count() == 3
+            # La nueva carga vuelve a ser la base de la deduplicación
+            assert SubirDataService().leer_txt(str(path))['sin_cambios'] is True
+    
+    def test_leer_txt_invalid_mode(self, service, app):
+        """Test de modo de carga inválido"""
+        with app.app_context():
+            with pytest.raises(BadRequest) as exc_info:
+                service.leer_txt('/fake/path/DATA.TXT', modo='merge')
+            
+            assert 'Modo de carga inválido' in str(exc_info.value)
+    
+    def test_leer_txt_parallel(self, service, app, tmp_path):
+        """Test de validación en paralelo por rangos de bytes"""
+        with app.app_context():
+            app.config['UPLOAD_PARSE_WORKERS'] = 2
+            app.config['UPLOAD_PARSE_RANGE_SIZE'] = 64
+            
+            lines = [f'2023/10/{dia:02d};08:00;{dia}-9' for dia in range(1, 31)]
+            path = tmp_path / 'DATA.TXT'
+            path.write_text('\n'.join(lines[:10]) + '\n\n' + '\r\n'.join(lines[10:]), encoding='utf-8')
+            
+            result = service.leer_txt(str(path))
+            
+            assert result['registros_procesados'] == 30
+            assert [d.fecha for d in DataRepository.find_all()] == [line[:10] for line in lines]
+    
+    def test_leer_txt_parallel_error_line_number(self, service, app, tmp_path):
+        """Test de que el número de línea del primer error es el absoluto del archivo"""
+        with app.app_context():
+            app.config['UPLOAD_PARSE_WORKERS'] = 3
+            app.config['UPLOAD_PARSE_RANGE_SIZE'] = 50
+            
+            lines = [f'2023/10/{dia:02d};08:00;{dia}-9' for dia in range(1, 31)]
+            lines[22] = '2023/10/23;08:00'
+            lines[27] = '2023/10/28;08:00'
+            path = tmp_path / 'DATA.TXT'
+            path.write_text('\n'.join(lines), encoding='utf-8')
+            
+            with pytest.raises(BadRequest) as exc_info:
+                service.leer_txt(str(path))
+            
+            assert 'Línea 23 mal formateada' in exc_info.value.description
+            assert Data.query.count() == 0
+    
+    def test_parsear_mmap_matches_text_mode(self, tmp_path):
+        """Test de que el lector mmap entrega lo mismo que la lectura en modo texto"""
+        from src.services.mmap_parser import parsear_mmap
+        contenido = (
+            b"2023/10/15;08:00;12345678-9\r\n"
+            b"\n"
+            b"  2024/02/29;17:30;1-K \t\r"
+            b"\xc2\xa02023/10/15;08:15;87654321-0\xc2\xa0\n"
+            b"2023/10/15;08:00;12345678-9"
+        )
+        path = tmp_path / 'DATA.TXT'
+        path.write_bytes(contenido)
+        
+        with open(path, 'r', encoding='utf-8') as file:
+            esperado = [DataValidator.validate_line_format(line.strip(), n) for n, line in enumerate(file, 1) if line.strip()]
+        
+        lecturas = []
+        filas = list(parsear_mmap(str(path), lambda lineas, posicion: lecturas.append((lineas, posicion)), cada=2))
+        
+        assert filas == esperado
+        assert filas[1] == ('2024/02/29', '17:30', '1-K')
+        assert lecturas == [(2, 29), (4, 55), (5, len(contenido))]
+    
+    @pytest.mark.parametrize('linea,error', [
+        ('2023/02/29;08:00;12345678-9', 'Fecha inválida: 2023/02/29'),
+        ('2023/10/15;24:00;12345678-9', 'Hora inválida: 24:00'),
+        ('2023/10/15;08:00', 'Línea 3 mal formateada')
+    ])
+    def test_leer_txt_mmap_errors(self, service, app, tmp_path, linea, error):
+        """Test de carga con UPLOAD_PARSER = 'mmap': mismos errores que en modo texto"""
+        with app.app_context():
+            app.config['UPLOAD_PARSER'] = 'mmap'
+            path = tmp_path / 'DATA.TXT'
+            path.write_text(f'2023/10/15;08:00;12345678-9\n2023/10/15;17:30;12345678-9\n{linea}\n', encoding='utf-8')
+            
+            with pytest.raises(BadRequest) as exc_info:
+                service.leer_txt(str(path))
+            assert error in exc_info.value.description
+            assert Data.query.count() == 0
+            
+            path.write_text('2023/10/15;08:00;12345678-9\n\n2023/10/15;17:30;12345678-9', encoding='utf-8')
+            assert service.leer_txt(str(path))['registros_procesados'] == 2
+            
+            path.write_bytes(b'')
+            assert service.leer_txt(str(path))['registros_procesados'] == 0
+    
+    @pytest.mark.parametrize('extension,codec', [
+        ('gz', 'gzip'), ('bz2', 'bz2'), ('xz', 'lzma')
+    ])
+    def test_leer_txt_compressed(self, service, app, tmp_path, extension, codec):
+        """Test de lectura de DATA.TXT comprimido, descomprimido al vuelo"""
+        import importlib
+        contenido = b"2023/10/15;08:00;12345678-9\n2023/10/15;17:30;12345678-9\n"
+        path = tmp_path / f'DATA.TXT.{extension}'
+        path.write_bytes(importlib.import_module(codec).compress(contenido))
+        
+        with app.app_context():
+            result = service.leer_txt(str(path))
+            
+            assert result['registros_procesados'] == 2
+            assert Data.query.count() == 2
+    
+    def test_leer_txt_compressed_size_guard(self, service, app, tmp_path):
+        """Test del límite de tamaño descomprimido"""
+        import gzip
+        path = tmp_path / 'DATA.TXT.gz'
+        path.write_bytes(gzip.compress(b"2023/10/15;08:00;12345678-9\n" * 1000))
+        
+        with app.app_context():
+            app.config['UPLOAD_MAX_DECOMPRESSED_SIZE'] = 1024
+            
+            with pytest.raises(BadRequest) as exc_info:
+                service.leer_txt(str(path))
+            
+            assert 'descomprimido supera' in str(exc_info.value.description)
+            assert Data.query.count() == 0
+    
+    def test_leer_txt_compressed_corrupt(self, service, app, tmp_path):
+        """Test de archivo comprimido dañado"""
+        path = tmp_path / 'DATA.TXT.gz'
+        path.write_bytes(b'no es gzip')
+        
+        with app.app_context():
+            with pytest.raises(BadRequest) as exc_info:
+                service.leer_txt(str(path))
+            
+            assert 'Archivo comprimido inválido' in str(exc_info.value.description)
+    
+    def test_open_text_preserves_line_numbers(self):
+        """Test de que el stream por trozos separa líneas igual que open() en modo texto"""
+        from src.services.upload_stream import ChunkStream, open_text
+        
+        chunks = [b'2023/10/15;08:', b'00;1-9\r\n\n2023/10/', b'15;17:30;1-9', b'\n']
+        tee = BytesIO()
+        hasher = hashlib.sha256()
+        raw = ChunkStream(chunks, tee=tee, hasher=hasher)
+        
+        lines = list(open_text(raw))
+        
+        assert lines == ['2023/10/15;08:00;1-9\n', '\n', '2023/10/15;17:30;1-9\n']
+        assert tee.getvalue() == b''.join(chunks)
+        assert hasher.hexdigest() == hashlib.sha256(b''.join(chunks)).hexdigest()
+        assert raw.size == len(b''.join(chunks))
+    
+    def test_leer_txt_batch_checkpoints(self, service, app, tmp_path):
+        """Test de checkpoint por lote registrado en upload_logs"""
+        contenido = b"2023/10/15;08:00;12345678-9\r\n\r\n2023/10/15;17:30;12345678-9\r\n2023/10/16;08:15;87654321-0"
+        path = tmp_path / 'DATA.TXT'
+        path.write_bytes(contenido)
+        
+        with app.app_context():
+            app.config['UPLOAD_BATCH_SIZE'] = 2
+            app.config['UPLOAD_COMMIT_MODE'] = 'batch'
+            
+            result = service.leer_txt(str(path))
+            
+            log = UploadLogRepository.find_by_id(result['upload_id'])
+            assert log.status == 'success'
+            assert log.checkpoint_offset == len(contenido)
+            assert log.checkpoint_line == 4
+            assert log.checkpoint_rows == 3
+            assert result['registros_omitidos'] == 0
+            assert Data.query.count() == 3
+            
+            # Una línea repetida en otro lote se omite y se informa
+            path.write_bytes(contenido + b"\n2023/10/15;08:00;12345678-9")
+            result = service.leer_txt(str(path))
+            assert result['registros_procesados'] == 3
+            assert result['registros_omitidos'] == 1
+    
+    def test_leer_txt_resume_from_checkpoint(self, service, app, tmp_path):
+        """Test de carga interrumpida que se retoma desde el último lote confirmado"""
+        lineas = [f'2023/10/{d:02d};08:00;12345678-9' for d in range(1, 6)]
+        path = tmp_path / 'DATA.TXT'
+        path.write_text('\n'.join(lineas), encoding='utf-8')
+        
+        with app.app_context():
+            app.config['UPLOAD_BATCH_SIZE'] = 2
+            app.config['UPLOAD_COMMIT_MODE'] = 'batch'
+            checkpoint = UploadLogRepository.checkpoint
+            llamadas = []
+            
+            def _caida(*args):
+                llamadas.append(args)
+                if len(llamadas) == 3:
+                    # El proceso muere antes de confirmar el segundo lote
+                    raise SystemExit()
+                checkpoint(*args)
+            
+            with patch.object(UploadLogRepository, 'checkpoint', side_effect=_caida):
+                with pytest.raises(SystemExit):
+                    service.leer_txt(str(path))
+            db.session.rollback()
+            
+            log = UploadLog.query.one()
+            assert log.status == 'running'
+            assert (log.checkpoint_line, log.checkpoint_rows) == (2, 2)
+            assert log.checkpoint_offset == len(lineas[0]) + len(lineas[1]) + 2
+            
+            with patch.object(service.validator, 'validate_line_format',
+                              wraps=service.validator.validate_line_format) as mock_validar:
+                result = service.leer_txt(str(path), log_id=log.id, reanudar=True)
+            
+            # Solo se leen las líneas posteriores al checkpoint
+            assert [c.args[1] for c in mock_validar.call_args_list] == [3, 4, 5]
+            assert result['registros_procesados'] == 5
+            assert Data.query.count() == 5
+            assert UploadLogRepository.find_by_id(log.id).status == 'success'
+    
+    def _interrumpir(self, service, path):
+        """Carga por lotes que se cae antes de confirmar el segundo lote; retorna su registro"""
+        checkpoint = UploadLogRepository.checkpoint
+        llamadas = []
+        
+        def _caida(*args):
+            llamadas.append(args)
+            if len(llamadas) == 3:
+                raise SystemExit()
+            checkpoint(*args)
+        
+        with patch.object(UploadLogRepository, 'checkpoint', side_effect=_caida):
+            with pytest.raises(SystemExit):
+                service.leer_txt(str(path))
+        db.session.rollback()
+        return UploadLog.query.one()
+    
+    def test_leer_txt_resume_rejects_changed_file(self, app, tmp_path):
+        """Test de que una carga no se retoma si el archivo cambió desde que empezó"""
+        path = tmp_path / 'DATA.TXT'
+        path.write_text('\n'.join(f'2023/10/{d:02d};08:00;12345678-9' for d in range(1, 6)), encoding='utf-8')
+        
+        with app.app_context():
+            app.config['UPLOAD_BATCH_SIZE'] = 2
+            app.config['UPLOAD_COMMIT_MODE'] = 'batch'
+            log = self._interrumpir(SubirDataService(), path)
+            assert log.source_hash == hashlib.sha256(path.read_bytes()).hexdigest()
+            
+            # Otra subida reemplazó el archivo en el mismo path
+            path.write_text('2023/11/01;08:00;87654321-0\n2023/11/02;08:00;87654321-0', encoding='utf-8')
+            with pytest.raises(BadRequest) as exc_info:
+                SubirDataService().leer_txt(str(path), log_id=log.id, reanudar=True)
+            
+            assert 'el archivo cambió' in str(exc_info.value.description)
+            assert UploadLogRepository.find_by_id(log.id, refresh=True).status == 'error'
+            assert Data.query.count() == 0
+    
+    def test_staging_kept_while_checkpointed_load_pending(self, app, tmp_path):
+        """Test de que otras cargas no reemplazan la data_staging de una carga por retomar"""
+        path = tmp_path / 'DATA.TXT'
+        path.write_text('\n'.join(f'2023/10/{d:02d};08:00;12345678-9' for d in range(1, 6)), encoding='utf-8')
+        otro = tmp_path / 'OTRO.TXT'
+        otro.write_text('2023/11/01;08:00;87654321-0', encoding='utf-8')
+        
+        with app.app_context():
+            app.config['UPLOAD_BATCH_SIZE'] = 2
+            app.config['UPLOAD_COMMIT_MODE'] = 'batch'
+            log = self._interrumpir(SubirDataService(), path)
+            
+            app.config['UPLOAD_COMMIT_MODE'] = 'file'
+            for modo in ('replace', 'months'):
+                with pytest.raises(ServiceUnavailable):
+                    SubirDataService().leer_txt(str(otro), modo=modo)
+            
+            # Los lotes confirmados siguen en staging y la carga se retoma
+            assert DataRepository.staging_exists()
+            result = SubirDataService().leer_txt(str(path), log_id=log.id, reanudar=True)
+            assert result['registros_procesados'] == 5
+            assert SubirDataService().leer_txt(str(otro))['registros_procesados'] == 1
+    
+    def test_leer_txt_reports_lines_and_bytes(self, service, app, tmp_path):
+        """Test de progreso: líneas leídas, bytes, registros y ETA informados a un ProgresoCarga"""
+        from src.services.upload_progress import ProgresoCarga
+        contenido = "\n".join(f"2023/10/15;08:{m:02d};12345678-9" for m in range(25)) + "\n"
+        path = tmp_path / "DATA.TXT"
+        path.write_text(contenido, encoding='utf-8')
+        
+        with app.app_context():
+            app.config['UPLOAD_PROGRESS_EVERY_LINES'] = 10
+            app.config['UPLOAD_BATCH_SIZE'] = 10
+            progreso = ProgresoCarga(total_bytes=len(contenido))
+            
+            lecturas = []
+            original = progreso.lineas
+            progreso.lineas = lambda lineas, posicion=None: (lecturas.append(lineas), original(lineas, posicion))
+            
+            service.leer_txt(str(path), progreso=progreso)
+        
+        assert lecturas == [10, 20, 25]
+        resumen = progreso.resumen()
+        assert resumen['lines_parsed'] == 25
+        assert resumen['records_processed'] == 25
+        assert resumen['bytes_read'] == len(contenido)
+        assert resumen['percent'] == 100.0
+        assert resumen['eta_seconds'] == 0
+    
+    def test_progreso_carga_eta_and_wait(self):
+        """Test del cálculo de porcentaje/ETA y de la espera de cambios de ProgresoCarga"""
+        from src.services.upload_progress import ProgresoCarga
+        progreso = ProgresoCarga(total_bytes=1000)
+        progreso.iniciar()
+        progreso.inicio -= 10
+        progreso.lineas(40, 250)
+        progreso(30)
+        
+        resumen = progreso.resumen()
+        assert resumen['percent'] == 25.0
+        assert resumen['eta_seconds'] == pytest.approx(30, abs=0.5)
+        assert resumen['records_per_second'] == pytest.approx(3, abs=0.1)
+        
+        version = progreso.esperar(None, timeout=0)
+        assert progreso.esperar(version, timeout=0.01) == version
+        progreso.terminar()
+        assert progreso.esperar(version, timeout=0) == version + 1
+    
+    def test_reporte_validacion_collects_all_errors(self, service, app):
+        """Test del reporte de validación: todas las líneas inválidas, hasta el máximo"""
+        from src.services.upload_stream import ChunkStream, open_text
+        contenido = (
+            b"2023/10/15;08:00;12345678-9\n"
+            b"2023/10/15;25:00;12345678-9\n"
+            b"\n"
+            b"2023/13/15;08:00;12345678-9\n"
+            b"2023/10/15;08:00\n"
+            b"2023/10/15;08:00;\xff\xfe-9\n"
+        )
+        
+        with app.app_context():
+            with open_text(ChunkStream([contenido]), errors='replace') as file:
+                reporte = service._reporte_validacion(file, max_errores=3)
+        
+        assert reporte['valido'] is False
+        assert reporte['lineas_leidas'] == 6
+        assert reporte['registros_validos'] == 1
+        assert reporte['total_errores'] == 4
+        assert reporte['truncado'] is True
+        assert [e['linea'] for e in reporte['errores']] == [2, 4, 5]
+        assert 'Hora inválida' in reporte['errores'][0]['error']
+        assert 'Línea 5 mal formateada' in reporte['errores'][2]['error']
+    
+    def test_leer_txt_same_hash_skips_reload(self, service, app, tmp_path):
+        """Test de que un archivo idéntico a la carga actual no se recarga"""
+        with app.app_context():
+            path = tmp_path / 'DATA.TXT'
+            path.write_text('2023/10/15;08:00;12345678-9\n2023/10/15;17:30;12345678-9\n')
+            
+            primero = service.leer_txt(str(path))
+            assert primero['registros_procesados'] == 2
+            
+            with patch.object(service, '_importar') as mock_importar:
+                segundo = service.leer_txt(str(path))
+            
+            mock_importar.assert_not_called()
+            assert segundo['sin_cambios'] is True
+            assert Data.query.count() == 2
+            
+            log = UploadLogRepository.find_by_id(segundo['upload_id'])
+            assert log.status == 'success'
+            assert log.file_hash == hashlib.sha256(path.read_bytes()).hexdigest()
+            
+            # forzar recarga aunque el hash coincida
+            tercero = service.leer_txt(str(path), forzar=True)
+            assert tercero['registros_procesados'] == 2
+            assert 'sin_cambios' not in tercero
+    
+    def test_leer_txt_records_error_in_upload_logs(self, service, app, tmp_path):
+        """Test de que una carga fallida queda registrada con su error"""
+        with app.app_context():
+            path = tmp_path / 'DATA.TXT'
+            path.write_text('2023/10/15;08:00\n')
+            
+            with pytest.raises(BadRequest):
+                service.leer_txt(str(path))
+            
+            log = UploadLogRepository.find_current()
+            assert log is None
+            log = UploadLog.query.one()
+            assert log.status == 'error'
+            assert 'Línea 1 mal formateada' in log.error_message
+    
+    @pytest.mark.parametrize('pipeline', [True, False])
+    def test_leer_txt_records_timings(self, service, app, tmp_path, pipeline):
+        """Test de que la carga registra en upload_logs las líneas leídas y el tiempo por fase"""
+        app.config['UPLOAD_PIPELINE'] = pipeline
+        try:
+            with app.app_context():
+                path = tmp_path / 'DATA.TXT'
+                path.write_text('2023/10/15;08:00;12345678-9\n\n2023/10/15;17:30;12345678-9\n')
+                
+                resultado = service.leer_txt(str(path))
+                
+                assert resultado['lineas_leidas'] == 3
+                assert resultado['tiempos']['total'] >= resultado['tiempos']['insert']
+                log = UploadLogRepository.find_by_id(resultado['upload_id'])
+                assert log.lines_read == 3
+                for columna in ('hash_seconds', 'parse_seconds', 'insert_seconds', 'commit_seconds', 'total_seconds'):
+                    assert getattr(log, columna) >= 0
+                assert log.save_seconds is None
+                assert (log.wait_seconds is not None) == pipeline
+        finally:
+            app.config['UPLOAD_PIPELINE'] = True
+    
+    def test_metricas_carga_escritura_descuenta_lectura(self):
+        """Test de que insert no incluye el tiempo de obtener las filas ni los commits"""
+        from src.services.upload_metrics import MetricasCarga
+        metricas = MetricasCarga()
+        
+        with metricas.escritura('parse', 'commit'):
+            for _ in metricas.cronometrar(range(3), 'parse', cada=2):
+                pass
+            metricas.sumar('commit', 100)
+        
+        resumen = metricas.resumen()
+        assert resumen['commit_seconds'] == 100
+        assert resumen['insert_seconds'] < 1
+        assert resumen['save_seconds'] is None
+    
+    def test_obtener_historial_cargas(self, service, app, tmp_path):
+        """Test del historial de cargas: más recientes primero, filtro por estado y validaciones"""
+        with app.app_context():
+            path = tmp_path / 'DATA.TXT'
+            path.write_text('2023/10/15;08:00;12345678-9\n')
+            service.leer_txt(str(path))
+            path.write_text('2023/10/15;08:00\n')
+            with pytest.raises(BadRequest):
+                SubirDataService().leer_txt(str(path))
+            
+            historial = service.obtener_historial_cargas()
+            assert historial['total'] == 2
+            assert [u['status'] for u in historial['uploads']] == ['error', 'success']
+            assert historial['uploads'][0]['timings']['parse'] is not None
+            
+            errores = service.obtener_historial_cargas(status='error')
+            assert errores['total'] == 1
+            
+            with pytest.raises(BadRequest):
+                service.obtener_historial_cargas(limite=0)
+            with pytest.raises(BadRequest):
+                service.obtener_historial_cargas(status='otro')
+    
     def test_limpiar_datos_previos(self, service):
         """Test de limpieza de datos previos"""
         with patch.object(service.data_repository, 'delete_all') as mock_delete:
             service._limpiar_datos_previos()
             mock_delete.assert_called_once()
     
+    def test_obtener_pagina_datos_keyset(self, service, app):
+        """Test de la paginación por cursor: recorre todo sin repetir ni saltar filas"""
+        with app.app_context():
+            filas = [
+                ('2023/10/15', '08:00', '12345678-9'),
+                ('2023/10/15', '08:00', '98765432-1'),
+                ('2023/10/15', '17:30', '12345678-9'),
+                ('2023/10/16', '08:00', '12345678-9'),
+                ('2023/10/16', '09:00', '98765432-1')
+            ]
+            DataRepository.bulk_insert(reversed(filas))
+            DataRepository.commit()
+            
+            vistas = []
+            cursor = None
+            while True:
+                pagina = service.obtener_pagina_datos(limite=2, cursor=cursor)
+                vistas.extend((d['fecha'], d['hora'], d['rut']) for d in pagina['data'])
+                if not pagina['has_more']:
+                    assert pagina['next_cursor'] is None
+                    break
+                cursor = pagina['next_cursor']
+            
+            assert vistas[0] == ('2023/10/15', '08:00', vistas[0][2])
+            assert sorted(vistas) == sorted(filas)
+            assert [v[:2] for v in vistas] == sorted(v[:2] for v in filas)
+            
+            filtrada = service.obtener_pagina_datos(
+                rut='98765432-1', fecha_desde='2023/10/16', hora_desde='08:30', hora_hasta='23:59'
+            )
+            assert [(d['fecha'], d['hora']) for d in filtrada['data']] == [('2023/10/16', '09:00')]
+            
+            with pytest.raises(BadRequest, match='Cursor inválido'):
+                service.obtener_pagina_datos(cursor='no-es-un-cursor')
+            with pytest.raises(BadRequest, match='limit'):
+                service.obtener_pagina_datos(limite=0)
+    
+    def test_exportar_datos_formats(self, service, app):
+        """Test de la exportación en NDJSON, CSV y gzip, leyendo el cursor por lotes"""
+        import gzip
+        import json
+        app.config['DATA_EXPORT_BATCH_SIZE'] = 2
+        try:
+            with app.app_context():
+                filas = [
+                    ('2023/10/15', '08:00', '12345678-9'),
+                    ('2023/10/15', '17:30', '12345678-9'),
+                    ('2023/10/16', '08:00', '1234567-K')
+                ]
+                DataRepository.bulk_insert(filas)
+                DataRepository.commit()
+                
+                trozos = list(service.exportar_datos('ndjson'))
+                assert len(trozos) == 2
+                registros = [json.loads(linea) for linea in b''.join(trozos).splitlines()]
+                assert [(r['fecha'], r['hora'], r['rut']) for r in registros] == filas
+                
+                csv = b''.join(service.exportar_datos('csv', rut='1234567-K')).decode('utf-8').splitlines()
+                assert csv[0] == 'id,fecha,hora,rut'
+                assert csv[1].endswith(',2023/10/16,08:00,1234567-K')
+                assert len(csv) == 2
+                
+                comprimido = b''.join(service.exportar_datos('csv', comprimir=True))
+                assert gzip.decompress(comprimido).decode('utf-8').count('\n') == 4
+                
+                with pytest.raises(BadRequest, match='Formato inválido'):
+                    service.exportar_datos('xml')
+                with pytest.raises(BadRequest, match='Fecha inválida'):
+                    service.exportar_datos('csv', fecha_desde='15-10-2023')
+        finally:
+            app.config['DATA_EXPORT_BATCH_SIZE'] = 2000
+    
+    def test_leer_txt_builds_summary_while_importing(self, service, app, tmp_path):
+        """Test del resumen de la generación: contado al importar, sin consultas agregadas"""
+        with app.app_context():
+            path = tmp_path / 'DATA.TXT'
+            path.write_text(
+                '2023/10/15;08:00;12345678-9\n2023/10/15;17:30;12345678-9\n2023/10/16;08:00;1234567-K\n'
+            )
+            
+            with patch.object(service, '_resumen_de_tabla') as mock_tabla:
+                resultado = service.leer_txt(str(path))
+            mock_tabla.assert_not_called()
+            
+            resumen = DataSummaryRepository.find_latest()
+            assert resumen.upload_log_id == resultado['upload_id']
+            assert (resumen.total_records, resumen.total_employees) == (3, 2)
+            assert (resumen.fecha_min, resumen.fecha_max) == ('2023/10/15', '2023/10/16')
+            assert resumen.records_per_day == {'2023/10/15': 2, '2023/10/16': 1}
+            assert resumen.records_per_rut == {'1234567-K': 1, '12345678-9': 2}
+            
+            # Las lecturas usan el resumen, no la tabla
+            with patch.object(service.data_repository, 'aggregate_stats') as mock_stats, \
+                 patch.object(service.data_repository, 'find_distinct_rut') as mock_ruts:
+                stats = service.obtener_estadisticas()
+                assert service.obtener_ruts_distintos() == ['1234567-K', '12345678-9']
+            mock_stats.assert_not_called()
+            mock_ruts.assert_not_called()
+            assert stats['total_records'] == 3
+            assert stats['date_range'] == {'earliest': '2023/10/15', 'latest': '2023/10/16'}
+    
+    def test_compact_storage_normalizes_ruts_before_counting(self, service, app, tmp_path):
+        """Test de que con almacenamiento compacto el resumen y la clave única ven el RUT canónico"""
+        with app.app_context(), patch('src.services.subir_data_service.ALMACENAMIENTO_COMPACTO', True):
+            path = tmp_path / 'DATA.TXT'
+            path.write_text('2023/10/15;08:00;01234567-k\n2023/10/15;08:00;1234567-K\n2023/10/15;09:00;12345678-9\n')
+            service.leer_txt(str(path))
+            
+            assert sorted(d.rut for d in Data.query.all()) == ['1234567-K', '12345678-9']
+            resumen = DataSummaryRepository.find_latest()
+            assert resumen.total_records == 2
+            assert resumen.records_per_rut == {'1234567-K': 1, '12345678-9': 1}
+            assert service.obtener_ruts_distintos() == ['1234567-K', '12345678-9']
+    
+    def test_summary_recomputed_when_not_exact(self, service, app, tmp_path):
+        """Test del resumen calculado sobre data: líneas repetidas, append y mes purgado"""
+        with app.app_context():
+            path = tmp_path / 'DATA.TXT'
+            path.write_text('2023/10/15;08:00;12345678-9\n2023/10/15;08:00;12345678-9\n2023/11/01;08:00;12345678-9\n')
+            service.leer_txt(str(path))
+            assert DataSummaryRepository.find_latest().total_records == 2
+            
+            path.write_text('2023/10/16;08:00;98765432-1\n')
+            SubirDataService().leer_txt(str(path), modo='append')
+            resumen = DataSummaryRepository.find_latest()
+            assert (resumen.total_records, resumen.total_employees) == (3, 2)
+            
+            SubirDataService().purgar_mes('2023-10')
+            resumen = DataSummaryRepository.find_latest()
+            assert resumen.total_records == 1
+            assert resumen.records_per_day == {'2023/11/01': 1}
+    
+    def test_generation_bumped_only_when_data_changes(self, service, app, tmp_path):
+        """Test de la generación de los datos: aumenta con cargas y purgas que cambian data"""
+        with app.app_context():
+            assert service.obtener_generacion() == (0, None)
+            
+            path = tmp_path / 'DATA.TXT'
+            path.write_text('2023/10/15;08:00;12345678-9\n2023/11/01;08:00;12345678-9\n')
+            service.leer_txt(str(path))
+            numero, modificado = service.obtener_generacion()
+            assert numero == 1 and modificado is not None
+            
+            # Archivo idéntico (sin cambios) y mes sin registros: la generación se mantiene
+            assert SubirDataService().leer_txt(str(path))['sin_cambios'] is True
+            SubirDataService().purgar_mes('2024-01')
+            assert service.obtener_generacion()[0] == 1
+            
+            SubirDataService().purgar_mes('2023-10')
+            assert service.obtener_generacion()[0] == 2
+            
+            # Dentro del TTL la generación se lee de memoria, sin consultar la BD
+            with patch('src.services.data_generation.DataGenerationRepository.find') as mock_find:
+                assert service.obtener_generacion()[0] == 2
+            mock_find.assert_not_called()
+    
+    def test_failed_load_with_committed_batches_bumps_generation(self, service, app, tmp_path):
+        """Test de que una carga que falla después de confirmar lotes en data cambia la generación"""
+        import gzip
+        with app.app_context():
+            path = tmp_path / 'DATA.TXT'
+            path.write_text('2023/10/15;08:00;12345678-9\n')
+            service.leer_txt(str(path))
+            assert service.obtener_generacion()[0] == 1
+            
+            app.config['UPLOAD_COMMIT_MODE'] = 'batch'
+            app.config['UPLOAD_BATCH_SIZE'] = 1000
+            # Las líneas se leen por tramos de 5000: la inválida va después del primer tramo
+            malo = ''.join(f'2023/10/16;08:00;{i}-9\n' for i in range(1, 5001)) + 'linea invalida\n'
+            
+            # append: los lotes se confirman directamente sobre data
+            path.write_text(malo)
+            with pytest.raises(BadRequest):
+                SubirDataService().leer_txt(str(path), modo='append')
+            assert Data.query.count() == 5001
+            assert service.obtener_generacion()[0] == 2
+            
+            # Reemplazo 'delete' de un archivo comprimido (sin checkpoints): limpieza y lotes confirmados
+            app.config['UPLOAD_REPLACE_STRATEGY'] = 'delete'
+            comprimido = tmp_path / 'DATA.TXT.gz'
+            comprimido.write_bytes(gzip.compress(malo.encode('utf-8')))
+            with pytest.raises(BadRequest):
+                SubirDataService().leer_txt(str(comprimido))
+            assert Data.query.count() == 5000
+            assert service.obtener_generacion()[0] == 3
+            
+            # Si la carga falla sin haber confirmado nada, la generación se mantiene
+            app.config['UPLOAD_COMMIT_MODE'] = 'file'
+            with pytest.raises(BadRequest):
+                SubirDataService().leer_txt(str(comprimido))
+            assert service.obtener_generacion()[0] == 3
+    
+    def test_failed_checkpointed_delete_load_invalidates_dedup(self, service, app, tmp_path):
+        """Test de que tras una carga con checkpoints fallida a medias, el archivo anterior se recarga"""
+        with app.app_context():
+            anterior = tmp_path / 'DATA.TXT'
+            anterior.write_text('2023/10/15;08:00;12345678-9\n')
+            service.leer_txt(str(anterior))
+            
+            app.config['UPLOAD_COMMIT_MODE'] = 'batch'
+            app.config['UPLOAD_REPLACE_STRATEGY'] = 'delete'
+            app.config['UPLOAD_BATCH_SIZE'] = 2
+            fallida = tmp_path / 'OTRO' / 'DATA.TXT'
+            fallida.parent.mkdir()
+            fallida.write_text('2023/10/16;08:00;1-9\n2023/10/16;09:00;1-9\n2023/10/16;10:00;1-9\nlinea invalida\n')
+            with pytest.raises(BadRequest):
+                SubirDataService().leer_txt(str(fallida))
+            assert Data.query.count() == 2
+            # El resumen vigente refleja lo que quedó en data
+            assert service.obtener_estadisticas()['total_records'] == 2
+            assert service.obtener_ruts_distintos() == ['1-9']
+            
+            resultado = SubirDataService().leer_txt(str(anterior))
+            assert not resultado.get('sin_cambios')
+            assert [(d.fecha, d.rut) for d in Data.query.all()] == [('2023/10/15', '12345678-9')]
+    
     def test_obtener_todos_los_datos(self, service):
         """Test de obtención de todos los datos"""
         mock_data = [Data(), Data(), Data()]
@@ -190,12 +1130,13 @@ invalid;line;format"""
         """Test de obtención de RUTs únicos"""
         mock_ruts = ['12345678-9', '87654321-0', '11111111-1']
         
-        with patch.object(service.data_repository, 'find_distinct_rut', return_value=mock_ruts) as mock_find:
+        with patch.object(service.data_repository, 'find_distinct_rut', return_value=mock_ruts) as mock_find, \
+             patch.object(service.data_summary_repository, 'find_latest', return_value=None):
             result = service.obtener_ruts_distintos()
             
             mock_find.assert_called_once()
-            assert result == mock_ruts
-            assert len(result) == 3
+            # Mismo orden que cuando se leen del resumen
+            assert result == ['11111111-1', '12345678-9', '87654321-0']
     
     def test_constants(self):
         """Test de las constantes del servicio"""
@@ -203,3 +1144,157 @@ invalid;line;format"""
         
         assert ALLOWED_NAME == 'DATA.TXT'
         assert UPLOAD_FOLDER == 'uploads'
+
+
+class TestImportPipeline:
+    """Pruebas para el pipeline lectura/escritura de la carga"""
+    
+    def test_preserves_order(self, app):
+        """Test de que las filas llegan completas y en orden"""
+        with app.app_context():
+            filas = ((f'2023/10/{d:02d}', '08:00', '1-9') for d in range(1, 29))
+            
+            assert list(en_segundo_plano(filas, batch_size=5, profundidad=2)) == \
+                [(f'2023/10/{d:02d}', '08:00', '1-9') for d in range(1, 29)]
+    
+    def test_producer_error_is_raised_in_consumer(self, app):
+        """Test de que un error de validación del hilo lector llega al consumidor"""
+        def filas():
+            yield ('2023/10/15', '08:00', '1-9')
+            raise BadRequest('Línea 2 mal formateada')
+        
+        with app.app_context():
+            with pytest.raises(BadRequest) as exc_info:
+                list(en_segundo_plano(filas(), batch_size=1))
+            
+            assert 'Línea 2' in str(exc_info.value.description)
+    
+    def test_backpressure_and_close(self, app):
+        """Test de que la cola acota la lectura adelantada y close detiene al productor"""
+        leidas = []
+        
+        def filas():
+            for i in range(10000):
+                leidas.append(i)
+                yield ('2023/10/15', '08:00', f'{i}-9')
+        
+        with app.app_context():
+            pipeline = en_segundo_plano(filas(), batch_size=10, profundidad=2)
+            next(pipeline)
+            pipeline.close()
+            
+            # Un lote en consumo, dos en cola y a lo más uno en preparación
+            assert len(leidas) <= 10 * 4
+    
+    def test_leer_txt_without_pipeline(self, app):
+        """Test de carga con el pipeline deshabilitado"""
+        with app.app_context():
+            app.config['UPLOAD_PIPELINE'] = False
+            app.config['UPLOAD_DEDUP'] = False
+            
+            with patch('builtins.open', mock_open(read_data='2023/10/15;08:00;12345678-9')):
+                result = SubirDataService().leer_txt('/fake/path/DATA.TXT')
+            
+            assert result['registros_procesados'] == 1
+
+
+class TestChunkedUploadService:
+    """Pruebas para la carga por partes"""
+    
+    @pytest.fixture
+    def chunked(self, app, tmp_path, monkeypatch):
+        """Servicio de carga por partes trabajando en un directorio temporal"""
+        monkeypatch.chdir(tmp_path)
+        with app.app_context():
+            yield ChunkedUploadService()
+    
+    def _enviar(self, chunked, upload_id, numero, datos):
+        return chunked.recibir_chunk(upload_id, numero, BytesIO(datos), hashlib.sha256(datos).hexdigest())
+    
+    def test_prefix_validated_as_chunks_arrive(self, chunked):
+        """Test de validación incremental del prefijo contiguo"""
+        upload_id = chunked.iniciar('DATA.TXT', 3)['upload_id']
+        
+        # Fuera de orden: el chunk 1 espera al 0 para ensamblarse
+        estado = self._enviar(chunked, upload_id, 1, b'17:30;12345678-9\n2023/10/15;08:15;8765')
+        assert estado['lineas_validadas'] == 0
+        
+        estado = self._enviar(chunked, upload_id, 0, b'2023/10/15;08:00;12345678-9\n\n2023/10/15;')
+        assert estado['lineas_validadas'] == 3
+        
+        estado = self._enviar(chunked, upload_id, 2, b'4321-0')
+        assert estado['lineas_validadas'] == 4
+        assert estado['completo'] is True
+        
+        path = chunked.completar(upload_id)
+        with open(path, 'rb') as file:
+            assert file.read().count(b'\n') == 3
+    
+    def test_crash_before_manifest_saved_does_not_duplicate_chunk(self, chunked):
+        """Test de que un chunk ya agregado pero sin manifiesto guardado no se duplica al reintentar"""
+        upload_id = chunked.iniciar('DATA.TXT', 2)['upload_id']
+        datos = b'2023/10/15;08:00;1-9\n'
+        
+        # Caída después de agregar el chunk al archivo y antes de guardar el manifiesto
+        with patch.object(chunked, '_guardar_manifest', side_effect=OSError('proceso interrumpido')):
+            with pytest.raises(OSError):
+                self._enviar(chunked, upload_id, 0, datos)
+        
+        self._enviar(chunked, upload_id, 0, datos)
+        self._enviar(chunked, upload_id, 1, b'2023/10/15;09:00;1-9\n')
+        
+        with open(chunked.completar(upload_id), 'rb') as file:
+            assert file.read() == datos + b'2023/10/15;09:00;1-9\n'
+    
+    def test_invalid_line_reports_absolute_line_number(self, chunked):
+        """Test de que el error de un chunk posterior reporta la línea del archivo completo"""
+        upload_id = chunked.iniciar('DATA.TXT', 2)['upload_id']
+        self._enviar(chunked, upload_id, 0, b'2023/10/15;08:00;1-9\n2023/10/15;09:00;1-9\n')
+        
+        with pytest.raises(BadRequest) as exc_info:
+            self._enviar(chunked, upload_id, 1, b'2023/10/15;08:00\n')
+        assert 'Línea 3' in str(exc_info.value.description)
+        
+        assert chunked.estado(upload_id)['error'] is not None
+    
+    def test_prefix_validated_in_bounded_windows(self, chunked, monkeypatch):
+        """Test de validación del prefijo por ventanas más chicas que lo pendiente"""
+        monkeypatch.setattr(chunked_upload_service, 'VENTANA_VALIDACION', 30)
+        monkeypatch.setattr(chunked_upload_service, 'BLOQUE_BUSQUEDA', 32)
+        validas = b''.join(b'2023/10/15;08:%02d;1-9\r\n' % i for i in range(6))
+        upload_id = chunked.iniciar('DATA.TXT', 2)['upload_id']
+        
+        # El chunk 0 llega al final: todo el archivo queda pendiente de una vez
+        with pytest.raises(BadRequest) as exc_info:
+            self._enviar(chunked, upload_id, 1, b'2023/10/15;08:00\r\n2023/10/15;09:00;1-9')
+            self._enviar(chunked, upload_id, 0, validas)
+        assert 'Línea 7' in str(exc_info.value.description)
+        
+        upload_id = chunked.iniciar('DATA.TXT', 2)['upload_id']
+        self._enviar(chunked, upload_id, 1, b'2023/10/15;09:00;1-9')
+        estado = self._enviar(chunked, upload_id, 0, validas)
+        assert estado['lineas_validadas'] == 7
+        assert estado['completo'] is True
+    
+    def test_chunk_number_out_of_range(self, chunked):
+        """Test de número de chunk fuera de rango"""
+        upload_id = chunked.iniciar('DATA.TXT', 1)['upload_id']
+        
+        with pytest.raises(BadRequest):
+            self._enviar(chunked, upload_id, 1, b'x')
+    
+    def test_unknown_upload(self, chunked):
+        """Test de carga inexistente o con id inválido"""
+        with pytest.raises(NotFound):
+            chunked.estado('ffffffff')
+        with pytest.raises(NotFound):
+            chunked.estado('../../etc')
+    
+    def test_limpiar_expiradas(self, chunked, app):
+        """Test de eliminación de cargas abandonadas"""
+        upload_id = chunked.iniciar('DATA.TXT', 2)['upload_id']
+        app.config['UPLOAD_CHUNK_TTL'] = -1
+        
+        assert chunked.limpiar_expiradas() == 1
+        with pytest.raises(NotFound):
+            chunked.estado(upload_id)
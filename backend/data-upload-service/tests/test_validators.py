@@ -160,6 +160,36 @@ class TestDataValidator:
                 DataValidator.validate_line_format(line, 1)
             assert expected_error.split()[0].lower() in str(exc_info.value.description).lower()
     
+    def test_validate_line_format_fast_path_matches_fields(self):
+        """Test de que el camino rápido coincide con la validación campo a campo"""
+        lines = [
+            '2023/10/15;08:00;12345678-9',
+            '2024/02/29;23:59;1-K',          # Año bisiesto
+            '2000/02/29;00:00;1-k',          # Bisiesto divisible por 400
+            '1900/02/29;08:00;1-9',          # No bisiesto divisible por 100
+            '2023/02/29;08:00;1-9',          # No bisiesto
+            '2023/04/31;08:00;1-9',          # Abril tiene 30 días
+            '2023/13/01;08:00;1-9',
+            '2023/00/10;08:00;1-9',
+            '2023/10/00;08:00;1-9',
+            '0000/01/01;08:00;1-9',          # Año 0 no existe
+            '2023/10/15;24:00;1-9',
+            '2023/10/15;08:60;1-9',
+            '2023/10/15 ; 08:00 ;1-9',       # Espacios dentro de los campos
+            '2023/10/15;08:00;123456789-9',  # Cuerpo de RUT demasiado largo
+            '2023/10/15;08:00',
+        ]
+        
+        def resultado(funcion, line):
+            try:
+                return funcion(line, 7)
+            except BadRequest as e:
+                return e.description
+        
+        for line in lines:
+            assert resultado(DataValidator.validate_line_format, line) == \
+                resultado(DataValidator.validate_line_fields, line), line
+    
     def test_validate_file_valid(self):
         """Test de validación de archivo válido"""
         valid_file = FileStorage(
@@ -172,7 +202,7 @@ class TestDataValidator:
     
     def test_validate_file_case_insensitive(self):
         """Test de validación de archivo con diferentes casos"""
-        valid_filenames = ['DATA.TXT', 'data.txt', 'Data.Txt']
+        valid_filenames = ['DATA.TXT', 'data.txt', 'Data.Txt', 'DATA.TXT.gz', 'data.txt.BZ2', 'DATA.TXT.xz']
         
         for filename in valid_filenames:
             valid_file = FileStorage(
@@ -194,7 +224,9 @@ class TestDataValidator:
             'WRONG.TXT',
             'data.csv',
             'marcaciones.txt',
-            'DATA'
+            'DATA',
+            'DATA.TXT.zip',
+            'DATA.gz'
         ]
         
         for filename in wrong_filenames:
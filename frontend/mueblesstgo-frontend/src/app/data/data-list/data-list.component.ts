@@ -1,6 +1,6 @@
 import { Component, OnInit } from '@angular/core';
 import { Router } from '@angular/router';
-import { DataUploadService, DataRecord } from '../data-upload.service';
+import { DataUploadService, DataRecord, DataPage } from '../data-upload.service';
 
 @Component({
   selector: 'app-data-list',
@@ -8,14 +8,15 @@ import { DataUploadService, DataRecord } from '../data-upload.service';
   styleUrls: ['./data-list.component.css']
 })
 export class DataListComponent implements OnInit {
-  allData: DataRecord[] = [];
+  pageData: DataRecord[] = [];
   isLoading: boolean = false;
   errorMessage: string = '';
   
-  // Paginación
+  // Paginación por cursor: cursors[i] es el cursor de inicio de la página i + 1
   currentPage: number = 1;
   itemsPerPage: number = 20;
-  totalItems: number = 0;
+  hasMore: boolean = false;
+  private cursors: (string | null)[] = [null];
 
   constructor(
     private dataUploadService: DataUploadService,
@@ -23,18 +24,22 @@ export class DataListComponent implements OnInit {
   ) { }
 
   ngOnInit(): void {
-    this.loadAllData();
+    this.loadPage(1);
   }
 
-  loadAllData(): void {
+  /**
+   * Carga la página indicada desde el servidor (solo se piden itemsPerPage registros)
+   */
+  loadPage(page: number): void {
     this.isLoading = true;
     this.errorMessage = '';
 
-    this.dataUploadService.getData().subscribe({
-      next: (data: DataRecord[]) => {
-        this.allData = data;
-        this.totalItems = data.length;
-        this.currentPage = 1;
+    this.dataUploadService.getDataPage(this.itemsPerPage, this.cursors[page - 1]).subscribe({
+      next: (result: DataPage) => {
+        this.pageData = result.data;
+        this.hasMore = result.has_more;
+        this.currentPage = page;
+        this.cursors[page] = result.next_cursor;
         this.isLoading = false;
       },
       error: (error) => {
@@ -44,40 +49,15 @@ export class DataListComponent implements OnInit {
     });
   }
 
-  // Paginación
-  get paginatedData(): DataRecord[] {
-    const startIndex = (this.currentPage - 1) * this.itemsPerPage;
-    const endIndex = startIndex + this.itemsPerPage;
-    return this.allData.slice(startIndex, endIndex);
-  }
-
-  get totalPages(): number {
-    return Math.ceil(this.totalItems / this.itemsPerPage);
-  }
-
-  get pageNumbers(): number[] {
-    const pages = [];
-    for (let i = 1; i <= this.totalPages; i++) {
-      pages.push(i);
-    }
-    return pages;
-  }
-
-  goToPage(page: number): void {
-    if (page >= 1 && page <= this.totalPages) {
-      this.currentPage = page;
-    }
-  }
-
   nextPage(): void {
-    if (this.currentPage < this.totalPages) {
-      this.currentPage++;
+    if (this.hasMore) {
+      this.loadPage(this.currentPage + 1);
     }
   }
 
   prevPage(): void {
     if (this.currentPage > 1) {
-      this.currentPage--;
+      this.loadPage(this.currentPage - 1);
     }
   }
 
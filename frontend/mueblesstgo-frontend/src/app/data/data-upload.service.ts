@@ -1,5 +1,5 @@
 import { Injectable } from '@angular/core';
-import { HttpClient, HttpErrorResponse } from '@angular/common/http';
+import { HttpClient, HttpErrorResponse, HttpParams } from '@angular/common/http';
 import { Observable, throwError } from 'rxjs';
 import { catchError, map } from 'rxjs/operators';
 import { environment } from '../../environments/environment';
@@ -21,14 +21,59 @@ export interface DataUploadResponse {
   data?: DataRecord[];
 }
 
+export interface DataPage {
+  data: DataRecord[];
+  next_cursor: string | null;
+  has_more: boolean;
+}
+
+export interface DataFilters {
+  rut?: string;
+  fecha_desde?: string;
+  fecha_hasta?: string;
+  hora_desde?: string;
+  hora_hasta?: string;
+}
+
+export interface UploadJobResponse {
+  success: boolean;
+  job_id: number;
+  status: string;
+  status_url: string;
+  events_url: string;
+}
+
+export interface UploadProgress {
+  lines_parsed: number;
+  records_processed: number;
+  records_per_second: number;
+  lines_per_second: number;
+  bytes_read: number;
+  total_bytes: number | null;
+  percent: number | null;
+  eta_seconds: number | null;
+}
+
+export interface UploadJob {
+  job_id: number;
+  status: string;
+  records_processed: number;
+  error_message?: string | null;
+}
+
+export type UploadEvent =
+  | { type: 'progress'; progress: UploadProgress }
+  | { type: 'done'; job: UploadJob };
+
 export interface DataStats {
   total_records: number;
-  unique_ruts: number;
+  total_employees: number;
   date_range: {
-    earliest: string;
-    latest: string;
+    earliest: string | null;
+    latest: string | null;
   };
-  records_per_rut: Record<string, number>;
+  last_upload: string | null;
+  records_per_day: Record<string, number>;
 }
 
 @Injectable({
@@ -53,14 +98,63 @@ export class DataUploadService {
   }
 
   /**
-   * Obtener todos los datos cargados
+   * Subir archivo DATA.TXT como carga asíncrona (responde con el job id)
    */
-  getData(): Observable<DataRecord[]> {
-    return this.http.get<{success: boolean, data: DataRecord[]}>(`${this.apiUrl}/data`)
+  uploadFileAsync(file: File): Observable<UploadJobResponse> {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    return this.http.post<UploadJobResponse>(`${this.apiUrl}/upload?async=true`, formData)
+      .pipe(
+        catchError(this.handleError)
+      );
+  }
+
+  /**
+   * Seguir el progreso de una carga asíncrona (Server-Sent Events).
+   * Emite cada evento 'progress' y completa con el evento 'done'.
+   */
+  uploadEvents(jobId: number): Observable<UploadEvent> {
+    return new Observable<UploadEvent>(subscriber => {
+      const source = new EventSource(`${this.apiUrl}/upload/${jobId}/events`);
+
+      source.addEventListener('progress', (event: MessageEvent) => {
+        subscriber.next({ type: 'progress', progress: JSON.parse(event.data) });
+      });
+      source.addEventListener('done', (event: MessageEvent) => {
+        subscriber.next({ type: 'done', job: JSON.parse(event.data) });
+        subscriber.complete();
+        source.close();
+      });
+      source.onerror = () => {
+        subscriber.error(new Error('Se perdió la conexión con el progreso de la carga'));
+        source.close();
+      };
+
+      return () => source.close();
+    });
+  }
+
+  /**
+   * Obtener una página de datos cargados.
+   * after es el next_cursor de la página anterior (null para la primera).
+   */
+  getDataPage(limit: number, after: string | null = null, filters: DataFilters = {}): Observable<DataPage> {
+    let params = new HttpParams().set('limit', limit);
+    if (after) {
+      params = params.set('after', after);
+    }
+    for (const [key, value] of Object.entries(filters)) {
+      if (value) {
+        params = params.set(key, value);
+      }
+    }
+
+    return this.http.get<{success: boolean} & DataPage>(`${this.apiUrl}/data`, { params })
       .pipe(
         map(response => {
           if (response.success && response.data) {
-            return response.data;
+            return { data: response.data, next_cursor: response.next_cursor, has_more: response.has_more };
           }
           throw new Error('Error al obtener datos');
         }),
@@ -104,11 +198,11 @@ export class DataUploadService {
    * Obtener estadísticas de los datos
    */
   getStats(): Observable<DataStats> {
-    return this.http.get<{success: boolean, data: DataStats}>(`${this.apiUrl}/stats`)
+    return this.http.get<{success: boolean, stats: DataStats}>(`${this.apiUrl}/stats`)
       .pipe(
         map(response => {
-          if (response.success && response.data) {
-            return response.data;
+          if (response.success && response.stats) {
+            return response.stats;
           }
           throw new Error('Error al obtener estadísticas');
         }),
@@ -1,6 +1,7 @@
 import { Component } from '@angular/core';
 import { Router } from '@angular/router';
-import { DataUploadService, DataUploadResponse } from '../data-upload.service';
+import { switchMap } from 'rxjs/operators';
+import { DataUploadService, DataUploadResponse, UploadProgress } from '../data-upload.service';
 
 @Component({
   selector: 'app-data-upload',
@@ -12,6 +13,7 @@ export class DataUploadComponent {
   isUploading: boolean = false;
   uploadResponse: DataUploadResponse | null = null;
   errorMessage: string = '';
+  progress: UploadProgress | null = null;
 
   constructor(
     private router: Router,
@@ -22,16 +24,17 @@ export class DataUploadComponent {
     const file = event.target.files[0];
     
     if (file) {
-      // Validar que sea un archivo .txt
-      if (!file.name.toUpperCase().endsWith('.TXT')) {
+      // Validar que sea un archivo .txt (opcionalmente comprimido)
+      const nombre = file.name.toUpperCase().replace(/\.(GZ|BZ2|XZ)$/, '');
+      if (!nombre.endsWith('.TXT')) {
         this.errorMessage = 'Por favor seleccione un archivo .TXT';
         this.selectedFile = null;
         return;
       }
       
       // Validar que el nombre sea DATA.TXT
-      if (file.name.toUpperCase() !== 'DATA.TXT') {
-        this.errorMessage = 'El archivo debe llamarse exactamente "DATA.TXT"';
+      if (nombre !== 'DATA.TXT') {
+        this.errorMessage = 'El archivo debe llamarse exactamente "DATA.TXT" (o DATA.TXT.gz, .bz2, .xz)';
         this.selectedFile = null;
         return;
       }
@@ -53,13 +56,29 @@ export class DataUploadComponent {
     this.isUploading = true;
     this.errorMessage = '';
     this.uploadResponse = null;
+    this.progress = null;
 
-    this.dataUploadService.uploadFile(this.selectedFile).subscribe({
-      next: (response) => {
-        this.uploadResponse = response;
+    // Carga asíncrona: el progreso llega en vivo por Server-Sent Events
+    this.dataUploadService.uploadFileAsync(this.selectedFile).pipe(
+      switchMap(job => this.dataUploadService.uploadEvents(job.job_id))
+    ).subscribe({
+      next: (event) => {
+        if (event.type === 'progress') {
+          this.progress = event.progress;
+          return;
+        }
+
+        const success = event.job.status === 'success';
+        this.uploadResponse = {
+          success,
+          message: success
+            ? `${event.job.records_processed} registros procesados.`
+            : event.job.error_message || 'Error al procesar el archivo'
+        };
         this.isUploading = false;
+        this.progress = null;
         
-        if (response.success) {
+        if (success) {
           // Resetear el input file
           const fileInput = document.getElementById('fileInput') as HTMLInputElement;
           if (fileInput) {
@@ -71,6 +90,7 @@ export class DataUploadComponent {
       error: (error) => {
         this.errorMessage = error.message;
         this.isUploading = false;
+        this.progress = null;
       }
     });
   }